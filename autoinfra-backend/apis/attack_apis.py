@@ -6,9 +6,14 @@ from deployments import Deployments
 import helpers
 import fs_manager
 import command_runner
+from deployment_store import deployment_store
+from asset_registry import asset_registry
+from attack_engine import attack_engine
 from scenario_manager import ScenarioManager
 import logging
 import os
+import concurrent.futures
+from script_results import iter_results
 from azure.mgmt.compute.models import RunCommandInput, RunCommandInputParameter
 
 attack_apis_blueprint = Blueprint('attack_apis', __name__)
@@ -21,15 +26,14 @@ attack_apis_blueprint.logger = logging.getLogger(helpers.LOGGER_NAME)
 
 @attack_apis_blueprint.route("/listAttacks", methods=["GET","POST"])
 def list_attacks():
-    attacks = fs_manager.load_file(helpers.CONFIG_DIRECTORY, "attacks.json")
+    attacks = asset_registry.attacks()
     if request.method == "POST":
         try:
             data = json.loads(request.data.decode("utf-8"))
             attack_apis_blueprint.logger.debug(f"LIST_ATTACKS: Data is {data}")
             deploymentID = data["deploymentId"]
 
-            deploymentInfo = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
-            if "ERROR" in deploymentInfo:
+            if not deployment_store.exists(deploymentID):
                 attack_apis_blueprint.logger.error(f"LIST_ATTACKS: Could not load deployment {deploymentID}. File not found.")
                 return jsonify({"message": {}})
 
@@ -68,20 +72,15 @@ def list_enabled_attacks():
     deploymentID = request.data.decode("utf-8")
 
     try:
-        deploymentInfo = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
+        deploymentInfo = deployment_store.get(deploymentID)
 
         enabledAttacks = deploymentInfo.get("enabledAttacks", {})
         attacksInProgress = deploymentInfo.get("attacksInProgress", {})
-        attacks = fs_manager.load_file(helpers.CONFIG_DIRECTORY, "attacks.json")
+        attack_index = asset_registry.attack_index()
 
         enabledAttacksInfo = {}
         for attack_type, instances in enabledAttacks.items():
-            attack_def = None
-            for _, attack_dict in attacks.items():
-                if attack_type in attack_dict:
-                    attack_def = attack_dict[attack_type]
-                    break
-
+            attack_def = attack_index.get(attack_type)
             if attack_def:
                 enabledAttacksInfo[attack_type] = {
                     **attack_def,
@@ -90,12 +89,7 @@ def list_enabled_attacks():
 
         inProgressAttacksInfo = {}
         for attack_type, instances in attacksInProgress.items():
-            attack_def = None
-            for _, attack_dict in attacks.items():
-                if attack_type in attack_dict:
-                    attack_def = attack_dict[attack_type]
-                    break
-
+            attack_def = attack_index.get(attack_type)
             if attack_def:
                 inProgressAttacksInfo[attack_type] = {
                     **attack_def,
@@ -125,31 +119,24 @@ def enable_attacks():
     granting_user_inputs = attack_inputs.get("grantingUser", {})
     receiving_user_inputs = attack_inputs.get("receivingUser", {})
 
-    enterpriseAdminUsername = scenario_manager.get_parameter("enterpriseAdminUsername", deploymentID)
-    domainAdminPassword = scenario_manager.get_parameter("enterpriseAdminPassword", deploymentID)
-    rootDomainName = scenario_manager.get_parameter("rootDomainName", deploymentID)
-    rootDC = scenario_manager.get_parameter("rootDCName", deploymentID)
+    params = scenario_manager.get_parameters(deploymentID)
+    domainAdminPassword = params.admin_password
+    rootDomainName = params.root_domain
+    rootDC = params.root_dc
 
     # Construct username in UPN format (user@domain.fqdn) for AD authentication
     # Always use root domain for Enterprise Admin credentials
-    domainAdminUsername = f"{enterpriseAdminUsername}@{rootDomainName}"
+    domainAdminUsername = params.admin_upn
 
     deploymentInfo = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
     
-    # Build domain-to-DC mapping from topology for multi-domain support
-    domain_to_dc = {}
-    topology = deploymentInfo.get("topology", {})
-    for node in topology.get("nodes", []):
-        if node.get("type") == "domainController":
-            node_data = node.get("data", {})
-            domain_name = node_data.get("domainName", "").lower()
-            dc_name = node_data.get("domainControllerName", node_data.get("name", ""))
-            if domain_name and dc_name:
-                domain_to_dc[domain_name] = dc_name
+    # Domain-to-DC mapping from the topology index for multi-domain support
+    topology_index = deployment_store.get_topology_index(deploymentID)
+    domain_to_dc = topology_index.domain_to_dc if topology_index else {}
     
     # Fallback to root domain if no mapping found
     if not domain_to_dc:
-        domain_to_dc[rootDomainName.lower()] = rootDC
+        domain_to_dc = {rootDomainName.lower(): rootDC}
     
     attack_apis_blueprint.logger.info(f"ENABLE_ATTACKS: Domain-to-DC mapping: {domain_to_dc}")
     
@@ -175,6 +162,7 @@ def enable_attacks():
 
     enabledAttacks = deploymentInfo.get("enabledAttacks", {})
     attacksInProgressCheck = deploymentInfo.get("attacksInProgress", {})
+    attack_requests = []
 
     for attack in attacksToEnable:
         targetUser = target_user_inputs.get(attack, "")
@@ -267,38 +255,123 @@ def enable_attacks():
         if not attackDC:
             attackDC = rootDC
 
-        attack_apis_blueprint.logger.info(f"ENABLE_ATTACKS: Starting attack {attack} on {deploymentID} for target {targetToCheck} (domain={attackDomainName}, dc={attackDC})")
-        attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPassword, attackDomainName, attackDC, targetBox, targetUser, singleUserPassword, grantingUser, receivingUser)
+        attack_apis_blueprint.logger.info(f"ENABLE_ATTACKS: Queueing attack {attack} on {deploymentID} for target {targetToCheck} (domain={attackDomainName}, dc={attackDC})")
+        attack_request = build_attack_request(attack, deploymentID, domainAdminUsername, domainAdminPassword, attackDomainName, attackDC, targetBox, targetUser, singleUserPassword, grantingUser, receivingUser)
+        if attack_request is None:
+            attack_apis_blueprint.logger.warning(f"ENABLE_ATTACKS: Unknown attack {attack}, skipping")
+            continue
+        attack_requests.append(attack_request)
 
-    deploymentInfo = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
+    # All attacks go out together: merged per VM into as few run commands as possible
+    results = attack_engine.execute(deploymentID, attack_requests)
+    failed = [
+        {"attack": result["request"]["attackType"], "target": result["request"]["targetUser"], "error": result["error"]}
+        for result in results if "error" in result
+    ]
 
-    attack_operations = deploymentInfo.get("attackOperations", {})
-    attacks_in_progress = deploymentInfo.get("attacksInProgress", {})
-
-    for operation_id, op_info in attack_operations.items():
-        if op_info.get("status") == "InProgress":
-            attack_type = op_info.get("attackType")
-            if attack_type:
-                if attack_type not in attacks_in_progress:
-                    attacks_in_progress[attack_type] = []
-
-                instance_info = {
-                    "operationId": operation_id,
-                    "targetUser": op_info.get("targetUser"),
-                    "targetBox": op_info.get("targetBox"),
-                    "timestamp": op_info.get("timestamp")
-                }
+    if failed and len(failed) == len(results):
+        attack_apis_blueprint.logger.error(f"ENABLE_ATTACKS: None of the {len(results)} attack(s) could be started")
+        return jsonify({"message": "Attack execution failed", "failedAttacks": failed}), 500
 
-                if not any(inst.get("operationId") == operation_id for inst in attacks_in_progress[attack_type]):
-                    attacks_in_progress[attack_type].append(instance_info)
+    attack_apis_blueprint.logger.info(f"ENABLE_ATTACKS: {len(results) - len(failed)} attack(s) started (running in background), {len(failed)} failed to start")
 
-    deploymentInfo["attacksInProgress"] = attacks_in_progress
+    return jsonify({"message": "Attack execution initiated successfully", "failedAttacks": failed}), 200
 
-    fs_manager.save_file(deploymentInfo, helpers.DEPLOYMENT_DIRECTORY, deploymentID)
+def _apply_operation_result(deployment, operation_id, status, message):
+    """
+    Record a finished attack operation on the deployment dict (in place): mark the
+    operation, move Succeeded ones into enabledAttacks and drop it from attacksInProgress.
+    """
+    attack_operations = deployment.setdefault("attackOperations", {})
+    attacks_in_progress = deployment.setdefault("attacksInProgress", {})
+    enabled_attacks = deployment.setdefault("enabledAttacks", {})
+
+    op_info = attack_operations.get(operation_id)
+    if op_info is None or op_info.get("status") in ["Succeeded", "Failed"]:
+        return
+
+    attack_type = op_info.get("attackType", "Unknown")
+    op_info["status"] = status
+    op_info["message"] = message
+
+    if status == "Succeeded":
+        instance_info = {
+            "operationId": operation_id,
+            "targetUser": op_info.get("targetUser"),
+            "targetBox": op_info.get("targetBox"),
+            "timestamp": op_info.get("timestamp")
+        }
+        if attack_type not in enabled_attacks:
+            enabled_attacks[attack_type] = []
+        enabled_attacks[attack_type].append(instance_info)
+
+    if attack_type in attacks_in_progress:
+        attacks_in_progress[attack_type] = [
+            inst for inst in attacks_in_progress[attack_type]
+            if inst.get("operationId") != operation_id
+        ]
+        if not attacks_in_progress[attack_type]:
+            del attacks_in_progress[attack_type]
+
+def _classify_run_command(run_command_info):
+    """Map a run command's provisioning/execution state to (status, message) for checkAttackStatus."""
+    provisioning_state = run_command_info.provisioning_state
+    execution_state = run_command_info.instance_view.execution_state if run_command_info.instance_view else None
+
+    if provisioning_state == "Succeeded" and execution_state == "Succeeded":
+        return "Succeeded", "Attack enabled successfully"
+
+    if provisioning_state == "Failed" or execution_state == "Failed":
+        error_msg = "Attack execution failed"
+        if run_command_info.instance_view and run_command_info.instance_view.error:
+            error_msg = run_command_info.instance_view.error
+        return "Failed", error_msg
+
+    attack_apis_blueprint.logger.info(f"CHECK_ATTACK_STATUS: {run_command_info.name} still in progress (prov: {provisioning_state}, exec: {execution_state})")
+    return "InProgress", "Attack running"
+
+def _parse_attack_steps(run_command_info):
+    """{step number: (status, message)} from the output of a run command that ran several attack steps."""
+    output = run_command_info.instance_view.output if run_command_info.instance_view else None
+    steps = {}
+    for result in iter_results(output, "attack_step"):
+        status = result.get("status")
+        message = "Attack enabled successfully" if status == "Succeeded" else (result.get("error") or "Attack execution failed")
+        steps[int(result["step"])] = (status, message)
+    return steps
+
+def _get_run_command_states(resource_group, vm_name, run_command_names):
+    """
+    {run_command_name: (status, message, step results)} for the given run commands on one VM,
+    listed with one call. Callers only pass run commands whose operations are still pending;
+    terminal ones are resolved from the status persisted on the operation.
+    """
+    states = {}
+    attack_apis_blueprint.logger.info(f"CHECK_ATTACK_STATUS: Listing run commands on {vm_name} for {len(run_command_names)} operation(s)")
+    compute_client = azure_clients.get_compute_client()
+    run_commands = {
+        run_command.name: run_command
+        for run_command in compute_client.virtual_machine_run_commands.list_by_virtual_machine(
+            resource_group_name=resource_group,
+            vm_name=vm_name,
+            expand="instanceView"
+        )
+    }
 
-    attack_apis_blueprint.logger.info(f"ENABLE_ATTACKS: All attacks started successfully (running in background)")
+    for name in run_command_names:
+        run_command_info = run_commands.get(name)
+        if run_command_info is None:
+            # Not visible yet right after begin_create_or_update
+            states[name] = ("InProgress", f"Attack running on {vm_name}", {})
+            continue
 
-    return jsonify({"message": "Attack execution initiated successfully"}), 200
+        status, message = _classify_run_command(run_command_info)
+        if status == "InProgress":
+            states[name] = (status, f"Attack running on {vm_name}", {})
+        else:
+            states[name] = (status, message, _parse_attack_steps(run_command_info))
+
+    return states
 
 @attack_apis_blueprint.route("/checkAttackStatus", methods=["POST"])
 def check_attack_status():
@@ -318,7 +391,7 @@ def check_attack_status():
         if not deploymentID:
             return jsonify({"error": "deploymentId is required"}), 400
 
-        deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
+        deployment = deployment_store.get(deploymentID)
         if "ERROR" in deployment:
             return jsonify({"error": "Deployment not found"}), 404
 
@@ -333,11 +406,11 @@ def check_attack_status():
                 "operations": {}
             }), 200
 
-        compute_client = azure_clients.get_compute_client()
         operations_status = {}
-        needs_save = False
+        finished_operations = {}
+        pending_by_vm = {}
 
-        for operation_id, op_info in list(attack_operations.items()):
+        for operation_id, op_info in attack_operations.items():
             current_status = op_info.get("status", "Unknown")
             attack_type = op_info.get("attackType", "Unknown")
 
@@ -349,117 +422,63 @@ def check_attack_status():
                 }
                 continue
 
-            try:
-                vm_name = op_info.get("vmName")
-                resource_group = op_info.get("resourceGroup")
-                run_command_name = op_info.get("runCommandName")
-
-                if not run_command_name:
-                    attack_apis_blueprint.logger.error(f"CHECK_ATTACK_STATUS: No run command name found for {operation_id}")
-                    operations_status[operation_id] = {
-                        "status": "Unknown",
-                        "message": "Missing run command name",
-                        "attackType": attack_type
-                    }
-                    continue
-
-                attack_apis_blueprint.logger.info(f"CHECK_ATTACK_STATUS: Querying run command '{run_command_name}' status for {attack_type}")
-
-                run_command_info = compute_client.virtual_machine_run_commands.get_by_virtual_machine(
-                    resource_group_name=resource_group,
-                    vm_name=vm_name,
-                    run_command_name=run_command_name,
-                    expand="instanceView"  # Get execution details
-                )
-
-                provisioning_state = run_command_info.provisioning_state
-                attack_apis_blueprint.logger.info(f"CHECK_ATTACK_STATUS: {attack_type} ({operation_id}) provisioning_state: {provisioning_state}")
-
-                execution_state = None
-                if run_command_info.instance_view:
-                    execution_state = run_command_info.instance_view.execution_state
-                    attack_apis_blueprint.logger.info(f"CHECK_ATTACK_STATUS: {attack_type} ({operation_id}) execution_state: {execution_state}")
-
-                if provisioning_state == "Succeeded" and execution_state == "Succeeded":
-                    attack_apis_blueprint.logger.info(f"CHECK_ATTACK_STATUS: {attack_type} ({operation_id}) completed successfully!")
-
-                    attack_operations[operation_id]["status"] = "Succeeded"
-                    attack_operations[operation_id]["message"] = "Attack enabled successfully"
-
-                    instance_info = {
-                        "operationId": operation_id,
-                        "targetUser": op_info.get("targetUser"),
-                        "targetBox": op_info.get("targetBox"),
-                        "timestamp": op_info.get("timestamp")
-                    }
-
-                    if attack_type not in enabled_attacks:
-                        enabled_attacks[attack_type] = []
-                    enabled_attacks[attack_type].append(instance_info)
-
-                    if attack_type in attacks_in_progress:
-                        attacks_in_progress[attack_type] = [
-                            inst for inst in attacks_in_progress[attack_type]
-                            if inst.get("operationId") != operation_id
-                        ]
-                        if not attacks_in_progress[attack_type]:
-                            del attacks_in_progress[attack_type]
-
-                    needs_save = True
-
-                    operations_status[operation_id] = {
-                        "status": "Succeeded",
-                        "message": "Attack enabled successfully",
-                        "attackType": attack_type
-                    }
-
-                elif provisioning_state == "Failed" or execution_state == "Failed":
-                    attack_apis_blueprint.logger.error(f"CHECK_ATTACK_STATUS: {attack_type} ({operation_id}) failed!")
-
-                    attack_operations[operation_id]["status"] = "Failed"
-                    error_msg = "Attack execution failed"
-                    if run_command_info.instance_view and run_command_info.instance_view.error:
-                        error_msg = run_command_info.instance_view.error
-
-                    attack_operations[operation_id]["message"] = error_msg
-
-                    if attack_type in attacks_in_progress:
-                        attacks_in_progress[attack_type] = [
-                            inst for inst in attacks_in_progress[attack_type]
-                            if inst.get("operationId") != operation_id
-                        ]
-                        if not attacks_in_progress[attack_type]:
-                            del attacks_in_progress[attack_type]
-
-                    needs_save = True
+            run_command_name = op_info.get("runCommandName")
+            if not run_command_name:
+                attack_apis_blueprint.logger.error(f"CHECK_ATTACK_STATUS: No run command name found for {operation_id}")
+                operations_status[operation_id] = {
+                    "status": "Unknown",
+                    "message": "Missing run command name",
+                    "attackType": attack_type
+                }
+                continue
 
-                    operations_status[operation_id] = {
-                        "status": "Failed",
-                        "message": error_msg,
-                        "attackType": attack_type
-                    }
+            vm_key = (op_info.get("resourceGroup"), op_info.get("vmName"))
+            pending_by_vm.setdefault(vm_key, []).append(operation_id)
+
+        # One list call per VM, fanned out over a bounded pool, instead of one get per operation
+        with concurrent.futures.ThreadPoolExecutor(max_workers=helpers.ATTACK_STATUS_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(_get_run_command_states, resource_group, vm_name, [attack_operations[op]["runCommandName"] for op in operation_ids]): (vm_name, operation_ids)
+                for (resource_group, vm_name), operation_ids in pending_by_vm.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                vm_name, operation_ids = futures[future]
+                try:
+                    states = future.result()
+                except Exception as e:
+                    attack_apis_blueprint.logger.error(f"CHECK_ATTACK_STATUS: Error checking run commands on {vm_name}: {str(e)}")
+                    states = {}
+
+                for operation_id in operation_ids:
+                    op_info = attack_operations[operation_id]
+                    attack_type = op_info.get("attackType", "Unknown")
+                    status, message, steps = states.get(op_info["runCommandName"], ("InProgress", f"Still enabling on {vm_name or 'VM'}", {}))
+                    # Attacks merged into one run command resolve from their own step's result
+                    if op_info.get("step") in steps:
+                        status, message = steps[op_info["step"]]
+
+                    if status == "Succeeded":
+                        attack_apis_blueprint.logger.info(f"CHECK_ATTACK_STATUS: {attack_type} ({operation_id}) completed successfully!")
+                        finished_operations[operation_id] = (status, message)
+                    elif status == "Failed":
+                        attack_apis_blueprint.logger.error(f"CHECK_ATTACK_STATUS: {attack_type} ({operation_id}) failed!")
+                        finished_operations[operation_id] = (status, message)
 
-                else:
-                    attack_apis_blueprint.logger.info(f"CHECK_ATTACK_STATUS: {attack_type} ({operation_id}) still in progress (prov: {provisioning_state}, exec: {execution_state})")
                     operations_status[operation_id] = {
-                        "status": "InProgress",
-                        "message": f"Attack running on {vm_name}",
+                        "status": status,
+                        "message": message,
                         "attackType": attack_type
                     }
 
-            except Exception as e:
-                attack_apis_blueprint.logger.error(f"CHECK_ATTACK_STATUS: Error checking {attack_type} ({operation_id}): {str(e)}")
-                operations_status[operation_id] = {
-                    "status": "InProgress",
-                    "message": f"Still enabling on {op_info.get('vmName', 'VM')}",
-                    "attackType": attack_type
-                }
-
-        if needs_save:
-            deployment["attackOperations"] = attack_operations
-            deployment["attacksInProgress"] = attacks_in_progress
-            deployment["enabledAttacks"] = enabled_attacks
-            fs_manager.save_file(deployment, helpers.DEPLOYMENT_DIRECTORY, deploymentID)
+        if finished_operations:
+            # Apply to a fresh copy under the deployment lock so operations added
+            # by a concurrent enableAttacks call are not lost
+            with deployment_store.update(deploymentID) as deployment:
+                if "ERROR" not in deployment:
+                    for operation_id, (status, message) in finished_operations.items():
+                        _apply_operation_result(deployment, operation_id, status, message)
+                    attacks_in_progress = deployment.get("attacksInProgress", {})
+                    enabled_attacks = deployment.get("enabledAttacks", {})
             attack_apis_blueprint.logger.info(f"CHECK_ATTACK_STATUS: Updated deployment {deploymentID} - moved completed attacks to enabled")
 
         return jsonify({
@@ -472,81 +491,29 @@ def check_attack_status():
         attack_apis_blueprint.logger.error(f"CHECK_ATTACK_STATUS: Error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-def _execute_attack_on_vm(attack_name, vm_name, resource_group, script_params, deploymentID, target_user_display="", extra_fields=None):
+def _attack_request(attack_name, vm_name, resource_group, script_params, target_user_display="", extra_fields=None):
     """
-    Common logic for executing any attack on a VM via Azure run command.
+    Attack request for attack_engine.
 
     Args:
         attack_name: Name of the attack (e.g., "ESC1", "Kerberoasting")
         vm_name: Name of the VM to execute on
         resource_group: Azure resource group name
         script_params: List of script parameters for the attack
-        deploymentID: Deployment ID
         target_user_display: Optional display string for targetUser field in attack operation
         extra_fields: Optional dict of additional fields to store in attackOperations
-
-    Returns:
-        run_command_name: The name of the run command operation
     """
-    import time
-
-    attack_apis_blueprint.logger.info(f"ATTACK_RESOLVER: Starting {attack_name} attack via SDK on {vm_name}")
-
-    try:
-        compute_client = azure_clients.get_compute_client()
-        vm = compute_client.virtual_machines.get(resource_group, vm_name)
-
-        script_dir = helpers.CONFIG_DIRECTORY
-        execute_script_path = helpers.EXECUTE_MODULE_SCRIPT
-        with open(execute_script_path, 'r') as f:
-            execute_script = f.read()
-
-        run_command_name = f"{attack_name}-{int(time.time())}"
-
-        run_command = {
-            "location": vm.location,
-            "source": {"script": execute_script},
-            "parameters": script_params,
-            "async_execution": False,
-            "timeout_in_seconds": helpers.RUN_COMMAND_TIMEOUT
-        }
-
-        compute_client.virtual_machine_run_commands.begin_create_or_update(
-            resource_group_name=resource_group,
-            vm_name=vm_name,
-            run_command_name=run_command_name,
-            run_command=run_command
-        )
-
-        attack_apis_blueprint.logger.info(f"ATTACK_RESOLVER: {attack_name} run command '{run_command_name}' created successfully")
-
-        deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
-        if "attackOperations" not in deployment:
-            deployment["attackOperations"] = {}
-
-        operation_data = {
-            "attackType": attack_name,
-            "runCommandName": run_command_name,
-            "status": "InProgress",
-            "vmName": vm_name,
-            "resourceGroup": resource_group,
-            "targetUser": target_user_display,
-            "timestamp": int(time.time())
-        }
-
-        if extra_fields:
-            operation_data.update(extra_fields)
-
-        deployment["attackOperations"][run_command_name] = operation_data
-        fs_manager.save_file(deployment, helpers.DEPLOYMENT_DIRECTORY, deploymentID)
-
-        return run_command_name
-
-    except Exception as e:
-        attack_apis_blueprint.logger.error(f"ATTACK_RESOLVER: Error executing {attack_name} via SDK: {str(e)}")
-        raise
+    return {
+        "attackType": attack_name,
+        "vmName": vm_name,
+        "resourceGroup": resource_group,
+        "scriptParams": script_params,
+        "targetUser": target_user_display,
+        "extraFields": extra_fields or {}
+    }
 
-def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPassword, domainName, dc, targetBox, targetUser, singleUserPassword, grantingUser="", receivingUser=""):
+def build_attack_request(attack, deploymentID, domainAdminUsername, domainAdminPassword, domainName, dc, targetBox, targetUser, singleUserPassword, grantingUser="", receivingUser=""):
+    """Script parameters and target VM for one attack, or None for an unknown attack."""
     attack_apis_blueprint.logger.debug(f"ATTACK_RESOLVER: Running attack resolver with parameters: attack={attack}, deploymentID={deploymentID}, domainAdminUsername={domainAdminUsername}, domainAdminPassword={domainAdminPassword}, domainName={domainName}, dc={dc}, targetUser={targetUser}, targetBox={targetBox}, singleUserPassword={singleUserPassword}, grantingUser={grantingUser}, receivingUser={receivingUser}")
     
     # Parse UPN format for users (username@domain) - extract just username for scripts
@@ -563,18 +530,18 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         receivingUserForScript = receivingUser.split("@", 1)[0]
     
     try:
-        deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
-        resource_group = deployment.get("resourceGroup", deploymentID)
+        resource_group = deployment_store.get_resource_group(deploymentID)
         attack_apis_blueprint.logger.debug(f"ATTACK_RESOLVER: Using resource group {resource_group} for deployment {deploymentID}")
     except Exception as e:
         resource_group = deploymentID
         attack_apis_blueprint.logger.error(f"ATTACK_RESOLVER: Error getting resource group for {deploymentID}, falling back to using deploymentID: {str(e)}")
     
-    ca_name = scenario_manager.get_parameter("caName", deploymentID)  # e.g., "CA01"
+    params = scenario_manager.get_parameters(deploymentID)
+    ca_name = params.get("caName")  # e.g., "CA01"
     
-    domain_admin_username = domainAdminUsername or scenario_manager.get_parameter("enterpriseAdminUsername", deploymentID)
-    domain_admin_password = domainAdminPassword or scenario_manager.get_parameter("enterpriseAdminPassword", deploymentID)
-    domain_name = domainName or scenario_manager.get_parameter("rootDomainName", deploymentID)
+    domain_admin_username = domainAdminUsername or params.admin_username
+    domain_admin_password = domainAdminPassword or params.admin_password
+    domain_name = domainName or params.root_domain
 
     if attack == "ESC1":
         script_params = [
@@ -586,7 +553,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetUserForScript:
             script_params.append({"name": "targetUser", "value": targetUserForScript})
 
-        _execute_attack_on_vm("ESC1", ca_name, resource_group, script_params, deploymentID, targetUser)
+        return _attack_request("ESC1", ca_name, resource_group, script_params, targetUser)
 
     elif attack == "ESC3":
         script_params = [
@@ -598,7 +565,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetUser:
             script_params.append({"name": "targetUser", "value": targetUserForScript})
 
-        _execute_attack_on_vm("ESC3", ca_name, resource_group, script_params, deploymentID, targetUser)
+        return _attack_request("ESC3", ca_name, resource_group, script_params, targetUser)
 
     elif attack == "ESC4":
         script_params = [
@@ -610,7 +577,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetUser:
             script_params.append({"name": "targetUser", "value": targetUserForScript})
 
-        _execute_attack_on_vm("ESC4", ca_name, resource_group, script_params, deploymentID, targetUser)
+        return _attack_request("ESC4", ca_name, resource_group, script_params, targetUser)
 
     elif attack == "Kerberoasting":
         script_params = [
@@ -622,7 +589,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetUser:
             script_params.append({"name": "targetUser", "value": targetUserForScript})
 
-        _execute_attack_on_vm("Kerberoasting", dc, resource_group, script_params, deploymentID, targetUser)
+        return _attack_request("Kerberoasting", dc, resource_group, script_params, targetUser)
 
     elif attack == "ASREPRoasting":
         script_params = [
@@ -634,7 +601,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetUser:
             script_params.append({"name": "targetUser", "value": targetUserForScript})
 
-        _execute_attack_on_vm("ASREPRoasting", dc, resource_group, script_params, deploymentID, targetUser)
+        return _attack_request("ASREPRoasting", dc, resource_group, script_params, targetUser)
 
     elif attack == "UserConstrainedDelegation":
         script_params = [
@@ -647,7 +614,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetUser:
             script_params.append({"name": "userForCDelegation", "value": targetUserForScript})
 
-        _execute_attack_on_vm("UserConstrainedDelegation", dc, resource_group, script_params, deploymentID, targetUser)
+        return _attack_request("UserConstrainedDelegation", dc, resource_group, script_params, targetUser)
 
     elif attack == "ComputerConstrainedDelegation":
         script_params = [
@@ -660,7 +627,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetBox:
             script_params.append({"name": "computerForCDelegation", "value": targetBox})
 
-        _execute_attack_on_vm("ComputerConstrainedDelegation", dc, resource_group, script_params, deploymentID, "", {"targetBox": targetBox})
+        return _attack_request("ComputerConstrainedDelegation", dc, resource_group, script_params, "", {"targetBox": targetBox})
 
     elif attack == "AddCredsForMimikatz":
         script_params = [
@@ -676,7 +643,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if singleUserPassword:
             script_params.append({"name": "singleUserPassword", "value": singleUserPassword})
 
-        _execute_attack_on_vm("AddCredsForMimikatz", dc, resource_group, script_params, deploymentID, targetUser, {"targetBox": targetBox})
+        return _attack_request("AddCredsForMimikatz", dc, resource_group, script_params, targetUser, {"targetBox": targetBox})
 
     elif attack == "LocalPrivesc1":
         script_params = [
@@ -688,7 +655,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetUser:
             script_params.append({"name": "targetUser", "value": targetUserForScript})
 
-        _execute_attack_on_vm("LocalPrivesc1", dc, resource_group, script_params, deploymentID, targetUser)
+        return _attack_request("LocalPrivesc1", dc, resource_group, script_params, targetUser)
 
     elif attack == "LocalPrivesc2":
         script_params = [
@@ -701,7 +668,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetUser:
             script_params.append({"name": "targetUser", "value": targetUserForScript})
 
-        _execute_attack_on_vm("LocalPrivesc2", dc, resource_group, script_params, deploymentID, targetUser)
+        return _attack_request("LocalPrivesc2", dc, resource_group, script_params, targetUser)
 
     elif attack == "LocalPrivesc3":
         script_params = [
@@ -714,7 +681,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         if targetUser:
             script_params.append({"name": "targetUser", "value": targetUserForScript})
 
-        _execute_attack_on_vm("LocalPrivesc3", dc, resource_group, script_params, deploymentID, targetUser)
+        return _attack_request("LocalPrivesc3", dc, resource_group, script_params, targetUser)
 
     elif attack == "ACLs":
         script_params = [
@@ -730,5 +697,7 @@ def attack_resolver(attack, deploymentID, domainAdminUsername, domainAdminPasswo
         script_params.append({"name": "PermissionType", "value": "GenericAll"})
 
         target_user_display = f"{grantingUser} -> {receivingUser}" if grantingUser and receivingUser else "ACLs"
-        _execute_attack_on_vm("ACLs", dc, resource_group, script_params, deploymentID, target_user_display)
+        return _attack_request("ACLs", dc, resource_group, script_params, target_user_display)
+
+    return None
     
\ No newline at end of file
@@ -21,18 +21,22 @@ from datetime import datetime
 from flask import Blueprint, request, jsonify
 
 from bloodhound.parser import BloodHoundParser
+from bloodhound.cache import ParsedDataCache, hash_file
 from bloodhound.mapper import TopologyConfig, map_bloodhound_to_autoinfra
+from bloodhound.reducer import ReductionConfig, reduce_bloodhound_data
+from bloodhound.session import pack_session_records, unpack_users, unpack_computers, session_counts
 import helpers
 import fs_manager
+from deployment_store import deployment_store
+from user_creation import user_creation_engine
+from topology_index import TopologyIndex
 from scenario_manager import ScenarioManager
-from azure_clients import AzureClients
-from azure.mgmt.compute.models import RunCommandInput
 
 bloodhound_apis_blueprint = Blueprint('bloodhound_apis', __name__)
 bloodhound_apis_blueprint.logger = logging.getLogger(helpers.LOGGER_NAME)
 
 scenario_manager = ScenarioManager()
-azure_clients = AzureClients()
+parsed_data_cache = ParsedDataCache(helpers.BLOODHOUND_CACHE_DIRECTORY, helpers.BLOODHOUND_CACHE_MEMORY_ENTRIES)
 
 ALLOWED_EXTENSIONS = {'zip'}
 
@@ -48,95 +52,6 @@ def secure_filename(filename: str) -> str:
     return filename or 'upload.zip'
 
 
-def _generate_batch_user_creation_script(users: list, domain_admin_upn: str, domain_admin_password: str, domain_name: str) -> str:
-    """
-    Generate a PowerShell script that creates multiple users in parallel within a single domain.
-    
-    This is much faster than running individual RunCommand calls for each user,
-    as each RunCommand has significant overhead (~30s+ per call).
-    
-    Args:
-        users: List of dicts with 'username' and 'password' keys
-        domain_admin_upn: The UPN of the domain admin (e.g., 'adadmin@contoso.local')
-        domain_admin_password: Password for domain admin
-        domain_name: Target domain for user creation (e.g., 'contoso.local')
-    
-    Returns:
-        PowerShell script string that creates all users
-    """
-    escaped_password = domain_admin_password.replace("'", "''").replace('"', '`"')
-    escaped_admin_upn = domain_admin_upn.replace("'", "''")
-    escaped_domain = domain_name.replace("'", "''")
-    
-    user_entries = []
-    for user in users:
-        username = user["username"].replace("'", "''")
-        user_password = user.get("password", "Password#123").replace("'", "''")
-        user_entries.append(f"@{{Username='{username}'; Password='{user_password}'}}")
-    
-    users_array = ",\n    ".join(user_entries)
-    
-    script = f'''
-$ErrorActionPreference = "Continue"
-$logFilePath = "C:\\Temp\\logfile.txt"
-
-$adminPassword = ConvertTo-SecureString '{escaped_password}' -AsPlainText -Force
-$domainAdminCreds = New-Object System.Management.Automation.PSCredential('{escaped_admin_upn}', $adminPassword)
-
-# Target domain
-$domainName = '{escaped_domain}'
-
-$usersToCreate = @(
-    {users_array}
-)
-
-Write-Output "Starting batch user creation for $($usersToCreate.Count) users on domain $domainName"
-Add-Content -Path $logFilePath -Value "BatchUserCreation: Starting creation of $($usersToCreate.Count) users on $domainName"
-
-$jobs = @()
-foreach ($userInfo in $usersToCreate) {{
-    $username = $userInfo.Username
-    $userPassword = $userInfo.Password
-    $upn = "$username@$domainName"
-    $description = 'BloodHound Import User'
-    
-    try {{
-        $existingUser = Get-ADUser -Filter "SamAccountName -eq '$username'" -Credential $domainAdminCreds -ErrorAction SilentlyContinue
-        if ($existingUser) {{
-            $msg = "User $username already exists in $domainName"
-            Write-Output $msg
-            Add-Content -Path $logFilePath -Value $msg
-            continue
-        }}
-        
-        $secureUserPassword = ConvertTo-SecureString $userPassword -AsPlainText -Force
-        New-ADUser -Name $username `
-                   -SamAccountName $username `
-                   -Surname $username `
-                   -Enabled $true `
-                   -AccountPassword $secureUserPassword `
-                   -UserPrincipalName $upn `
-                   -Description $description `
-                   -Credential $domainAdminCreds `
-                   -ErrorAction Stop
-        
-        $successMsg = "Successfully created user: $username"
-        Write-Output $successMsg
-        Add-Content -Path $logFilePath -Value "BatchUserCreation: $successMsg"
-    }}
-    catch {{
-        $errorMsg = "Error creating user $username : $_"
-        Write-Output $errorMsg
-        Add-Content -Path $logFilePath -Value "BatchUserCreation: $errorMsg"
-    }}
-}}
-
-Write-Output "Batch user creation complete"
-Add-Content -Path $logFilePath -Value "BatchUserCreation: Complete"
-'''
-    return script
-
-
 @bloodhound_apis_blueprint.route("/bloodhound/upload", methods=["POST"])
 def upload_bloodhound():
     """
@@ -168,38 +83,25 @@ def upload_bloodhound():
         
         # Parse the BloodHound data
         parser = BloodHoundParser()
-        bh_data = parser.parse_zip(temp_path)
+        bh_data = parser.parse_zip(temp_path, workers=helpers.BLOODHOUND_PARSE_WORKERS)
         
         attack_summary = parser.get_attack_summary()
         domain_info = parser.get_domain_info()
         
         upload_id = str(uuid.uuid4())[:8]
         
+        # Keep the parse result so generate-topology never has to parse this zip again
+        content_hash = hash_file(temp_path)
+        parsed_data_cache.put(upload_id, content_hash, bh_data)
+        
+        # Users and computers are stored as compact rows (see bloodhound.session)
         parsed_data = {
             "upload_id": upload_id,
             "domain": domain_info,
-            "computers": [
-                {
-                    "name": c.name,
-                    "is_dc": c.is_domain_controller,
-                    "os": c.os,
-                    "unconstrained_delegation": c.unconstraineddelegation
-                }
-                for c in bh_data.computers
-            ],
-            "users": [
-                {
-                    "username": u.samaccountname,
-                    "name": u.name,
-                    "enabled": u.enabled,
-                    "dontreqpreauth": u.dontreqpreauth,
-                    "hasspn": u.hasspn,
-                    "admincount": u.admincount
-                }
-                for u in bh_data.users
-            ],
+            **pack_session_records(bh_data),
             "attack_summary": attack_summary,
-            "temp_path": temp_path
+            "temp_path": temp_path,
+            "content_hash": content_hash
         }
         
         fs_manager.save_file(parsed_data, helpers.DEPLOYMENT_DIRECTORY, f"bh-{upload_id}")
@@ -208,13 +110,7 @@ def upload_bloodhound():
             "success": True,
             "upload_id": upload_id,
             "domain": domain_info,
-            "summary": {
-                "total_computers": len(bh_data.computers),
-                "domain_controllers": sum(1 for c in bh_data.computers if c.is_domain_controller),
-                "workstations": sum(1 for c in bh_data.computers if not c.is_domain_controller),
-                "total_users": len(bh_data.users),
-                "enabled_users": sum(1 for u in bh_data.users if u.enabled)
-            },
+            "summary": session_counts(parsed_data),
             "attack_paths": {
                 "asrep_roastable": attack_summary.get('asrep_roastable', []),
                 "kerberoastable": attack_summary.get('kerberoastable', []),
@@ -245,9 +141,19 @@ def generate_topology_from_bloodhound():
                 "admin_password": "P@ssw0rd123!",
                 "include_all_machines": true,
                 "include_jumpbox": true,
-                "max_workstations": 10
+                "max_workstations": 10,
+                "reduce": true,
+                "noise_users": 25,
+                "noise_computers": 10,
+                "seed": 0
             }
         }
+    
+    When "reduce" is true, the parsed data is first reduced to the objects
+    on detected attack paths plus a seeded sample of noise users/computers
+    (see bloodhound.reducer). When it is omitted, exports with at least
+    BLOODHOUND_REDUCE_MIN_COMPUTERS computers are reduced and smaller ones
+    are imported in full.
     """
     try:
         data = request.get_json()
@@ -265,12 +171,30 @@ def generate_topology_from_bloodhound():
             return jsonify({"error": f"Upload not found: {upload_id}"}), 404
         
         temp_path = bh_file.get("temp_path")
-        if not temp_path or not os.path.exists(temp_path):
-            return jsonify({"error": "BloodHound data expired, please re-upload"}), 404
+        content_hash = bh_file.get("content_hash")
+        bh_data = parsed_data_cache.get(upload_id, content_hash) if content_hash else None
         
-        # Re-parse the BloodHound data
-        parser = BloodHoundParser()
-        bh_data = parser.parse_zip(temp_path)
+        if bh_data is None:
+            # Uploads from before the cache existed, or a cache file that was cleaned up
+            if not temp_path or not os.path.exists(temp_path):
+                return jsonify({"error": "BloodHound data expired, please re-upload"}), 404
+            
+            bloodhound_apis_blueprint.logger.info(f"BLOODHOUND_GENERATE: No cached parse for {upload_id}, parsing {temp_path}")
+            content_hash = content_hash or hash_file(temp_path)
+            bh_data = parsed_data_cache.get_or_parse(upload_id, content_hash, lambda: BloodHoundParser().parse_zip(temp_path, workers=helpers.BLOODHOUND_PARSE_WORKERS))
+            bh_file["content_hash"] = content_hash
+        
+        total_users, total_computers = len(bh_data.users), len(bh_data.computers)
+        reduce = options.get("reduce")
+        if reduce is None:
+            reduce = total_computers >= helpers.BLOODHOUND_REDUCE_MIN_COMPUTERS
+        if reduce:
+            bloodhound_apis_blueprint.logger.info(f"BLOODHOUND_GENERATE: Reducing {total_users} users and {total_computers} computers to attack paths")
+            bh_data = reduce_bloodhound_data(bh_data, ReductionConfig(
+                noise_users=options.get("noise_users", 25),
+                noise_computers=options.get("noise_computers", 10),
+                seed=options.get("seed", 0)
+            ))
         
         # Configure topology
         config = TopologyConfig(
@@ -282,6 +206,8 @@ def generate_topology_from_bloodhound():
         )
         
         autoinfra_config = map_bloodhound_to_autoinfra(bh_data, config)
+        autoinfra_config["summary"]["total_users"] = total_users
+        autoinfra_config["summary"]["total_computers"] = total_computers
         
         bh_file["autoinfra_config"] = autoinfra_config
         bh_file["options"] = options
@@ -508,10 +434,11 @@ def configure_bloodhound_users():
                 "message": "No users to create"
             }), 200
         
-        enterprise_admin_username = scenario_manager.get_parameter("enterpriseAdminUsername", deployment_id)
-        enterprise_admin_password = scenario_manager.get_parameter("enterpriseAdminPassword", deployment_id)
-        root_domain_name = scenario_manager.get_parameter("rootDomainName", deployment_id)
-        root_dc = scenario_manager.get_parameter("rootDCName", deployment_id)
+        params = scenario_manager.get_parameters(deployment_id)
+        enterprise_admin_username = params.admin_username
+        enterprise_admin_password = params.admin_password
+        root_domain_name = params.root_domain
+        root_dc = params.root_dc
         
         # Debug: Log retrieved parameters
         bloodhound_apis_blueprint.logger.info(
@@ -519,33 +446,16 @@ def configure_bloodhound_users():
             f"domain='{root_domain_name}', dc='{root_dc}', password_set={bool(enterprise_admin_password)}"
         )
         
-        # Build domain-to-DC mapping from topology (for multi-domain support)
-        topology = autoinfra_config.get("topology", {})
-        domain_to_dc = {}
-        
-        for node in topology.get("nodes", []):
-            if node.get("type") == "domainController":
-                node_data = node.get("data", {})
-                domain_name = node_data.get("domainName", "").lower()
-                dc_name = node_data.get("domainControllerName", "")
-                if domain_name and dc_name:
-                    domain_to_dc[domain_name] = dc_name
-        
-        if not domain_to_dc:
-            domain_to_dc[root_domain_name.lower()] = root_dc
+        # Index the generated topology for domain-to-DC lookups (for multi-domain support)
+        topology_index = TopologyIndex(autoinfra_config.get("topology") or {})
         
         bloodhound_apis_blueprint.logger.info(
-            f"BLOODHOUND_USERS: Domain-to-DC mapping: {domain_to_dc}"
+            f"BLOODHOUND_USERS: Domain-to-DC mapping: {topology_index.domain_to_dc or {root_domain_name.lower(): root_dc}}"
         )
         bloodhound_apis_blueprint.logger.info(
             f"BLOODHOUND_USERS: Creating {len(users_to_create)} users"
         )
         
-        compute_client = azure_clients.get_compute_client()
-        
-        users_created = []
-        users_failed = []
-        
         # Group users by their target domain for batch creation
         users_by_domain = {}
         default_password = "Password#123"
@@ -568,17 +478,9 @@ def configure_bloodhound_users():
             dc_to_use = root_dc
             domain_to_use = root_domain_name
             
-            if user_domain:
-                user_domain_lower = user_domain.lower()
-                if user_domain_lower in domain_to_dc:
-                    dc_to_use = domain_to_dc[user_domain_lower]
-                    domain_to_use = user_domain_lower
-                else:
-                    for domain, dc in domain_to_dc.items():
-                        if user_domain_lower in domain or domain in user_domain_lower:
-                            dc_to_use = dc
-                            domain_to_use = domain
-                            break
+            match = topology_index.match_domain(user_domain) if user_domain else None
+            if match:
+                domain_to_use, dc_to_use = match
             
             # Group by domain
             if domain_to_use not in users_by_domain:
@@ -595,96 +497,25 @@ def configure_bloodhound_users():
             f"BLOODHOUND_USERS: Grouped users by domain: {[(d, len(info['users'])) for d, info in users_by_domain.items()]}"
         )
         
-        # Sort domains: root domain first, then children (alphabetically)
+        # Sort domains: root domain first, then children (alphabetically), so chunks are dispatched in that order
         sorted_domains = sorted(users_by_domain.keys(), 
                                key=lambda d: (0 if d.lower() == root_domain_name.lower() else 1, d))
+        users_by_domain = {domain: users_by_domain[domain] for domain in sorted_domains}
         
         # Always use root domain admin for authentication (Enterprise Admin has rights to all child domains)
-        domain_admin_username = f"{enterprise_admin_username}@{root_domain_name}"
+        domain_admin_username = params.admin_upn
         
-        # Process each domain sequentially, but create all users in that domain in parallel (batch)
-        for domain_name in sorted_domains:
-            domain_info = users_by_domain[domain_name]
-            dc_to_use = domain_info["dc"]
-            domain_users = domain_info["users"]
-            
-            bloodhound_apis_blueprint.logger.info(
-                f"BLOODHOUND_USERS: Creating {len(domain_users)} users on domain '{domain_name}' via DC '{dc_to_use}'"
-            )
-            
-            # Build a batch PowerShell script that creates all users for this domain
-            batch_script = _generate_batch_user_creation_script(
-                domain_users, 
-                domain_admin_username, 
-                enterprise_admin_password, 
-                domain_name
-            )
-            
-            try:
-                execute_params = RunCommandInput(
-                    command_id='RunPowerShellScript',
-                    script=[batch_script]
-                )
-                
-                poller = compute_client.virtual_machines.begin_run_command(
-                    resource_group_name=deployment_id,
-                    vm_name=dc_to_use,
-                    parameters=execute_params
-                )
-                result = poller.result()
-                
-                output_messages = []
-                if result.value:
-                    for item in result.value:
-                        if item.message:
-                            output_messages.append(item.message)
-                output = '\n'.join(output_messages)
-                
-                bloodhound_apis_blueprint.logger.info(
-                    f"BLOODHOUND_USERS: Batch result for {domain_name}: {output[:500]}"
-                )
-                
-                # Parse output to determine success/failure for each user
-                for user_info in domain_users:
-                    username = user_info["username"]
-                    if f"Successfully created user: {username}" in output:
-                        users_created.append(username)
-                        bloodhound_apis_blueprint.logger.info(f"BLOODHOUND_USERS: Created {username}")
-                    elif f"already exists" in output and username in output:
-                        users_created.append(username)
-                        bloodhound_apis_blueprint.logger.info(f"BLOODHOUND_USERS: User {username} already exists")
-                    elif f"Error creating user {username}" in output:
-                        error_line = [line for line in output.split('\n') if f"Error creating user {username}" in line]
-                        error_msg = error_line[0][:200] if error_line else "Unknown error"
-                        users_failed.append({"username": username, "domain": domain_name, "error": error_msg})
-                        bloodhound_apis_blueprint.logger.warning(f"BLOODHOUND_USERS: Failed to create {username}")
-                    else:
-                        users_created.append(username)
-                        
-            except Exception as e:
-                bloodhound_apis_blueprint.logger.error(f"BLOODHOUND_USERS: Error on domain {domain_name}: {e}")
-                for user_info in domain_users:
-                    users_failed.append({"username": user_info["username"], "domain": domain_name, "error": str(e)})
+        # Size-bounded chunks, run concurrently across DCs (see user_creation.py)
+        created, users_failed = user_creation_engine.execute(
+            deployment_id, users_by_domain, domain_admin_username, enterprise_admin_password
+        )
+        users_created = [user["username"] for user in created]
         
         try:
-            deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment_id)
-            # Format users as objects with domain info for frontend compatibility
-            formatted_users = []
-            for username in users_created:
-                # Try to find which domain this user belongs to
-                user_domain = root_domain_name  # default
-                for domain_name, info in users_by_domain.items():
-                    if username in [u["username"] for u in info["users"]]:
-                        user_domain = domain_name
-                        break
-                
-                formatted_users.append({
-                    "username": username,
-                    "domain": user_domain
-                })
-            
-            deployment['users'] = deployment.get('users', []) + formatted_users
-            fs_manager.save_file(deployment, helpers.DEPLOYMENT_DIRECTORY, deployment_id)
+            # Users as objects with domain info for frontend compatibility
+            with deployment_store.update(deployment_id) as deployment:
+                if "ERROR" not in deployment:
+                    deployment['users'] = deployment.get('users', []) + created
         except Exception as e:
             bloodhound_apis_blueprint.logger.warning(f"BLOODHOUND_USERS: Could not update deployment: {e}")
         
@@ -761,38 +592,26 @@ def configure_bloodhound_attacks():
                 "message": "No attacks to enable"
             }), 200
         
-        enterprise_admin_username = scenario_manager.get_parameter("enterpriseAdminUsername", deployment_id)
-        enterprise_admin_password = scenario_manager.get_parameter("enterpriseAdminPassword", deployment_id)
-        root_domain_name = scenario_manager.get_parameter("rootDomainName", deployment_id)
-        root_dc = scenario_manager.get_parameter("rootDCName", deployment_id)
+        params = scenario_manager.get_parameters(deployment_id)
+        enterprise_admin_password = params.admin_password
+        root_domain_name = params.root_domain
+        root_dc = params.root_dc
         
-        # Build domain-to-DC mapping from topology
+        # Index the generated topology for domain-to-DC lookups
         # This allows attacks to be routed to the correct DC for multi-domain scenarios
-        topology = autoinfra_config.get("topology", {})
-        domain_to_dc = {}
-        
-        for node in topology.get("nodes", []):
-            if node.get("type") == "domainController":
-                node_data = node.get("data", {})
-                domain_name = node_data.get("domainName", "").lower()
-                dc_name = node_data.get("domainControllerName", "")
-                if domain_name and dc_name:
-                    domain_to_dc[domain_name] = dc_name
-                    bloodhound_apis_blueprint.logger.debug(
-                        f"BLOODHOUND_ATTACKS: Mapped domain '{domain_name}' -> DC '{dc_name}'"
-                    )
-        
-        if not domain_to_dc:
-            domain_to_dc[root_domain_name.lower()] = root_dc
+        topology_index = TopologyIndex(autoinfra_config.get("topology") or {})
         
         bloodhound_apis_blueprint.logger.info(
-            f"BLOODHOUND_ATTACKS: Domain-to-DC mapping: {domain_to_dc}"
+            f"BLOODHOUND_ATTACKS: Domain-to-DC mapping: {topology_index.domain_to_dc or {root_domain_name.lower(): root_dc}}"
         )
         
         attacks_enabled = {}
         attacks_failed = []
         
-        from apis.attack_apis import attack_resolver
+        from apis.attack_apis import build_attack_request
+        from attack_engine import attack_engine
+
+        attack_requests = []
         
         # NOTE: attacks dict already uses AutoInfra attack names (ASREPRoasting, Kerberoasting, etc.)
         for attack_type, targets in attacks.items():
@@ -835,19 +654,12 @@ def configure_bloodhound_attacks():
                 dc_to_use = root_dc
                 domain_to_use = root_domain_name
                 
-                if target_domain:
-                    if target_domain in domain_to_dc:
-                        dc_to_use = domain_to_dc[target_domain]
-                        domain_to_use = target_domain
-                    else:
-                        for domain, dc in domain_to_dc.items():
-                            if target_domain in domain or domain in target_domain:
-                                dc_to_use = dc
-                                domain_to_use = domain
-                                break
+                match = topology_index.match_domain(target_domain) if target_domain else None
+                if match:
+                    domain_to_use, dc_to_use = match
                 
                 # Always use root domain for admin credentials (Enterprise Admin)
-                domain_admin_username = f"{enterprise_admin_username}@{root_domain_name}"
+                domain_admin_username = params.admin_upn
                 
                 bloodhound_apis_blueprint.logger.info(
                     f"BLOODHOUND_ATTACKS: Enabling {attack_type} for user '{target_user}' "
@@ -855,7 +667,7 @@ def configure_bloodhound_attacks():
                 )
                 
                 try:
-                    attack_resolver(
+                    attack_request = build_attack_request(
                         attack=attack_type,
                         deploymentID=deployment_id,
                         domainAdminUsername=domain_admin_username,
@@ -868,37 +680,28 @@ def configure_bloodhound_attacks():
                         grantingUser=granting_user,
                         receivingUser=receiving_user
                     )
-                    attacks_enabled[attack_type].append(target_user)
+                    attack_requests.append((attack_request, target_user))
                 except Exception as e:
                     bloodhound_apis_blueprint.logger.error(
-                        f"BLOODHOUND_ATTACKS: Error enabling {attack_type} for {target_user}: {e}"
+                        f"BLOODHOUND_ATTACKS: Error preparing {attack_type} for {target_user}: {e}"
                     )
                     attacks_failed.append({"attack": attack_type, "user": target_user, "error": str(e)})
         
-        deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment_id)
-        attack_operations = deployment.get("attackOperations", {})
-        attacks_in_progress = deployment.get("attacksInProgress", {})
-        
-        for operation_id, op_info in attack_operations.items():
-            if op_info.get("status") == "InProgress":
-                op_attack_type = op_info.get("attackType")
-                if op_attack_type:
-                    if op_attack_type not in attacks_in_progress:
-                        attacks_in_progress[op_attack_type] = []
-                    
-                    instance_info = {
-                        "operationId": operation_id,
-                        "targetUser": op_info.get("targetUser"),
-                        "targetBox": op_info.get("targetBox"),
-                        "timestamp": op_info.get("timestamp")
-                    }
-                    
-                    if not any(inst.get("operationId") == operation_id for inst in attacks_in_progress[op_attack_type]):
-                        attacks_in_progress[op_attack_type].append(instance_info)
-        
-        deployment["attacksInProgress"] = attacks_in_progress
-        fs_manager.save_file(deployment, helpers.DEPLOYMENT_DIRECTORY, deployment_id)
-        bloodhound_apis_blueprint.logger.info(f"BLOODHOUND_ATTACKS: Updated attacksInProgress with {len(attack_operations)} operations")
+        # One engine run for every target: attacks on the same DC share run commands,
+        # DCs are handled in parallel and attackOperations is written once
+        results = attack_engine.execute(deployment_id, [attack_request for attack_request, _ in attack_requests])
+        target_users = {id(attack_request): target_user for attack_request, target_user in attack_requests}
+        for result in results:
+            attack_type = result["request"]["attackType"]
+            target_user = target_users[id(result["request"])]
+            if "error" in result:
+                bloodhound_apis_blueprint.logger.error(
+                    f"BLOODHOUND_ATTACKS: Error enabling {attack_type} for {target_user}: {result['error']}"
+                )
+                attacks_failed.append({"attack": attack_type, "user": target_user, "error": result["error"]})
+            else:
+                attacks_enabled[attack_type].append(target_user)
+        bloodhound_apis_blueprint.logger.info(f"BLOODHOUND_ATTACKS: Started {sum(1 for result in results if 'error' not in result)} attack operation(s)")
         
         bh_file["attacks_enabled"] = attacks_enabled
         bh_file["attacks_failed"] = attacks_failed
@@ -939,8 +742,8 @@ def preview_bloodhound_import(upload_id: str):
             "success": True,
             "upload_id": upload_id,
             "domain": bh_file.get("domain"),
-            "computers": bh_file.get("computers", []),
-            "users": bh_file.get("users", []),
+            "computers": unpack_computers(bh_file),
+            "users": unpack_users(bh_file),
             "attack_summary": bh_file.get("attack_summary", {}),
             "autoinfra_config": bh_file.get("autoinfra_config"),
             "deploymentID": bh_file.get("deploymentID"),
@@ -969,21 +772,7 @@ def get_active_bloodhound_session():
     Returns the session data needed to restore the frontend state.
     """
     try:
-        import glob
-        
-        deployment_dir = helpers.DEPLOYMENT_DIRECTORY
-        bh_files = []
-        
-        if os.path.exists(deployment_dir):
-            for filename in os.listdir(deployment_dir):
-                if filename.startswith("bh-") and filename.endswith(".json"):
-                    upload_id = filename[3:-5]  # Remove "bh-" prefix and ".json" suffix
-                    try:
-                        bh_file = fs_manager.load_file(deployment_dir, f"bh-{upload_id}")
-                        if "ERROR" not in str(bh_file):
-                            bh_files.append((upload_id, bh_file))
-                    except:
-                        pass
+        bh_files = deployment_store.list_bloodhound_sessions()
         
         if not bh_files:
             return jsonify({"success": True, "active_session": None}), 200
@@ -1002,8 +791,7 @@ def get_active_bloodhound_session():
                 
                 if deployment_id:
                     try:
-                        deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment_id)
-                        deploy_status = deployment.get("status", "unknown")
+                        deploy_status = deployment_store.get_attribute(deployment_id, "status", "unknown")
                     except:
                         deploy_status = "unknown"
                     
@@ -1028,13 +816,7 @@ def get_active_bloodhound_session():
                 "deploymentID": deployment_id,
                 "deploy_status": deploy_status,
                 "domain": bh_file.get("domain"),
-                "summary": {
-                    "total_computers": len(bh_file.get("computers", [])),
-                    "domain_controllers": sum(1 for c in bh_file.get("computers", []) if c.get("is_dc")),
-                    "workstations": sum(1 for c in bh_file.get("computers", []) if not c.get("is_dc")),
-                    "total_users": len(bh_file.get("users", [])),
-                    "enabled_users": sum(1 for u in bh_file.get("users", []) if u.get("enabled"))
-                },
+                "summary": session_counts(bh_file),
                 "attack_paths": bh_file.get("attack_summary", {}),
                 "topology": autoinfra_config.get("topology") if autoinfra_config else None,
                 "users": autoinfra_config.get("users") if autoinfra_config else None,
@@ -1062,10 +844,9 @@ def clear_bloodhound_session(upload_id: str):
     Allows user to start fresh by removing an existing session.
     """
     try:
-        bh_file_path = os.path.join(helpers.DEPLOYMENT_DIRECTORY, f"bh-{upload_id}.json")
-        
-        if os.path.exists(bh_file_path):
-            os.remove(bh_file_path)
+        if fs_manager.file_exists(helpers.DEPLOYMENT_DIRECTORY, f"bh-{upload_id}"):
+            fs_manager.delete_file(helpers.DEPLOYMENT_DIRECTORY, f"bh-{upload_id}")
+            parsed_data_cache.delete(upload_id)
             bloodhound_apis_blueprint.logger.info(f"BLOODHOUND_CLEAR: Cleared session {upload_id}")
             return jsonify({"success": True, "message": f"Session {upload_id} cleared"}), 200
         else:
@@ -1090,8 +871,7 @@ def get_bloodhound_status(upload_id: str):
         
         if deployment_id:
             try:
-                deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment_id)
-                deploy_status = deployment.get("status", "unknown")
+                deploy_status = deployment_store.get_attribute(deployment_id, "status", "unknown")
             except:
                 deploy_status = "unknown"
         
@@ -8,7 +8,8 @@ from azure_clients import AzureClients
 from deployments import Deployments
 import helpers
 import fs_manager
-import command_runner
+from bicep_compiler import bicep_compiler
+from topology_index import TopologyIndex
 from azure.mgmt.resource.resources.models import Deployment, DeploymentProperties, DeploymentMode
 import logging
 
@@ -154,9 +155,10 @@ def build():
     build_apis_blueprint.logger.info(f"BUILD: Received topology: {topology}")
 
     try:
-        nodes = topology.get("nodes", [])
-        edges = topology.get("edges", [])
-        jumpbox_node = next((node for node in nodes if node["type"] == "jumpbox"), None)
+        topology_index = TopologyIndex(topology)
+        nodes = topology_index.nodes
+        edges = topology_index.edges
+        jumpbox_node = next(iter(topology_index.nodes_by_type.get("jumpbox", [])), None)
         
         has_public_ip_node = any(
             node.get("data", {}).get("hasPublicIP", False) 
@@ -178,13 +180,13 @@ def build():
         if jumpbox_node:
             for edge in edges:
                 if edge["source"] == jumpbox_node["id"]:
-                    connected_node = next(node for node in nodes if node["id"] == edge["target"])
+                    connected_node = topology_index.nodes_by_id[edge["target"]]
                     jumpbox_connections.append({
                         "jumpboxPrivateIPAddress": jumpbox_node["data"]["privateIPAddress"],
                         "connectedPrivateIPAddress": connected_node["data"]["privateIPAddress"]
                     })
                 elif edge["target"] == jumpbox_node["id"]:
-                    connected_node = next(node for node in nodes if node["id"] == edge["source"])
+                    connected_node = topology_index.nodes_by_id[edge["source"]]
                     jumpbox_connections.append({
                         "jumpboxPrivateIPAddress": jumpbox_node["data"]["privateIPAddress"],
                         "connectedPrivateIPAddress": connected_node["data"]["privateIPAddress"]
@@ -217,8 +219,8 @@ def build():
             }
         }
 
-        node_map = {node["id"]: node for node in topology.get("nodes", [])}
-        child_to_parent = {edge["target"]: edge["source"] for edge in topology.get("edges", [])}
+        node_map = topology_index.nodes_by_id
+        child_to_parent = topology_index.parent_of
 
         for node in topology["nodes"]:
             node_type = node.get("type")
@@ -727,17 +729,15 @@ module CA_{i} '../base/CertificateAuthority.bicep' = {{
         build_apis_blueprint.logger.info("BUILD: Compiling ScenarioManager.bicep with generated modules...")
         bicep_path = helpers.SCENARIO_MANAGER_BICEP
         json_path = helpers.SCENARIO_MANAGER_JSON
-        compile_command = ["az", "bicep", "build", "--file", bicep_path, "--outfile", json_path]
-        compile_output = command_runner.run_command_and_read_output(compile_command)
-        build_apis_blueprint.logger.info(f"BUILD: Bicep compilation output: {compile_output}")
-        compile_exit_code = command_runner.run_command_and_get_exit_code(compile_command)
-        if compile_exit_code != 0:
-            build_apis_blueprint.logger.error(f"BUILD: Bicep compilation failed with exit code {compile_exit_code}")
-            build_apis_blueprint.logger.error(f"BUILD: Compilation output: {compile_output}")
-            return jsonify({"message": f"Failed to compile infrastructure template: {compile_output}"}), 500
-        build_apis_blueprint.logger.info("BUILD: ScenarioManager.bicep compiled successfully")
-
-        template = fs_manager.load_file(helpers.TEMPLATE_DIRECTORY, "ScenarioManager.json")
+        compiled = bicep_compiler.compile(bicep_path, json_path)
+        build_apis_blueprint.logger.info(f"BUILD: Bicep compilation output: {compiled.output}")
+        if compiled.exit_code != 0:
+            build_apis_blueprint.logger.error(f"BUILD: Bicep compilation failed with exit code {compiled.exit_code}")
+            build_apis_blueprint.logger.error(f"BUILD: Compilation output: {compiled.output}")
+            return jsonify({"message": f"Failed to compile infrastructure template: {compiled.output}"}), 500
+        build_apis_blueprint.logger.info(f"BUILD: ScenarioManager.bicep compiled successfully{' (cached)' if compiled.cached else ''}")
+
+        template = compiled.template
 
         # Use the dynamically created parameters instead of loading from file
         # This way the file can remain clean (with empty subscription ID) for version control
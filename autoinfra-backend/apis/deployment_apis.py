@@ -1,13 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from azure_clients import AzureClients
 from deployments import Deployments
 import helpers
 import fs_manager
-import command_runner
+from deployment_store import deployment_store
+from azure_gateway import azure_gateway
+from operation_scheduler import operation_scheduler
+from deployment_state_cache import DeploymentStateCache
+from script_results import iter_results, powershell_functions
 import logging
-import threading
 import os
 import json
+import queue
 
 deployment_apis_blueprint = Blueprint('deployment_apis', __name__)
 azure_clients = AzureClients()
@@ -39,15 +43,13 @@ def cleanup_update_files(deployment_id):
     except Exception as e:
         deployment_apis_blueprint.logger.warning(f"CLEANUP: Error cleaning up update files for {deployment_id}: {e}")
 
-@deployment_apis_blueprint.route('/getDeploymentState', methods=['POST'])
-def get_deployment_state():
+def resolve_deployment_state(deploymentID):
+    """
+    Query ARM for the deployment's current state and return (body, status).
+    Called by the deployment state reconciler, not per request. Read-only:
+    apply_deployment_state_change acts on the state once it changes.
+    """
     try:
-        data = request.get_json()
-        deploymentID = data.get('deploymentID')
-        
-        if not deploymentID or deploymentID in ["undefined", "false", "null"]:
-            return jsonify({"message": "No deployment"}), 404
-        
         resource_client = azure_clients.get_resource_client()
         
         subscription_deployment_running = False
@@ -89,40 +91,40 @@ def get_deployment_state():
                         except:
                             pass
 
-                        return jsonify({
+                        return {
                             "message": "shutting down",
                             "error": error_message,
                             "details": {"failed": failed_deployments}
-                        }), 200
+                        }, 200
                 except:
                     pass
 
-                return jsonify({"message": "shutting down"}), 200
+                return {"message": "shutting down"}, 200
 
         except Exception as e:
             deployment_apis_blueprint.logger.debug(f"GET_DEPLOYMENT_STATE: Resource group {deploymentID} not found or inaccessible: {str(e)}")
             if subscription_deployment_running:
-                return jsonify({
+                return {
                     "message": "deploying", 
                     "details": {"running": ["Creating resource group..."], "succeeded": []}
-                }), 200
-            return jsonify({"message": "Resource group not found"}), 404
+                }, 200
+            return {"message": "Resource group not found"}, 404
         
         deployments = list(resource_client.deployments.list_by_resource_group(deploymentID))
         
         if not deployments:
             if deploymentID.startswith(helpers.BUILD_LAB_PREFIX):
                 if subscription_deployment_running:
-                    return jsonify({
+                    return {
                         "message": "deploying", 
                         "details": {"running": ["Initializing modules..."], "succeeded": []}
-                    }), 200
+                    }, 200
                 elif subscription_deployment_failed:
-                    return jsonify({
+                    return {
                         "message": "failed", 
                         "details": {"failed": [deploymentID], "succeeded": [], "running": []}
-                    }), 200
-            return jsonify({"message": "No deployments found for that resource group."}), 404
+                    }, 200
+            return {"message": "No deployments found for that resource group."}, 404
         
         failed_deployments = []
         succeeded_deployments = []
@@ -150,15 +152,7 @@ def get_deployment_state():
             except Exception as e:
                 deployment_apis_blueprint.logger.warning(f"GET_DEPLOYMENT_STATE: Could not get error details: {e}")
 
-            if deploymentID.startswith(helpers.BUILD_LAB_PREFIX):
-                deployment_apis_blueprint.logger.info(f"GET_DEPLOYMENT_STATE: Build failed, triggering automatic deletion of {deploymentID}")
-                try:
-                    deployment_handler.destroy_deployment(deploymentID)
-                except Exception as delete_error:
-                    deployment_apis_blueprint.logger.error(f"GET_DEPLOYMENT_STATE: Error triggering deletion: {delete_error}")
-
-            cleanup_update_files(deploymentID)
-            return jsonify({
+            return {
                 "message": "failed",
                 "error": error_message,
                 "details": {
@@ -166,41 +160,112 @@ def get_deployment_state():
                     "succeeded": succeeded_deployments,
                     "running": running_deployments
                 }
-            }), 200
+            }, 200
         elif running_deployments:
             deployment_apis_blueprint.logger.info(f"GET_DEPLOYMENT_STATE:Deployments still running in {deploymentID}: {running_deployments}")
-            return jsonify({"message": "deploying", "details": {"running": running_deployments, "succeeded": succeeded_deployments}}), 200
+            return {"message": "deploying", "details": {"running": running_deployments, "succeeded": succeeded_deployments}}, 200
         elif subscription_deployment_running:
             deployment_apis_blueprint.logger.info(f"GET_DEPLOYMENT_STATE: RG deployments done but subscription deployment still running for {deploymentID}")
-            return jsonify({"message": "deploying", "details": {"running": ["Finalizing..."], "succeeded": succeeded_deployments}}), 200
+            return {"message": "deploying", "details": {"running": ["Finalizing..."], "succeeded": succeeded_deployments}}, 200
         else:
-            # This ensures newly deployed nodes with public IPs are captured
-            try:
-                deployment_handler.get_deployment_ip(deploymentID)
-            except Exception as ip_error:
-                deployment_apis_blueprint.logger.warning(f"GET_DEPLOYMENT_STATE: Could not refresh entry IPs: {ip_error}")
+            deployment_apis_blueprint.logger.info(f"GET_DEPLOYMENT_STATE: All deployments succeeded in {deploymentID}")
+            return {"message": "deployed", "details": {"succeeded": succeeded_deployments}}, 200
+            
+    except Exception as e:
+        deployment_apis_blueprint.logger.error(f"GET_DEPLOYMENT_STATE: Error checking state for {deploymentID}: {str(e)}")
+        return {"message": str(e)}, 500
+
 
-            cleanup_update_files(deploymentID)
+def apply_deployment_state_change(deploymentID, previous, entry):
+    """
+    Act on a deployment reaching "failed" or "deployed". Called by the state
+    reconciler when the resolved message differs from the previous one, so
+    each step runs once per transition instead of on every refresh.
+    """
+    message = entry["body"].get("message")
+    if previous is not None and previous["body"].get("message") == message:
+        return
 
+    if message == "failed":
+        if deploymentID.startswith(helpers.BUILD_LAB_PREFIX):
+            deployment_apis_blueprint.logger.info(f"GET_DEPLOYMENT_STATE: Build failed, triggering automatic deletion of {deploymentID}")
             try:
-                deployment_file = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
-                current_timeout = deployment_file.get("timeout", 0)
+                deployment_handler.destroy_deployment(deploymentID)
+            except Exception as delete_error:
+                deployment_apis_blueprint.logger.error(f"GET_DEPLOYMENT_STATE: Error triggering deletion: {delete_error}")
 
-                if current_timeout == 0:
-                    new_timeout = helpers.get_future_time(helpers.DEPLOYMENT_TIMEOUT_HOURS)
-                    deployment_handler.set_deployment_attribute(deploymentID, "timeout", new_timeout)
-                    helpers.update_expiry_tag(new_timeout, deploymentID)
-                    deployment_apis_blueprint.logger.info(f"GET_DEPLOYMENT_STATE: Set timeout to 2 hours from completion for {deploymentID}")
-            except Exception as timeout_error:
-                deployment_apis_blueprint.logger.warning(f"GET_DEPLOYMENT_STATE: Could not set timeout: {timeout_error}")
+        cleanup_update_files(deploymentID)
+
+    elif message == "deployed":
+        # This ensures newly deployed nodes with public IPs are captured
+        try:
+            deployment_handler.get_deployment_ip(deploymentID)
+        except Exception as ip_error:
+            deployment_apis_blueprint.logger.warning(f"GET_DEPLOYMENT_STATE: Could not refresh entry IPs: {ip_error}")
+
+        cleanup_update_files(deploymentID)
+
+        try:
+            current_timeout = deployment_store.get_attribute(deploymentID, "timeout", 0)
+
+            if current_timeout == 0:
+                new_timeout = helpers.get_future_time(helpers.DEPLOYMENT_TIMEOUT_HOURS)
+                deployment_handler.set_deployment_attribute(deploymentID, "timeout", new_timeout)
+                helpers.update_expiry_tag(new_timeout, deploymentID)
+                deployment_apis_blueprint.logger.info(f"GET_DEPLOYMENT_STATE: Set timeout to 2 hours from completion for {deploymentID}")
+        except Exception as timeout_error:
+            deployment_apis_blueprint.logger.warning(f"GET_DEPLOYMENT_STATE: Could not set timeout: {timeout_error}")
+
+
+deployment_state_cache = DeploymentStateCache(resolve_deployment_state, apply_deployment_state_change)
+
+
+def _valid_deployment_id(deploymentID):
+    return deploymentID and deploymentID not in ["undefined", "false", "null"]
+
+
+@deployment_apis_blueprint.route('/getDeploymentState', methods=['POST'])
+def get_deployment_state():
+    data = request.get_json() or {}
+    deploymentID = data.get('deploymentID')
+
+    if not _valid_deployment_id(deploymentID):
+        return jsonify({"message": "No deployment"}), 404
+
+    body, status = deployment_state_cache.get(deploymentID)
+    return jsonify(body), status
+
+
+@deployment_apis_blueprint.route('/streamDeploymentState', methods=['GET'])
+def stream_deployment_state():
+    """
+    Server-Sent Events stream of /getDeploymentState results. An event is sent
+    with the current state on connect and then whenever the reconciler sees it
+    change, so clients can drop their polling loops.
+    """
+    deploymentID = request.args.get('deploymentID')
+
+    if not _valid_deployment_id(deploymentID):
+        return jsonify({"message": "No deployment"}), 404
+
+    def events():
+        subscriber = deployment_state_cache.subscribe(deploymentID)
+        try:
+            while True:
+                try:
+                    entry = subscriber.get(timeout=helpers.DEPLOYMENT_STATE_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                payload = dict(entry["body"], statusCode=entry["status"])
+                yield f"event: state\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            deployment_state_cache.unsubscribe(deploymentID, subscriber)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-            deployment_apis_blueprint.logger.info(f"GET_DEPLOYMENT_STATE: All deployments succeeded in {deploymentID}")
-            return jsonify({"message": "deployed", "details": {"succeeded": succeeded_deployments}}), 200
-            
-    except Exception as e:
-        deployment_apis_blueprint.logger.error(f"GET_DEPLOYMENT_STATE: Error checking state for {deploymentID}: {str(e)}")
-        return jsonify({"message": str(e)}), 500
-    
 
 @deployment_apis_blueprint.route('/extend', methods=['POST'])
 def extend():
@@ -233,7 +298,7 @@ def get_deployment_timeout():
     deploymentID = request.data.decode('utf-8')
     if deploymentID != "false":
         try:
-            timeout = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)["timeout"]
+            timeout = deployment_store.get(deploymentID)["timeout"]
             deployment_apis_blueprint.logger.info(f"GET_DEPLOYMENT_TIMEOUT: Got timeout for {deploymentID}: {timeout}")
             return jsonify({"message":timeout})
         except:
@@ -475,65 +540,89 @@ module CA_{i} '../base/CertificateAuthority.bicep' = {{
 def schedule_deletion_verification(resource_group_name, retry_count=0):
     """
     Schedule a verification task to make sure the resource group is truly deleted.
-    Uses exponential backoff for retries.
+    Uses exponential backoff for retries; see verify_deletion.
     
     Parameters:
     - resource_group_name: The name of the resource group to verify deletion
-    - retry_count: Current retry attempt (incremented with each retry)
+    - retry_count: Number of verification attempts already made
     """
-    max_retries = helpers.DELETION_VERIFICATION_MAX_RETRIES
-    if retry_count >= max_retries:
-        deployment_apis_blueprint.logger.error(f"VERIFY_DELETION: Giving up on {resource_group_name} after {retry_count} attempts")
-        return
-    
     wait_time = helpers.DELETION_VERIFICATION_BASE_WAIT * (2 ** retry_count)
-    
-    def verify_deletion():
-        try:
-            deployment_apis_blueprint.logger.debug(f"VERIFY_DELETION: Checking if {resource_group_name} is fully deleted (attempt {retry_count+1})")
-            
-            
-            exists = deployment_handler.does_deployment_exist(resource_group_name)
-            if exists:
-                deployment_apis_blueprint.logger.warning(f"VERIFY_DELETION: Resource group {resource_group_name} still exists after deletion attempt")
-                
-                try:
-                    deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Forcefully re-attempting resource group deletion for {resource_group_name}")
-                    deployment_handler.destroy_deployment(resource_group_name)
-                except Exception as e:
-                    deployment_apis_blueprint.logger.error(f"VERIFY_DELETION: Error in resource group deletion attempt: {str(e)}")
-                
-                schedule_deletion_verification(resource_group_name, retry_count + 1)
-            else:
-                deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Resource group {resource_group_name} successfully deleted")
-                try:
-                    fs_manager.delete_file(helpers.DEPLOYMENT_DIRECTORY, resource_group_name)
-                    deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Deleted deployment file for {resource_group_name}")
-                except Exception as del_error:
-                    deployment_apis_blueprint.logger.error(f"VERIFY_DELETION: Error deleting deployment file: {del_error}")
+    deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Scheduling verification for {resource_group_name} in {wait_time} seconds (attempt {retry_count+1})")
+    operation_scheduler.submit("deletionVerification", resource_group_name, delay=wait_time, resourceGroup=resource_group_name, previousAttempts=retry_count)
 
-                # Also clean up topology file if it exists
-                try:
-                    topology_file = f"{resource_group_name}_topology"
-                    fs_manager.delete_file(helpers.DEPLOYMENT_DIRECTORY, topology_file)
-                    deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Deleted topology file for {resource_group_name}")
-                except Exception as del_error:
-                    # It's okay if topology file doesn't exist (older deployments might not have separate topology files)
-                    deployment_apis_blueprint.logger.debug(f"VERIFY_DELETION: Topology file not found or error deleting: {del_error}")
-
-                # Note: We do NOT clean up gallery images here.
+
+def verify_deletion(operation):
+    """
+    Scheduler handler: check whether the resource group is gone. Re-issues the
+    delete and backs off exponentially while it still exists, and removes the
+    local deployment files once it does not.
+    """
+    resource_group_name = operation["resourceGroup"]
+    attempt = operation.get("previousAttempts", 0) + operation["attempts"]
+    max_retries = helpers.DELETION_VERIFICATION_MAX_RETRIES
+
+    try:
+        deployment_apis_blueprint.logger.debug(f"VERIFY_DELETION: Checking if {resource_group_name} is fully deleted (attempt {attempt})")
+        exists = deployment_handler.does_deployment_exist(resource_group_name)
+    except Exception as e:
+        deployment_apis_blueprint.logger.error(f"VERIFY_DELETION: Error during verification: {str(e)}")
+        exists = True
+
+    if exists:
+        deployment_apis_blueprint.logger.warning(f"VERIFY_DELETION: Resource group {resource_group_name} still exists after deletion attempt")
+        if attempt >= max_retries:
+            deployment_apis_blueprint.logger.error(f"VERIFY_DELETION: Giving up on {resource_group_name} after {attempt} attempts")
+            return None
+
+        try:
+            deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Forcefully re-attempting resource group deletion for {resource_group_name}")
+            deployment_handler.destroy_deployment(resource_group_name)
         except Exception as e:
-            deployment_apis_blueprint.logger.error(f"VERIFY_DELETION: Error during verification: {str(e)}")
-            schedule_deletion_verification(resource_group_name, retry_count + 1)
-    
-    deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Scheduling verification for {resource_group_name} in {wait_time} seconds (attempt {retry_count+1})")
-    threading.Timer(wait_time, verify_deletion).start()
+            deployment_apis_blueprint.logger.error(f"VERIFY_DELETION: Error in resource group deletion attempt: {str(e)}")
+
+        wait_time = helpers.DELETION_VERIFICATION_BASE_WAIT * (2 ** attempt)
+        deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Next check for {resource_group_name} in {wait_time} seconds (attempt {attempt+1})")
+        return wait_time
+
+    deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Resource group {resource_group_name} successfully deleted")
+    try:
+        fs_manager.delete_file(helpers.DEPLOYMENT_DIRECTORY, resource_group_name)
+        deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Deleted deployment file for {resource_group_name}")
+    except Exception as del_error:
+        deployment_apis_blueprint.logger.error(f"VERIFY_DELETION: Error deleting deployment file: {del_error}")
+
+    # Also clean up topology file if it exists
+    try:
+        topology_file = f"{resource_group_name}_topology"
+        fs_manager.delete_file(helpers.DEPLOYMENT_DIRECTORY, topology_file)
+        deployment_apis_blueprint.logger.info(f"VERIFY_DELETION: Deleted topology file for {resource_group_name}")
+    except Exception as del_error:
+        # It's okay if topology file doesn't exist (older deployments might not have separate topology files)
+        deployment_apis_blueprint.logger.debug(f"VERIFY_DELETION: Topology file not found or error deleting: {del_error}")
+
+    # Note: We do NOT clean up gallery images here.
+    return None
+
+
+operation_scheduler.register_handler("deletionVerification", verify_deletion)
+
+
+@deployment_apis_blueprint.route("/getPendingOperations", methods=["GET"])
+def get_pending_operations():
+    """
+    Status of the long-running operations tracked by the scheduler: deployments
+    waiting to finish and resource groups awaiting deletion verification.
+    Optional ?kind= and ?id= (deployment ID / resource group) filters.
+    """
+    kind = request.args.get("kind")
+    key = request.args.get("id")
+    return jsonify(operation_scheduler.list_operations(kind=kind, key=key)), 200
 
 
 @deployment_apis_blueprint.route('/shutdown', methods=['POST'])
 def shutdown():
     deploymentID = request.data.decode('utf-8')
-    deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
+    deployment = deployment_store.get(deploymentID)
 
     if "ERROR" in deployment:
         return jsonify({"message": f"Deployment {deploymentID} not found"}), 404
@@ -548,6 +637,7 @@ def shutdown():
         
         deployment_apis_blueprint.logger.info(f"SHUTDOWN: Deleting resource group {resource_group}")
         deployment_handler.destroy_deployment(deploymentID)
+        deployment_state_cache.invalidate(deploymentID)
         
         schedule_deletion_verification(resource_group)
         
@@ -575,17 +665,8 @@ def cleanup_build_images(resource_group_name, build_id):
         gallery_resource_group = helpers.VM_IMAGE_GALLERY_RESOURCE_GROUP
         gallery_name = helpers.BUILD_GALLERY_NAME
         
-        image_def_command = [
-            "/usr/bin/az", "sig", "image-definition", "list",
-            "--resource-group", gallery_resource_group,
-            "--gallery-name", gallery_name,
-            "--query", "[].name",
-            "--output", "json"
-        ]
-        
         try:
-            image_def_output = command_runner.run_command_and_read_output(image_def_command)
-            image_defs = json.loads(image_def_output)
+            image_defs = azure_gateway.list_image_definitions(gallery_resource_group, gallery_name)
             
             if not image_defs:
                 deployment_apis_blueprint.logger.debug(f"CLEANUP_BUILD_IMAGES: No image definitions found in gallery {gallery_name}")
@@ -601,15 +682,8 @@ def cleanup_build_images(resource_group_name, build_id):
             
             def delete_version(image_def, version):
                 try:
-                    delete_version_command = [
-                        "/usr/bin/az", "sig", "image-version", "delete",
-                        "--resource-group", gallery_resource_group,
-                        "--gallery-name", gallery_name,
-                        "--gallery-image-definition", image_def,
-                        "--gallery-image-version", version
-                    ]
                     deployment_apis_blueprint.logger.info(f"CLEANUP_BUILD_IMAGES: Deleting version {version} for {image_def}")
-                    command_runner.run_command_and_read_output(delete_version_command)
+                    azure_gateway.delete_image_version(gallery_resource_group, gallery_name, image_def, version)
                     return f"Deleted {image_def}/{version}"
                 except Exception as e:
                     deployment_apis_blueprint.logger.error(f"CLEANUP_BUILD_IMAGES: Error deleting version {version}: {str(e)}")
@@ -617,14 +691,8 @@ def cleanup_build_images(resource_group_name, build_id):
             
             def delete_image_definition(image_def):
                 try:
-                    delete_image_def_command = [
-                        "/usr/bin/az", "sig", "image-definition", "delete",
-                        "--resource-group", gallery_resource_group,
-                        "--gallery-name", gallery_name,
-                        "--gallery-image-definition", image_def
-                    ]
                     deployment_apis_blueprint.logger.info(f"CLEANUP_BUILD_IMAGES: Deleting image definition {image_def}")
-                    command_runner.run_command_and_read_output(delete_image_def_command)
+                    azure_gateway.delete_image_definition(gallery_resource_group, gallery_name, image_def)
                     return f"Deleted definition {image_def}"
                 except Exception as e:
                     deployment_apis_blueprint.logger.error(f"CLEANUP_BUILD_IMAGES: Error deleting definition {image_def}: {str(e)}")
@@ -634,18 +702,8 @@ def cleanup_build_images(resource_group_name, build_id):
             for image_def in build_image_defs:
                 deployment_apis_blueprint.logger.info(f"CLEANUP_BUILD_IMAGES: Processing image definition {image_def}")
                 
-                version_command = [
-                    "/usr/bin/az", "sig", "image-version", "list",
-                    "--resource-group", gallery_resource_group,
-                    "--gallery-name", gallery_name,
-                    "--gallery-image-definition", image_def,
-                    "--query", "[].name",
-                    "--output", "json"
-                ]
-                
                 try:
-                    version_output = command_runner.run_command_and_read_output(version_command)
-                    versions = json.loads(version_output)
+                    versions = azure_gateway.list_image_versions(gallery_resource_group, gallery_name, image_def)
                     
                     if not versions:
                         deployment_apis_blueprint.logger.debug(f"CLEANUP_BUILD_IMAGES: No versions found for image {image_def}")
@@ -692,12 +750,12 @@ def get_resource_ips():
 
     if deploymentID != "false":
         try:
-            deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
+            deployment = deployment_store.get(deploymentID)
             
             if "topologyFile" in deployment:
                 try:
                     topology_file = deployment.get("topologyFile")
-                    topology = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, topology_file)
+                    topology = deployment_store.get(topology_file)
                     
                     if isinstance(topology, dict) and "nodes" in topology:
                         vm_data = []
@@ -726,21 +784,13 @@ def get_resource_ips():
             resource_group = deployment.get("resourceGroup", deploymentID)
             
             try:
-                vm_command = [
-                    "/usr/bin/az", "vm", "list-ip-addresses",
-                    "--resource-group", resource_group,
-                    "--query", "[].{name:virtualMachine.name, privateIP:virtualMachine.network.privateIpAddresses[0], publicIP:virtualMachine.network.publicIpAddresses[0].ipAddress}",
-                    "--output", "json"
-                ]
-
                 deployment_apis_blueprint.logger.info(f"GET_RESOURCE_IPS: Getting resource IPs for {deploymentID} using resource group {resource_group}")
-                vm_output = command_runner.run_command_and_read_output(vm_command)
-                vm_data = json.loads(vm_output)
+                vm_data = azure_gateway.list_vm_ip_addresses(resource_group)
                 
                 if vm_data:
                     return jsonify({"message": vm_data})
             except Exception as e:
-                deployment_apis_blueprint.logger.error(f"GET_RESOURCE_IPS: Error from Azure CLI: {str(e)}")
+                deployment_apis_blueprint.logger.error(f"GET_RESOURCE_IPS: Error from Azure: {str(e)}")
                 # Fall through to topology data if available
             
             if topology_data:
@@ -764,41 +814,23 @@ def get_remote_desktop_users():
         return jsonify({"message": "Deployment ID not provided"}), 400
         
     try:
-        deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
-        resource_group = deployment.get("resourceGroup", deploymentID)
+        resource_group = deployment_store.get_resource_group(deploymentID)
         
         combinedTag = "Workstation:" + resource_group
 
-        vm_list_command = [
-            "/usr/bin/az", "resource", "list",
-            "--resource-group", resource_group,
-            "--query", "[?type=='Microsoft.Compute/virtualMachines' && tags.VM=='" + combinedTag + "'].{name:name}",
-            "--output", "json"
-        ]
-        vm_list_output = command_runner.run_command_and_read_output(vm_list_command)
-        vm_list = json.loads(vm_list_output)
+        vm_list = azure_gateway.list_resources(resource_group, resource_type="Microsoft.Compute/virtualMachines", tag={"VM": combinedTag})
         
         if not vm_list:
             return jsonify({"message": "No workstation VMs found with the specified tag"}), 400
         
         target_box = vm_list[0]['name']
 
-        vm_command = [
-            "/usr/bin/az", "vm", "run-command", "invoke",
-            "--command-id", "RunPowerShellScript",
-            "--name", target_box,
-            "--resource-group", resource_group,
-            "--scripts", "Get-LocalGroupMember -Group 'Remote Desktop Users' | Select-Object -ExpandProperty Name"
-        ]
+        script = powershell_functions() + "Write-Results -kind 'rdp_user' -key 'name' -items @(Get-LocalGroupMember -Group 'Remote Desktop Users' | Select-Object -ExpandProperty Name)"
 
         deployment_apis_blueprint.logger.info(f"GET_REMOTE_DESKTOP_USERS: Getting Remote Desktop Users for {target_box} in resource group {resource_group}")
-        vm_output = command_runner.run_command_and_read_output(vm_command)
-        
-        # Parse the stdout message to extract the user list
-        vm_output_json = json.loads(vm_output)
-        message = next((item['message'] for item in vm_output_json['value'] if item['code'] == 'ComponentStatus/StdOut/succeeded'), "")
+        vm_output = azure_gateway.run_powershell(resource_group, target_box, script)
         
-        users = [line.strip() for line in message.splitlines() if line.strip()]
+        users = [result['name'] for result in iter_results(vm_output["stdout"], 'rdp_user')]
 
         return jsonify({"message": users})
     except Exception as e:
@@ -1,10 +1,11 @@
 from flask import Blueprint, request, jsonify
 import os
 from azure_clients import AzureClients
+from azure_gateway import azure_gateway
 from deployments import Deployments
 import helpers
 import fs_manager
-import command_runner
+from bicep_compiler import bicep_compiler
 from scenario_manager import ScenarioManager
 import json
 import logging
@@ -112,17 +113,7 @@ def get_scenario_versions():
                 if "/versions/" in image_ref:
                     default_version = image_ref.split("/versions/")[-1]
                 
-                version_command = [
-                    "/usr/bin/az", "sig", "image-version", "list",
-                    "--resource-group", helpers.VM_IMAGE_GALLERY_RESOURCE_GROUP,
-                    "--gallery-name", gallery_name,
-                    "--gallery-image-definition", image_definition,
-                    "--query", "[].name",
-                    "--output", "json"
-                ]
-
-                version_output = command_runner.run_command_and_read_output(version_command)
-                versions = json.loads(version_output)
+                versions = azure_gateway.list_image_versions(helpers.VM_IMAGE_GALLERY_RESOURCE_GROUP, gallery_name, image_definition)
 
                 if not versions:
                     versions = [default_version]
@@ -224,10 +215,9 @@ def delete_scenario():
         
         from apis.deployment_apis import cleanup_build_images
         
-        scenario_json_path = os.path.join(helpers.SCENARIO_DIRECTORY, f"{scenario_name}.json")
-        if os.path.exists(scenario_json_path):
-            os.remove(scenario_json_path)
-            scenario_apis_blueprint.logger.info(f"DELETE_SCENARIO: Deleted {scenario_json_path}")
+        if fs_manager.file_exists(helpers.SCENARIO_DIRECTORY, f"{scenario_name}.json"):
+            fs_manager.delete_file(helpers.SCENARIO_DIRECTORY, f"{scenario_name}.json")
+            scenario_apis_blueprint.logger.info(f"DELETE_SCENARIO: Deleted {scenario_name}.json")
         
         bicep_path = os.path.join(helpers.SCENARIO_TEMPLATE_DIRECTORY, f"Scenario{scenario_name}.bicep")
         if os.path.exists(bicep_path):
@@ -549,8 +539,7 @@ def update_scenario():
             scenario_apis_blueprint.logger.error(f"UPDATE_SCENARIO: Could not determine scenario name from deployment {deployment_id}")
             return jsonify({"message": "Error: Could not determine linked scenario"}), 400
         
-        scenario_file_path = os.path.join(helpers.SCENARIO_DIRECTORY, f"{scenario_name}.json")
-        if not os.path.exists(scenario_file_path):
+        if not fs_manager.file_exists(helpers.SCENARIO_DIRECTORY, f"{scenario_name}.json"):
             scenario_apis_blueprint.logger.error(f"UPDATE_SCENARIO: Scenario {scenario_name} does not exist")
             return jsonify({"message": f"Error: Scenario {scenario_name} does not exist. Use 'Save as Scenario' first."}), 404
         
@@ -636,17 +625,7 @@ def update_scenario():
                         gallery_name = parts[gallery_idx + 1]
                         image_definition = parts[images_idx + 1]
                         
-                        version_command = [
-                            "/usr/bin/az", "sig", "image-version", "list",
-                            "--resource-group", helpers.VM_IMAGE_GALLERY_RESOURCE_GROUP,
-                            "--gallery-name", gallery_name,
-                            "--gallery-image-definition", image_definition,
-                            "--query", "[].name",
-                            "--output", "json"
-                        ]
-                        
-                        version_output = command_runner.run_command_and_read_output(version_command)
-                        versions = json.loads(version_output)
+                        versions = azure_gateway.list_image_versions(helpers.VM_IMAGE_GALLERY_RESOURCE_GROUP, gallery_name, image_definition)
                         
                         if versions and len(versions) > 0:
                             def version_key(v):
@@ -1406,14 +1385,12 @@ module Jumpbox '../base/Jumpbox.bicep' = {{
     
     scenario_apis_blueprint.logger.info(f"CREATE_BUILD_SCENARIO: Compiling Scenario{scenario_name}.bicep to JSON...")
     json_path = os.path.join(helpers.SCENARIO_TEMPLATE_DIRECTORY, f"Scenario{scenario_name}.json")
-    compile_command = ["az", "bicep", "build", "--file", bicep_path, "--outfile", json_path]
-    compile_output = command_runner.run_command_and_read_output(compile_command)
-    compile_exit_code = command_runner.run_command_and_get_exit_code(compile_command)
+    compiled = bicep_compiler.compile(bicep_path, json_path)
     
-    if compile_exit_code != 0:
-        scenario_apis_blueprint.logger.error(f"CREATE_BUILD_SCENARIO: Bicep compilation failed with exit code {compile_exit_code}")
-        scenario_apis_blueprint.logger.error(f"CREATE_BUILD_SCENARIO: Compilation output: {compile_output}")
-        raise Exception(f"Failed to compile scenario template: {compile_output}")
+    if compiled.exit_code != 0:
+        scenario_apis_blueprint.logger.error(f"CREATE_BUILD_SCENARIO: Bicep compilation failed with exit code {compiled.exit_code}")
+        scenario_apis_blueprint.logger.error(f"CREATE_BUILD_SCENARIO: Compilation output: {compiled.output}")
+        raise Exception(f"Failed to compile scenario template: {compiled.output}")
     
     scenario_apis_blueprint.logger.info(f"CREATE_BUILD_SCENARIO: Scenario{scenario_name}.bicep compiled successfully to JSON")
     
@@ -6,6 +6,7 @@ from deployments import Deployments
 import helpers
 import fs_manager
 import command_runner
+from deployment_store import deployment_store
 import logging
 from generate_topology import TopologyGenerator
 
@@ -27,7 +28,7 @@ def get_topology():
         topology = None
         if deployment_id and deployment_id.strip():
             try:
-                deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment_id)
+                deployment = deployment_store.get(deployment_id)
                 topology_apis_blueprint.logger.debug(f"GET_TOPOLOGY: Loaded deployment config: {deployment}")
                 #    topology_apis_blueprint.logger.debug(f"GET_TOPOLOGY: Loading topology from file: {topology_file}")
                 #    topology_apis_blueprint.logger.debug(f"GET_TOPOLOGY: Loaded topology from deployment file {topology_file}: {topology}")
@@ -17,7 +17,9 @@ from azure_clients import AzureClients
 from deployments import Deployments
 import helpers
 import fs_manager
-import command_runner
+from bicep_compiler import bicep_compiler
+from deployment_store import deployment_store
+from apis.deployment_apis import deployment_state_cache
 from azure.mgmt.resource.resources.models import Deployment, DeploymentProperties, DeploymentMode
 import logging
 
@@ -105,7 +107,7 @@ def get_scenario_topology():
                 }
 
                 try:
-                    deployment_file = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, rg.name)
+                    deployment_file = deployment_store.get(rg.name)
                     if "ERROR" not in deployment_file:
                         update_session = deployment_file.get("updateSession", {})
                         if update_session.get("active"):
@@ -672,18 +674,15 @@ def deploy_update():
         update_apis_blueprint.logger.info(f"DEPLOY_UPDATE: Generated update bicep at {update_bicep_path}")
         
         update_json_path = os.path.join(update_bicep_dir, f"Update-{deployment_id}.json")
-        compile_command = ["az", "bicep", "build", "--file", update_bicep_path, "--outfile", update_json_path]
-        compile_output = command_runner.run_command_and_read_output(compile_command)
-        compile_exit_code = command_runner.run_command_and_get_exit_code(compile_command)
+        compiled = bicep_compiler.compile(update_bicep_path, update_json_path)
         
-        if compile_exit_code != 0:
-            update_apis_blueprint.logger.error(f"DEPLOY_UPDATE: Bicep compilation failed: {compile_output}")
-            return jsonify({"error": f"Failed to compile update template: {compile_output}"}), 500
+        if compiled.exit_code != 0:
+            update_apis_blueprint.logger.error(f"DEPLOY_UPDATE: Bicep compilation failed: {compiled.output}")
+            return jsonify({"error": f"Failed to compile update template: {compiled.output}"}), 500
         
-        update_apis_blueprint.logger.info(f"DEPLOY_UPDATE: Compiled update bicep to JSON")
+        update_apis_blueprint.logger.info(f"DEPLOY_UPDATE: Compiled update bicep to JSON{' (cached)' if compiled.cached else ''}")
         
-        with open(update_json_path, 'r') as f:
-            template = json.load(f)
+        template = compiled.template
         
         parameters = {
             "enterpriseAdminUsername": {"value": enterprise_admin_username},
@@ -710,6 +709,7 @@ def deploy_update():
         )
         
         update_apis_blueprint.logger.info(f"DEPLOY_UPDATE: Started update deployment {update_deployment_name} to {deployment_id}")
+        deployment_state_cache.invalidate(deployment_id)
         
         try:
             deployment_file = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment_id)
@@ -2,10 +2,10 @@ from flask import Blueprint, request, jsonify
 from azure_clients import AzureClients
 from deployments import Deployments
 import helpers
-import fs_manager
+from deployment_store import deployment_store
 from scenario_manager import ScenarioManager
 import logging
-import re
+from user_sync import user_sync_engine
 
 user_sync_apis_blueprint = Blueprint('user_sync_apis', __name__)
 azure_clients = AzureClients()
@@ -14,69 +14,37 @@ scenario_manager = ScenarioManager()
 user_sync_apis_blueprint.logger = logging.getLogger(helpers.LOGGER_NAME)
 
 
-def _parse_get_aduser_output(output: str, domain: str, dc: str) -> list:
-    """
-    Parse Get-ADUser PowerShell output to extract usernames.
-    Filters out built-in accounts.
-    """
-    users = []
-    
-    builtin_accounts = {
-        'administrator', 'guest', 'krbtgt', 'defaultaccount',
-        'wdagutilityaccount', 'health mailbox', 'systemmailbox',
-        'discovery search mailbox', 'migration', 'federatedemail'
-    }
-    
-    # Extract usernames from output
-    lines = output.split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Try to extract from "SamAccountName : username" format
-        match = re.search(r'SamAccountName\s*:\s*(\S+)', line, re.IGNORECASE)
-        if match:
-            username = match.group(1).strip()
-        elif re.match(r'^[a-zA-Z0-9_\-\.]+$', line):
-            username = line
-        else:
-            continue
-        
-        if username.lower() not in builtin_accounts:
-            users.append({
-                "username": username,
-                "domain": domain,
-                "dc": dc
-            })
-    
-    return users
-
-
 @user_sync_apis_blueprint.route("/syncUsers", methods=["POST"])
 def sync_users():
     """
-    Dynamically query all DCs in the deployment to fetch live user lists.
-    Filters out built-in accounts and returns fresh user data.
+    Query all DCs in the deployment concurrently to refresh the stored user list.
+    Filters out built-in accounts and returns the merged user data.
+
+    "mode" is "delta" (default) or "full". A delta sync of a DC only fetches
+    users changed or deleted since that DC's last sync; DCs that were never
+    synced are synced in full.
     """
     try:
         data = request.get_json()
         deployment_id = data.get("deploymentID")
+        mode = data.get("mode", "delta")
         
         if not deployment_id:
             return jsonify({"error": "Missing deploymentID"}), 400
+        if mode not in ("delta", "full"):
+            return jsonify({"error": f"Invalid mode: {mode}"}), 400
         
-        user_sync_apis_blueprint.logger.info(f"SYNC_USERS: Syncing users for deployment {deployment_id}")
+        user_sync_apis_blueprint.logger.info(f"SYNC_USERS: Syncing users for deployment {deployment_id} ({mode})")
         
-        deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment_id)
+        deployment = deployment_store.get(deployment_id)
         if "ERROR" in deployment:
             return jsonify({"error": "Deployment not found"}), 404
         
         topology = deployment.get("topology", {})
         nodes = topology.get("nodes", [])
+        sync_state = deployment.get("userSyncState", {})
         
-        # Find all domain controllers
+        # Find all domain controllers, with the high-water mark of their last sync
         domain_controllers = []
         for node in nodes:
             if node.get("type") == "domainController":
@@ -84,9 +52,12 @@ def sync_users():
                 dc_name = node_data.get("domainControllerName", "")
                 domain_name = node_data.get("domainName", "")
                 if dc_name and domain_name:
+                    dc_state = sync_state.get(dc_name, {})
+                    delta = mode == "delta" and (dc_state.get("domain") or "").lower() == domain_name.lower()
                     domain_controllers.append({
                         "dc": dc_name,
-                        "domain": domain_name
+                        "domain": domain_name,
+                        "since": dc_state.get("highWaterMark") if delta else None
                     })
         
         if not domain_controllers:
@@ -95,102 +66,51 @@ def sync_users():
         
         user_sync_apis_blueprint.logger.info(f"SYNC_USERS: Found {len(domain_controllers)} domain controllers")
         
-        enterprise_admin_username = scenario_manager.get_parameter("enterpriseAdminUsername", deployment_id)
-        enterprise_admin_password = scenario_manager.get_parameter("enterpriseAdminPassword", deployment_id)
+        params = scenario_manager.get_parameters(deployment_id)
+        enterprise_admin_username = params.admin_username
+        enterprise_admin_password = params.admin_password
         
         if not enterprise_admin_username or not enterprise_admin_password:
             return jsonify({"error": "Missing domain admin credentials"}), 400
         
-        all_users = []
-        compute_client = azure_clients.get_compute_client()
-        
-        for dc_info in domain_controllers:
-            dc_name = dc_info["dc"]
-            domain_name = dc_info["domain"]
-            
-            user_sync_apis_blueprint.logger.info(f"SYNC_USERS: Querying {dc_name} for users in domain {domain_name}")
-            
-            # Use enterprise admin credentials formatted as UPN for the root domain
-            root_domain = scenario_manager.get_parameter("rootDomainName", deployment_id)
-            admin_upn = f"{enterprise_admin_username}@{root_domain}" if root_domain else enterprise_admin_username
-            
-            script = f"""
-$ErrorActionPreference = "Continue"
-
-$password = ConvertTo-SecureString '{enterprise_admin_password}' -AsPlainText -Force
-$credential = New-Object System.Management.Automation.PSCredential('{admin_upn}', $password)
-
-try {{
-    $users = Get-ADUser -Filter * -Credential $credential -Server {domain_name} -Properties SamAccountName | 
-             Where-Object {{ 
-                 $_.SamAccountName -notin @('Administrator', 'Guest', 'krbtgt', 'DefaultAccount', 'WDAGUtilityAccount') -and
-                 $_.SamAccountName -notlike 'HealthMailbox*' -and
-                 $_.SamAccountName -notlike 'SystemMailbox*'
-             }} | 
-             Select-Object -ExpandProperty SamAccountName
-    
-    Write-Output "=== USERS START ==="
-    foreach ($user in $users) {{
-        Write-Output $user
-    }}
-    Write-Output "=== USERS END ==="
-}} catch {{
-    Write-Output "ERROR: $_"
-}}
-"""
-            
-            try:
-                from azure.mgmt.compute.models import RunCommandInput
-                
-                execute_params = RunCommandInput(
-                    command_id='RunPowerShellScript',
-                    script=[script]
-                )
-                
-                poller = compute_client.virtual_machines.begin_run_command(
-                    resource_group_name=deployment_id,
-                    vm_name=dc_name,
-                    parameters=execute_params
-                )
-                result = poller.result()
-                
-                # Parse output
-                output_messages = []
-                if result.value:
-                    for item in result.value:
-                        if item.message:
-                            output_messages.append(item.message)
-                
-                full_output = "\n".join(output_messages)
-                user_sync_apis_blueprint.logger.debug(f"SYNC_USERS: Raw output from {dc_name}:\n{full_output}")
-                
-                # Extract users from output (between markers)
-                user_section = re.search(r'=== USERS START ===\s*\n(.*?)\n=== USERS END ===', full_output, re.DOTALL)
-                if user_section:
-                    user_lines = user_section.group(1).strip()
-                    for line in user_lines.split('\n'):
-                        line = line.strip()
-                        if line and not line.startswith('ERROR'):
-                            all_users.append({
-                                "username": line,
-                                "domain": domain_name,
-                                "dc": dc_name
-                            })
-                
-                user_sync_apis_blueprint.logger.info(f"SYNC_USERS: Found {len([u for u in all_users if u['dc'] == dc_name])} users on {dc_name}")
-                
-            except Exception as dc_error:
-                user_sync_apis_blueprint.logger.error(f"SYNC_USERS: Error querying {dc_name}: {str(dc_error)}")
-                continue
-        
-        user_sync_apis_blueprint.logger.info(f"SYNC_USERS: Total users found: {len(all_users)}")
-        
-        deployment["users"] = all_users
-        fs_manager.save_file(deployment, helpers.DEPLOYMENT_DIRECTORY, deployment_id)
+        # Use enterprise admin credentials formatted as UPN for the root domain
+        root_domain = params.root_domain
+        admin_upn = f"{enterprise_admin_username}@{root_domain}" if root_domain else enterprise_admin_username
+        
+        results = user_sync_engine.execute(deployment_id, domain_controllers, admin_upn, enterprise_admin_password)
+        
+        with deployment_store.update(deployment_id) as deployment:
+            if "ERROR" in deployment:
+                return jsonify({"error": "Deployment not found"}), 404
+            all_users = _merge_synced_users(deployment.get("users", []), results)
+            sync_state = deployment.get("userSyncState", {})
+            for result in results:
+                if not result["error"]:
+                    sync_state[result["dc"]] = {"domain": result["domain"], "highWaterMark": result["highWaterMark"]}
+            deployment["users"] = all_users
+            deployment["userSyncState"] = sync_state
+        
+        failed = [result for result in results if result["error"]]
+        user_sync_apis_blueprint.logger.info(f"SYNC_USERS: Total users: {len(all_users)}, {len(failed)} DC(s) failed")
+        
+        message = f"Successfully synced {len(all_users)} users from {len(results) - len(failed)} domain controllers"
+        if failed:
+            message += f" ({len(failed)} failed: {', '.join(result['dc'] for result in failed)})"
         
         return jsonify({
             "users": all_users,
-            "message": f"Successfully synced {len(all_users)} users from {len(domain_controllers)} domain controllers"
+            "domainControllers": [
+                {
+                    "dc": result["dc"],
+                    "domain": result["domain"],
+                    "mode": result["mode"],
+                    "changed": len(result["users"]),
+                    "deleted": len(result["deleted"]),
+                    "error": result["error"]
+                }
+                for result in results
+            ],
+            "message": message
         }), 200
         
     except Exception as e:
@@ -199,3 +119,41 @@ try {{
         user_sync_apis_blueprint.logger.error(f"SYNC_USERS: Error syncing users: {str(e)}")
         user_sync_apis_blueprint.logger.error(f"SYNC_USERS: Full traceback:\n{error_trace}")
         return jsonify({"error": f"Error syncing users: {str(e)}"}), 500
+
+
+def _merge_synced_users(users: list, results: list) -> list:
+    """
+    Apply per-DC sync results to a stored user list. A full sync replaces the
+    users of its domain, a delta removes deleted users and adds new ones.
+    Domains of failed DCs keep their stored users.
+
+    Domains and usernames are compared case-insensitively, as AD does, since
+    stored users may carry another casing of the domain (e.g. from the topology).
+    """
+    def same_domain(user):
+        return (user.get("domain") or "").lower() == domain
+
+    users = [user for user in users if isinstance(user, dict)]
+    
+    for result in results:
+        if result["error"]:
+            continue
+        domain = result["domain"].lower()
+        
+        removed = {username.lower() for username in result["deleted"]}
+        if result["mode"] == "full":
+            users = [user for user in users if not same_domain(user)]
+        elif removed:
+            users = [user for user in users if not same_domain(user) or (user.get("username") or "").lower() not in removed]
+        
+        existing = {(user.get("username") or "").lower() for user in users if same_domain(user)}
+        for username in result["users"]:
+            if username.lower() not in existing:
+                users.append({
+                    "username": username,
+                    "domain": result["domain"],
+                    "dc": result["dc"]
+                })
+                existing.add(username.lower())
+    
+    return users
@@ -2,6 +2,8 @@ from flask import Flask
 from custom_logger import setup_logger
 import flask_cors
 from deployments import Deployments
+from operation_scheduler import operation_scheduler
+from asset_registry import asset_registry
 import helpers
 import signal
 import logging
@@ -58,9 +60,17 @@ app.register_blueprint(update_apis_blueprint)
 app.register_blueprint(bloodhound_apis_blueprint)
 app.register_blueprint(user_sync_apis_blueprint)
 
+helpers.configure_storage_backend()
+
+# Load attacks.json and the VM scripts before the first request needs them
+asset_registry.preload()
+
 deployment_handler = Deployments()
 deployment_handler.check_health_of_deployments()
 
+# Resume deployment and deletion checks left pending by the previous run
+operation_scheduler.start()
+
 def background_cleanup_thread():
     """
     Continuously monitors and deletes expired deployments.
@@ -0,0 +1,156 @@
+"""
+In-memory registry of the static assets the APIs send to or look up for VMs:
+config/attacks.json and the PowerShell scripts (ExecuteModule.ps1,
+ADVulnEnvModule.psm1, DownloadFiles.ps1).
+
+Every asset is read once and kept until its file changes (inode/mtime/size,
+checked with one stat per access), so edits to the config directory are
+picked up without a restart. For each asset the registry keeps:
+- its text, with line endings normalized as by open(path, 'r')
+- the sha256 of the file's bytes, so callers can tell whether a copy already
+  on a VM is current
+
+attacks.json is also indexed by attack type across its categories. derive()
+caches any other value built from assets (e.g. the staging scripts in
+module_staging) until one of the assets it was built from changes.
+
+Returned dicts are shared with the registry and must be treated as read-only.
+"""
+
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import threading
+import helpers
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+ATTACKS_FILE = os.path.join(helpers.CONFIG_DIRECTORY, "attacks.json")
+
+
+class Asset(NamedTuple):
+    path: str
+    signature: Tuple[int, int, int]
+    text: str
+    sha256: str
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class AssetRegistry:
+    def __init__(self):
+        self._assets: Dict[str, Asset] = {}
+        # Derived values (parsed JSON, indexes, rendered scripts), keyed by name and
+        # kept with the sha256 values of the assets they were built from
+        self._derived: Dict[str, Tuple[Tuple[str, ...], Any]] = {}
+        self._lock = threading.Lock()
+
+    def asset(self, path: str) -> Asset:
+        """
+        Current version of a file, re-read when it changed since the last call.
+        Raises FileNotFoundError (as open() would) when the file is missing.
+        """
+        signature = _file_signature(path)
+        if signature is None:
+            with self._lock:
+                self._assets.pop(path, None)
+            raise FileNotFoundError(f"Asset not found: {path}")
+
+        with self._lock:
+            cached = self._assets.get(path)
+        if cached and cached.signature == signature:
+            return cached
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Signature taken before the read, so a write racing the read is picked up next time
+        text = data.decode('utf-8-sig').replace('\r\n', '\n').replace('\r', '\n')
+        asset = Asset(path, signature, text, hashlib.sha256(data).hexdigest())
+        with self._lock:
+            self._assets[path] = asset
+        logger.info(f"ASSET_REGISTRY: Loaded {path} ({len(data)} bytes, sha256 {asset.sha256[:12]})")
+        return asset
+
+    def text(self, path: str) -> str:
+        return self.asset(path).text
+
+    def sha256(self, path: str) -> str:
+        return self.asset(path).sha256
+
+    def derive(self, name: str, paths: Tuple[str, ...], build: Callable[..., Any]) -> Any:
+        """Value built from some assets, rebuilt only when one of them changed"""
+        assets = [self.asset(path) for path in paths]
+        hashes = tuple(asset.sha256 for asset in assets)
+        with self._lock:
+            cached = self._derived.get(name)
+        if cached and cached[0] == hashes:
+            return cached[1]
+
+        value = build(*assets)
+        with self._lock:
+            self._derived[name] = (hashes, value)
+        return value
+
+    def preload(self) -> None:
+        """Load every known asset, logging (not raising) for missing ones."""
+        for path in (ATTACKS_FILE, helpers.EXECUTE_MODULE_SCRIPT, helpers.ADVULN_MODULE_SCRIPT, helpers.DOWNLOAD_FILES_SCRIPT):
+            try:
+                self.asset(path)
+            except Exception as e:
+                logger.warning(f"ASSET_REGISTRY: Could not preload {path}: {e}")
+
+    def hashes(self) -> Dict[str, str]:
+        """sha256 of every asset loaded so far, by path"""
+        with self._lock:
+            return {path: asset.sha256 for path, asset in self._assets.items()}
+
+    # attacks.json
+
+    def attacks(self) -> Dict[str, Dict[str, Any]]:
+        """attacks.json as {category: {attack type: definition}}, or {"ERROR": ...} like fs_manager.load_file"""
+        try:
+            return self.derive("attacks", (ATTACKS_FILE,), lambda asset: json.loads(asset.text))
+        except Exception as e:
+            logger.error(f"ASSET_REGISTRY: Unable to load {ATTACKS_FILE}: {e}")
+            return {"ERROR": "File not found"}
+
+    def attack_index(self) -> Dict[str, Dict[str, Any]]:
+        """attack type -> definition across all categories (first category wins)"""
+        def build(asset):
+            index = {}
+            for attack_dict in json.loads(asset.text).values():
+                if isinstance(attack_dict, dict):
+                    for attack_type, definition in attack_dict.items():
+                        index.setdefault(attack_type, definition)
+            return index
+
+        try:
+            return self.derive("attack_index", (ATTACKS_FILE,), build)
+        except Exception as e:
+            logger.error(f"ASSET_REGISTRY: Unable to index {ATTACKS_FILE}: {e}")
+            return {}
+
+    def attack_definition(self, attack_type: str) -> Optional[Dict[str, Any]]:
+        return self.attack_index().get(attack_type)
+
+    # Scripts
+
+    def execute_script(self) -> str:
+        return self.text(helpers.EXECUTE_MODULE_SCRIPT)
+
+    def module_script(self) -> str:
+        return self.text(helpers.ADVULN_MODULE_SCRIPT)
+
+    def download_script(self) -> str:
+        return self.text(helpers.DOWNLOAD_FILES_SCRIPT)
+
+
+asset_registry = AssetRegistry()
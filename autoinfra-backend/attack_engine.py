@@ -0,0 +1,244 @@
+"""
+Attack execution engine shared by /enableAttacks and /bloodhound/configure-attacks.
+
+An attack request is a dict built by apis.attack_apis.build_attack_request:
+
+    {
+        "attackType": "Kerberoasting",
+        "vmName": "DC01",
+        "resourceGroup": "ABCDE",
+        "scriptParams": [{"name": "domainAdminUsername", "value": ...}, ...],
+        "targetUser": "jdoe@lab.local",      # display value stored on the operation
+        "extraFields": {"targetBox": "..."}  # optional, stored on the operation
+    }
+
+Requests that target the same VM with the same credentials and domain are
+merged into a single ExecuteModule.ps1 run command that runs each
+attackSelection as a step (see the attackSteps parameter in ExecuteModule.ps1).
+Run commands run the copy of ExecuteModule.ps1 staged on the VM through
+module_staging, which is uploaded before the first dispatch to a VM and again
+whenever the scripts change.
+Different VMs are dispatched in parallel, and every resulting operation is
+recorded in attackOperations with one deployment write.
+"""
+
+from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import threading
+import time
+from azure_clients import AzureClients
+from deployment_store import deployment_store
+from module_staging import module_stager
+import helpers
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+# Parameters shared by every step of a merged run command; everything else is per step
+SHARED_PARAMETERS = ("domainAdminUsername", "domainAdminPassword", "domainName")
+
+# Steps run in this order inside a merged run command: account changes first, then
+# the ACLs that may reference those accounts, then host-level and ADCS changes
+STEP_ORDER = [
+    "disable-preauth",
+    "kerberoast",
+    "update-user-for-constrained-delegation",
+    "update-computer-for-constrained-delegation",
+    "add-creds-for-mimikatz",
+    "acls",
+    "local-privesc1",
+    "local-privesc2",
+    "local-privesc3",
+    "esc1",
+    "esc3",
+    "esc4",
+]
+
+
+def _param(script_params: List[Dict[str, Any]], name: str) -> Any:
+    return next((p["value"] for p in script_params if p["name"] == name), None)
+
+
+def _step_rank(request: Dict[str, Any]) -> int:
+    selection = _param(request["scriptParams"], "attackSelection")
+    return STEP_ORDER.index(selection) if selection in STEP_ORDER else len(STEP_ORDER)
+
+
+def sync_attacks_in_progress(deployment):
+    """Add every InProgress entry of attackOperations to attacksInProgress (in place)."""
+    attack_operations = deployment.get("attackOperations", {})
+    attacks_in_progress = deployment.get("attacksInProgress", {})
+
+    for operation_id, op_info in attack_operations.items():
+        if op_info.get("status") == "InProgress":
+            attack_type = op_info.get("attackType")
+            if attack_type:
+                if attack_type not in attacks_in_progress:
+                    attacks_in_progress[attack_type] = []
+
+                instance_info = {
+                    "operationId": operation_id,
+                    "targetUser": op_info.get("targetUser"),
+                    "targetBox": op_info.get("targetBox"),
+                    "timestamp": op_info.get("timestamp")
+                }
+
+                if not any(inst.get("operationId") == operation_id for inst in attacks_in_progress[attack_type]):
+                    attacks_in_progress[attack_type].append(instance_info)
+
+    deployment["attacksInProgress"] = attacks_in_progress
+    return attacks_in_progress
+
+
+class AttackEngine:
+    def __init__(self, max_workers: int = helpers.ATTACK_DISPATCH_MAX_WORKERS, max_steps: int = helpers.ATTACK_MAX_STEPS_PER_RUN):
+        self.azure_clients = AzureClients()
+        self.max_workers = max_workers
+        self.max_steps = max_steps
+        self._vm_locations: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def plan(self, requests: List[Dict[str, Any]]) -> Dict[tuple, List[List[Dict[str, Any]]]]:
+        """
+        Group requests into batches, keyed by (resource group, VM). Each batch
+        becomes one run command: requests with the same shared parameters,
+        ordered by STEP_ORDER, at most max_steps per batch.
+        """
+        by_vm: Dict[tuple, Dict[tuple, List[Dict[str, Any]]]] = {}
+        for request in requests:
+            vm_key = (request["resourceGroup"], request["vmName"])
+            shared_key = tuple(_param(request["scriptParams"], name) for name in SHARED_PARAMETERS)
+            by_vm.setdefault(vm_key, {}).setdefault(shared_key, []).append(request)
+
+        plan = {}
+        for vm_key, groups in by_vm.items():
+            batches = []
+            for group in groups.values():
+                group = sorted(group, key=_step_rank)
+                batches.extend(group[i:i + self.max_steps] for i in range(0, len(group), self.max_steps))
+            plan[vm_key] = batches
+        return plan
+
+    def execute(self, deploymentID: str, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Start every request and record the operations. Returns one result per
+        request: {"request", "operationId", "runCommandName"} or {"request", "error"}.
+        """
+        if not requests:
+            return []
+
+        plan = self.plan(requests)
+        batch_count = sum(len(batches) for batches in plan.values())
+        logger.info(f"ATTACK_ENGINE: Dispatching {len(requests)} attack(s) as {batch_count} run command(s) on {len(plan)} VM(s) for {deploymentID}")
+
+        # Run commands only carry the short invoke script; ExecuteModule.ps1 is staged on each VM
+        execute_script = module_stager.invoke_script()
+
+        results: List[Dict[str, Any]] = []
+        operations: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._dispatch_vm, vm_key, batches, execute_script)
+                for vm_key, batches in plan.items()
+            ]
+            for future in futures:
+                vm_results, vm_operations = future.result()
+                results.extend(vm_results)
+                operations.update(vm_operations)
+
+        if operations:
+            with deployment_store.update(deploymentID) as deployment:
+                if "ERROR" not in deployment:
+                    deployment.setdefault("attackOperations", {}).update(operations)
+                    sync_attacks_in_progress(deployment)
+            logger.info(f"ATTACK_ENGINE: Recorded {len(operations)} attack operation(s) for {deploymentID}")
+
+        return results
+
+    def _vm_location(self, resource_group: str, vm_name: str) -> str:
+        key = (resource_group, vm_name)
+        with self._lock:
+            location = self._vm_locations.get(key)
+        if location is None:
+            compute_client = self.azure_clients.get_compute_client()
+            location = compute_client.virtual_machines.get(resource_group, vm_name).location
+            with self._lock:
+                self._vm_locations[key] = location
+        return location
+
+    def _dispatch_vm(self, vm_key: tuple, batches: List[List[Dict[str, Any]]], execute_script: str):
+        """Create the run commands for one VM, one batch after another."""
+        resource_group, vm_name = vm_key
+        results = []
+        operations = {}
+
+        try:
+            location = self._vm_location(resource_group, vm_name)
+            module_stager.ensure_staged(resource_group, vm_name)
+        except Exception as e:
+            logger.error(f"ATTACK_ENGINE: Could not prepare VM {vm_name} in {resource_group}: {e}")
+            return [{"request": r, "error": str(e)} for batch in batches for r in batch], operations
+
+        for batch in batches:
+            try:
+                run_command_name = self._start_batch(resource_group, vm_name, location, batch, execute_script)
+            except Exception as e:
+                logger.error(f"ATTACK_ENGINE: Error starting {len(batch)} attack(s) on {vm_name}: {e}")
+                results.extend({"request": r, "error": str(e)} for r in batch)
+                continue
+
+            timestamp = int(time.time())
+            for index, request in enumerate(batch):
+                # Single-attack run commands keep the run command name as the operation ID
+                operation_id = run_command_name if len(batch) == 1 else f"{run_command_name}-{index + 1}"
+                operation_data = {
+                    "attackType": request["attackType"],
+                    "runCommandName": run_command_name,
+                    "status": "InProgress",
+                    "vmName": vm_name,
+                    "resourceGroup": resource_group,
+                    "targetUser": request.get("targetUser", ""),
+                    "timestamp": timestamp
+                }
+                if len(batch) > 1:
+                    operation_data["step"] = index + 1
+                operation_data.update(request.get("extraFields") or {})
+                operations[operation_id] = operation_data
+                results.append({"request": request, "operationId": operation_id, "runCommandName": run_command_name})
+
+        return results, operations
+
+    def _start_batch(self, resource_group: str, vm_name: str, location: str, batch: List[Dict[str, Any]], execute_script: str) -> str:
+        suffix = f"{int(time.time())}-{helpers.generate_random_id(size=4)}"
+        if len(batch) == 1:
+            run_command_name = f"{batch[0]['attackType']}-{suffix}"
+            parameters = batch[0]["scriptParams"]
+        else:
+            run_command_name = f"Attacks-{suffix}"
+            steps = [
+                {p["name"]: p["value"] for p in request["scriptParams"] if p["name"] not in SHARED_PARAMETERS}
+                for request in batch
+            ]
+            parameters = [p for p in batch[0]["scriptParams"] if p["name"] in SHARED_PARAMETERS]
+            parameters.append({"name": "attackSteps", "value": json.dumps(steps)})
+
+        compute_client = self.azure_clients.get_compute_client()
+        compute_client.virtual_machine_run_commands.begin_create_or_update(
+            resource_group_name=resource_group,
+            vm_name=vm_name,
+            run_command_name=run_command_name,
+            run_command={
+                "location": location,
+                "source": {"script": execute_script},
+                "parameters": parameters,
+                "async_execution": False,
+                "timeout_in_seconds": helpers.RUN_COMMAND_TIMEOUT
+            }
+        )
+        attack_types = ", ".join(r["attackType"] for r in batch)
+        logger.info(f"ATTACK_ENGINE: Run command '{run_command_name}' created on {vm_name} ({attack_types})")
+        return run_command_name
+
+
+attack_engine = AttackEngine()
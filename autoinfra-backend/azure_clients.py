@@ -1,44 +1,92 @@
 import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from azure.core.pipeline.transport import RequestsTransport
 from azure.identity import ClientSecretCredential
-from azure.mgmt.resource import ResourceManagementClient
+from azure.mgmt.resource import ResourceManagementClient, SubscriptionClient
 from azure.mgmt.compute import ComputeManagementClient
 from azure.mgmt.storage import StorageManagementClient
 from azure.mgmt.network import NetworkManagementClient
 import logging
 import helpers
 
+CREDENTIAL_ENV = ["AZURE_CLIENT_ID", "AZURE_TENANT_ID", "AZURE_CLIENT_SECRET"]
+
+
+class AzureClientRegistry:
+    """
+    Process-wide cache of the Azure credential and management clients.
+
+    All clients share one ClientSecretCredential (and therefore one token cache)
+    and one pooled HTTP transport, so blueprints and helpers no longer pay for
+    token acquisition and TLS handshakes per module or per request. The cache is
+    keyed on the AZURE_* environment variables and is rebuilt when they change,
+    e.g. after AzureSetup.azure_auth stores new credentials.
+    """
 
-class AzureClients:
     def __init__(self):
-        self.credential = None
-        self.subscription_id = None
-        self.resource_client = None
-        self.compute_client = None
-        self.storage_client = None
-        self.network_client = None
         self.logger = logging.getLogger(helpers.LOGGER_NAME)
+        self._lock = threading.RLock()
+        self._fingerprint = None
+        self._credential = None
+        self._clients = {}
+        self._transport = None
 
-    def get_credential(self):
-        required_env = ["AZURE_CLIENT_ID", "AZURE_TENANT_ID", "AZURE_CLIENT_SECRET"]
-        missing = [key for key in required_env if not os.getenv(key)]
-        if missing:
-            self.logger.warning(f"Azure credentials not set. Missing: {', '.join(missing)}")
-            return None 
+    def _current_fingerprint(self):
+        return tuple(os.getenv(key) for key in CREDENTIAL_ENV + ["AZURE_SUBSCRIPTION_ID"])
+
+    def _check_rotation(self):
+        fingerprint = self._current_fingerprint()
+        if fingerprint != self._fingerprint:
+            if self._fingerprint is not None:
+                self.logger.info("AZURE_CLIENT_REGISTRY: Credentials changed, rebuilding clients.")
+            self._fingerprint = fingerprint
+            self._credential = None
+            self._clients = {}
 
-        self.credential = ClientSecretCredential(
-            tenant_id=os.environ["AZURE_TENANT_ID"],
-            client_id=os.environ["AZURE_CLIENT_ID"],
-            client_secret=os.environ["AZURE_CLIENT_SECRET"]
-        )
-        self.logger.info("Azure credential initialized.")
+    def reset(self):
+        """Drop the cached credential and clients; they are rebuilt on next use."""
+        with self._lock:
+            self._fingerprint = None
+            self._credential = None
+            self._clients = {}
 
-        return self.credential
+    def get_transport(self):
+        with self._lock:
+            if self._transport is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=helpers.AZURE_HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=helpers.AZURE_HTTP_POOL_MAXSIZE
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                # session_owner=False keeps a client's close() from closing the shared session
+                self._transport = RequestsTransport(session=session, session_owner=False)
+            return self._transport
+
+    def get_credential(self):
+        with self._lock:
+            self._check_rotation()
+            if self._credential is None:
+                missing = [key for key in CREDENTIAL_ENV if not os.getenv(key)]
+                if missing:
+                    self.logger.warning(f"Azure credentials not set. Missing: {', '.join(missing)}")
+                    return None
+
+                self._credential = ClientSecretCredential(
+                    tenant_id=os.environ["AZURE_TENANT_ID"],
+                    client_id=os.environ["AZURE_CLIENT_ID"],
+                    client_secret=os.environ["AZURE_CLIENT_SECRET"],
+                    transport=self.get_transport()
+                )
+                self.logger.info("Azure credential initialized.")
+            return self._credential
 
     def get_subscription_id(self):
-        if self.subscription_id is None:
-            self.subscription_id =  os.getenv("AZURE_SUBSCRIPTION_ID")
-        return self.subscription_id
-    
+        return os.getenv("AZURE_SUBSCRIPTION_ID")
+
     def get_auth_config(self):
         credential = self.get_credential()
         subscription_id = self.get_subscription_id()
@@ -47,30 +95,53 @@ class AzureClients:
             raise RuntimeError("Azure credentials are not set in the environment.")
         if not subscription_id:
             raise RuntimeError("AZURE_SUBSCRIPTION_ID is not set.")
-        
+
         return credential, subscription_id
 
+    def get_client(self, client_class):
+        with self._lock:
+            self._check_rotation()
+            client = self._clients.get(client_class)
+            if client is None:
+                credential, subscription_id = self.get_auth_config()
+                if client_class is SubscriptionClient:
+                    client = client_class(credential, transport=self.get_transport())
+                else:
+                    client = client_class(credential, subscription_id, transport=self.get_transport())
+                self._clients[client_class] = client
+            return client
+
+
+azure_client_registry = AzureClientRegistry()
+
+
+class AzureClients:
+    """Per-module handle onto the shared azure_client_registry."""
+
+    def __init__(self):
+        self.registry = azure_client_registry
+        self.logger = logging.getLogger(helpers.LOGGER_NAME)
+
+    def get_credential(self):
+        return self.registry.get_credential()
+
+    def get_subscription_id(self):
+        return self.registry.get_subscription_id()
+
+    def get_auth_config(self):
+        return self.registry.get_auth_config()
+
     def get_resource_client(self):
-        if self.resource_client is None:
-            credential, subscription_id = self.get_auth_config()
-            self.resource_client = ResourceManagementClient(credential, subscription_id)
-        return self.resource_client
-    
+        return self.registry.get_client(ResourceManagementClient)
+
     def get_compute_client(self):
-        if self.compute_client is None:
-            credential, subscription_id = self.get_auth_config()
-            self.compute_client = ComputeManagementClient(credential, subscription_id)
-        return self.compute_client
-    
+        return self.registry.get_client(ComputeManagementClient)
+
     def get_storage_client(self):
-        if self.storage_client is None:
-            credential, subscription_id = self.get_auth_config()
-            self.storage_client = StorageManagementClient(credential, subscription_id)
-        return self.storage_client 
-    
+        return self.registry.get_client(StorageManagementClient)
+
     def get_network_client(self):
-        if self.network_client is None:
-            credential, subscription_id = self.get_auth_config()
-            self.network_client = NetworkManagementClient(credential, subscription_id)
-        return self.network_client 
-    
+        return self.registry.get_client(NetworkManagementClient)
+
+    def get_subscription_client(self):
+        return self.registry.get_client(SubscriptionClient)
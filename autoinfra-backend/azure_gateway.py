@@ -0,0 +1,136 @@
+from typing import Dict, List, Optional
+import logging
+from azure.mgmt.resource.resources.models import TagsPatchResource, Tags
+from azure.mgmt.compute.models import RunCommandInput, RunCommandInputParameter
+from azure_clients import AzureClients
+import helpers
+
+
+class AzureGateway:
+    """
+    SDK equivalents of the `az` CLI commands the backend used to shell out to.
+
+    Every call goes through the shared clients from azure_clients, so there is no
+    CLI interpreter startup or separate `az login` per operation. Return values
+    mirror the JSON the corresponding CLI query produced, so callers that used
+    to json.loads() CLI output can switch over without reshaping data.
+    """
+
+    def __init__(self):
+        self.azure_clients = AzureClients()
+        self.logger = logging.getLogger(helpers.LOGGER_NAME)
+
+    ### Resource groups / tags
+
+    def update_tags(self, resource_id: str, tags: Dict[str, str], operation: str = "Merge") -> None:
+        """az tag update --resource-id <id> --operation Merge --tags k=v"""
+        resource_client = self.azure_clients.get_resource_client()
+        parameters = TagsPatchResource(operation=operation, properties=Tags(tags=tags))
+        resource_client.tags.begin_update_at_scope(resource_id, parameters).result()
+
+    def list_resource_groups(self, name_prefix: Optional[str] = None) -> List[str]:
+        """az group list --query "[?starts_with(name, '<prefix>')].name" """
+        resource_client = self.azure_clients.get_resource_client()
+        names = [group.name for group in resource_client.resource_groups.list()]
+        if name_prefix:
+            names = [name for name in names if name.startswith(name_prefix)]
+        return names
+
+    def delete_resource_group(self, resource_group: str, wait: bool = True) -> None:
+        """az group delete --name <rg> -y"""
+        resource_client = self.azure_clients.get_resource_client()
+        poller = resource_client.resource_groups.begin_delete(resource_group)
+        if wait:
+            poller.result()
+
+    def list_resources(self, resource_group: str, resource_type: Optional[str] = None, tag: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """az resource list --resource-group <rg> filtered by type and a single tag"""
+        resource_client = self.azure_clients.get_resource_client()
+        results = []
+        for resource in resource_client.resources.list_by_resource_group(resource_group):
+            if resource_type and resource.type != resource_type:
+                continue
+            if tag and any((resource.tags or {}).get(key) != value for key, value in tag.items()):
+                continue
+            results.append({"name": resource.name, "type": resource.type, "id": resource.id, "tags": resource.tags or {}})
+        return results
+
+    ### Shared image gallery
+
+    def list_image_definitions(self, resource_group: str, gallery_name: str) -> List[str]:
+        """az sig image-definition list --query "[].name" """
+        compute_client = self.azure_clients.get_compute_client()
+        return [image.name for image in compute_client.gallery_images.list_by_gallery(resource_group, gallery_name)]
+
+    def list_image_versions(self, resource_group: str, gallery_name: str, image_definition: str) -> List[str]:
+        """az sig image-version list --query "[].name" """
+        compute_client = self.azure_clients.get_compute_client()
+        return [
+            version.name for version in
+            compute_client.gallery_image_versions.list_by_gallery_image(resource_group, gallery_name, image_definition)
+        ]
+
+    def delete_image_version(self, resource_group: str, gallery_name: str, image_definition: str, version: str) -> None:
+        compute_client = self.azure_clients.get_compute_client()
+        compute_client.gallery_image_versions.begin_delete(resource_group, gallery_name, image_definition, version).result()
+
+    def delete_image_definition(self, resource_group: str, gallery_name: str, image_definition: str) -> None:
+        compute_client = self.azure_clients.get_compute_client()
+        compute_client.gallery_images.begin_delete(resource_group, gallery_name, image_definition).result()
+
+    ### Virtual machines
+
+    def list_vm_ip_addresses(self, resource_group: str) -> List[Dict[str, Optional[str]]]:
+        """
+        az vm list-ip-addresses --query "[].{name, privateIP, publicIP}"
+
+        Resolved with three list calls (VMs, NICs, public IPs) for the whole
+        resource group instead of one lookup per VM.
+        """
+        compute_client = self.azure_clients.get_compute_client()
+        network_client = self.azure_clients.get_network_client()
+
+        nics = {nic.id.lower(): nic for nic in network_client.network_interfaces.list(resource_group)}
+        public_ips = {ip.id.lower(): ip.ip_address for ip in network_client.public_ip_addresses.list(resource_group)}
+
+        results = []
+        for vm in compute_client.virtual_machines.list(resource_group):
+            private_ip = None
+            public_ip = None
+            interfaces = vm.network_profile.network_interfaces if vm.network_profile else []
+            for interface in interfaces or []:
+                nic = nics.get(interface.id.lower())
+                if not nic:
+                    continue
+                for config in nic.ip_configurations or []:
+                    if private_ip is None and config.private_ip_address:
+                        private_ip = config.private_ip_address
+                    if public_ip is None and config.public_ip_address and config.public_ip_address.id:
+                        public_ip = public_ips.get(config.public_ip_address.id.lower())
+            results.append({"name": vm.name, "privateIP": private_ip, "publicIP": public_ip})
+        return results
+
+    def run_powershell(self, resource_group: str, vm_name: str, script: str, script_parameters: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """
+        az vm run-command invoke --command-id RunPowerShellScript [--parameters name=value ...]
+
+        Returns {"stdout": ..., "stderr": ...} from the instance view messages.
+        """
+        compute_client = self.azure_clients.get_compute_client()
+        parameters = RunCommandInput(
+            command_id="RunPowerShellScript",
+            script=[script],
+            parameters=[RunCommandInputParameter(name=name, value=value) for name, value in (script_parameters or {}).items()] or None
+        )
+        result = compute_client.virtual_machines.begin_run_command(resource_group, vm_name, parameters).result()
+
+        output = {"stdout": "", "stderr": ""}
+        for item in (result.value or []):
+            if item.code and "StdOut" in item.code:
+                output["stdout"] = item.message or ""
+            elif item.code and "StdErr" in item.code:
+                output["stderr"] = item.message or ""
+        return output
+
+
+azure_gateway = AzureGateway()
@@ -3,6 +3,7 @@ import logging
 from azure.identity import ClientSecretCredential
 from azure.mgmt.resource import SubscriptionClient
 import helpers
+from azure_clients import azure_client_registry
 
 class AzureSetup:
     def __init__(self):
@@ -35,6 +36,7 @@ class AzureSetup:
         try:
             self.validate_creds(client_id, client_secret, tenant_id, subscription_id)
             self.set_env_with_creds(client_id, client_secret, tenant_id, subscription_id)
+            azure_client_registry.reset()
 
             self.logger.info(f"AZURE_AUTH: Successfully authenticated to subscription {subscription_id}")
             helpers.update_config_value("azureAuth", "true")
@@ -52,12 +54,11 @@ class AzureSetup:
             if not all(env.values()):
                 raise Exception("Missing environment variables")
 
-            self.validate_creds(
-                env["AZURE_CLIENT_ID"],
-                env["AZURE_CLIENT_SECRET"],
-                env["AZURE_TENANT_ID"],
-                env["AZURE_SUBSCRIPTION_ID"]
-            )
+            # Reuse the shared credential so repeated checks hit its token cache
+            sub_client = azure_client_registry.get_client(SubscriptionClient)
+            valid_ids = [sub.subscription_id for sub in sub_client.subscriptions.list()]
+            if env["AZURE_SUBSCRIPTION_ID"] not in valid_ids:
+                raise Exception(f"Provided subscription ID {env['AZURE_SUBSCRIPTION_ID']} is not valid.")
 
             self.logger.info("CHECK_AUTH: Successfully validated credentials.")
             return {"message": "Authorized"}
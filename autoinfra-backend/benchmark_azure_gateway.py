@@ -0,0 +1,216 @@
+"""
+Compare per-call latency of the old `az` CLI subprocess calls with the
+AzureGateway SDK calls that replaced them.
+
+Live, against a subscription (needs the usual AZURE_* environment variables
+and a logged-in `az` CLI):
+
+    python benchmark_azure_gateway.py --resource-group <deployment-rg> --iterations 5
+
+Offline, without Azure access or the Azure SDK and requests installed:
+
+    python benchmark_azure_gateway.py --offline --iterations 20 --service-latency 0.05
+
+In offline mode every CLI call still spawns a process through command_runner,
+but the process is a stand-in for `az` that only starts a Python interpreter,
+waits --service-latency seconds per ARM request and prints the canned JSON
+the real query would. AzureGateway runs against in-memory clients that wait
+the same latency per request. Both paths make the same number of requests
+(e.g. VMs, NICs and public IPs for the IP lookup) and return the same data,
+which is checked before timing.
+The real CLI also loads azure-cli on every call, so the offline CLI numbers
+are a lower bound.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import command_runner
+import helpers
+
+# Stand-in for `az`: argv[1] is the JSON to print, argv[2] the simulated latency of its requests
+FAKE_AZ = "import sys, time; time.sleep(float(sys.argv[2])); sys.stdout.write(sys.argv[1])"
+
+# Azure SDK modules and their HTTP stack, imported by azure_gateway/azure_clients
+SDK_MODULES = (
+    "requests", "requests.adapters", "azure", "azure.core", "azure.core.pipeline", "azure.core.pipeline.transport", "azure.identity",
+    "azure.mgmt", "azure.mgmt.resource", "azure.mgmt.resource.resources", "azure.mgmt.resource.resources.models",
+    "azure.mgmt.compute", "azure.mgmt.compute.models", "azure.mgmt.storage", "azure.mgmt.network"
+)
+
+
+def import_gateway(offline):
+    """azure_gateway module; offline, missing SDK modules are replaced by mocks"""
+    if offline:
+        for name in SDK_MODULES:
+            try:
+                __import__(name)
+            except ImportError:
+                sys.modules[name] = mock.MagicMock()
+    import azure_gateway
+    return azure_gateway
+
+
+def time_calls(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def cli_json(command):
+    return json.loads(command_runner.run_command_and_read_output(command))
+
+
+def build_cases(gateway, resource_group, gallery_name, image_definition):
+    """(name, CLI call, SDK call) for each gateway method with a CLI equivalent"""
+    cases = [
+        (
+            "list resource groups",
+            lambda: cli_json(["az", "group", "list", "--query", f"[?starts_with(name, '{helpers.SAVED_DEPLOYMENT_PREFIX}')].name", "--output", "json"]),
+            lambda: gateway.list_resource_groups(helpers.SAVED_DEPLOYMENT_PREFIX)
+        ),
+        (
+            "list image definitions",
+            lambda: cli_json(["az", "sig", "image-definition", "list", "--resource-group", helpers.VM_IMAGE_GALLERY_RESOURCE_GROUP,
+                              "--gallery-name", gallery_name, "--query", "[].name", "--output", "json"]),
+            lambda: gateway.list_image_definitions(helpers.VM_IMAGE_GALLERY_RESOURCE_GROUP, gallery_name)
+        ),
+    ]
+    if image_definition:
+        cases.append((
+            "list image versions",
+            lambda: cli_json(["az", "sig", "image-version", "list", "--resource-group", helpers.VM_IMAGE_GALLERY_RESOURCE_GROUP,
+                              "--gallery-name", gallery_name, "--gallery-image-definition", image_definition,
+                              "--query", "[].name", "--output", "json"]),
+            lambda: gateway.list_image_versions(helpers.VM_IMAGE_GALLERY_RESOURCE_GROUP, gallery_name, image_definition)
+        ))
+    if resource_group:
+        cases.append((
+            "list VM resources",
+            lambda: cli_json(["az", "resource", "list", "--resource-group", resource_group,
+                              "--query", "[?type=='Microsoft.Compute/virtualMachines'].name", "--output", "json"]),
+            lambda: [resource["name"] for resource in gateway.list_resources(resource_group, resource_type="Microsoft.Compute/virtualMachines")]
+        ))
+        cases.append((
+            "list VM IP addresses",
+            lambda: cli_json(["az", "vm", "list-ip-addresses", "--resource-group", resource_group,
+                              "--query", "[].{name: virtualMachine.name, privateIP: virtualMachine.network.privateIpAddresses[0], publicIP: virtualMachine.network.publicIpAddresses[0].ipAddress}",
+                              "--output", "json"]),
+            lambda: gateway.list_vm_ip_addresses(resource_group)
+        ))
+    return cases
+
+
+### Offline fakes
+
+class FakeLister:
+    """Client operations group whose methods wait the service latency and return canned objects"""
+
+    requests = 0  # ARM requests made through any FakeLister
+
+    def __init__(self, latency, **methods):
+        self._latency = latency
+        self._methods = methods
+
+    def __getattr__(self, name):
+        items = self._methods[name]
+
+        def call(*args, **kwargs):
+            FakeLister.requests += 1
+            time.sleep(self._latency)
+            return iter(items)
+        return call
+
+
+def fake_clients(latency, vm_count=10):
+    """AzureClients stand-in with a small deployment: saved groups, gallery images and VMs with IPs"""
+    named = lambda names: [SimpleNamespace(name=name) for name in names]
+    rg_id = "/subscriptions/0/resourceGroups/rg/providers"
+    nics, public_ips, vms, resources = [], [], [], []
+    for i in range(vm_count):
+        nic_id, ip_id = f"{rg_id}/Microsoft.Network/networkInterfaces/vm{i}-nic", f"{rg_id}/Microsoft.Network/publicIPAddresses/vm{i}-ip"
+        public_ip = SimpleNamespace(id=ip_id) if i % 2 == 0 else None
+        nics.append(SimpleNamespace(id=nic_id, ip_configurations=[SimpleNamespace(private_ip_address=f"10.0.0.{i + 4}", public_ip_address=public_ip)]))
+        if public_ip:
+            public_ips.append(SimpleNamespace(id=ip_id, ip_address=f"20.1.1.{i + 1}"))
+        vms.append(SimpleNamespace(name=f"vm{i}", network_profile=SimpleNamespace(network_interfaces=[SimpleNamespace(id=nic_id)])))
+        resources.append(SimpleNamespace(name=f"vm{i}", type="Microsoft.Compute/virtualMachines", id=f"{rg_id}/Microsoft.Compute/virtualMachines/vm{i}", tags={}))
+        resources.append(SimpleNamespace(name=f"vm{i}-nic", type="Microsoft.Network/networkInterfaces", id=nic_id, tags={}))
+
+    groups = named([f"{helpers.SAVED_DEPLOYMENT_PREFIX}{i}" for i in range(5)] + [f"Deployment{i}" for i in range(20)])
+    resource_client = SimpleNamespace(
+        resource_groups=FakeLister(latency, list=groups),
+        resources=FakeLister(latency, list_by_resource_group=resources)
+    )
+    compute_client = SimpleNamespace(
+        gallery_images=FakeLister(latency, list_by_gallery=named([f"Image{i}" for i in range(15)])),
+        gallery_image_versions=FakeLister(latency, list_by_gallery_image=named(["1.0.0", "1.0.1", "1.1.0"])),
+        virtual_machines=FakeLister(latency, list=vms)
+    )
+    network_client = SimpleNamespace(
+        network_interfaces=FakeLister(latency, list=nics),
+        public_ip_addresses=FakeLister(latency, list=public_ips)
+    )
+    return SimpleNamespace(
+        get_resource_client=lambda: resource_client,
+        get_compute_client=lambda: compute_client,
+        get_network_client=lambda: network_client
+    )
+
+
+def offline_cli(cases, latency):
+    """
+    Replace each case's CLI call by the stand-in `az`, printing what the SDK
+    call returns after as many simulated requests as the SDK call makes
+    """
+    offline_cases = []
+    for name, _, sdk_call in cases:
+        FakeLister.requests = 0
+        expected = json.dumps(sdk_call())
+        command = [sys.executable, "-c", FAKE_AZ, expected, str(latency * FakeLister.requests)]
+        offline_cases.append((name, lambda command=command: cli_json(command), sdk_call))
+    return offline_cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--resource-group", help="Deployment resource group for the VM lookups")
+    parser.add_argument("--gallery-name", default=helpers.VM_IMAGE_GALLERY_NAME)
+    parser.add_argument("--image-definition", help="Image definition for the version listing")
+    parser.add_argument("--offline", action="store_true", help="Use a stand-in az CLI and in-memory SDK clients")
+    parser.add_argument("--service-latency", type=float, default=0.05, help="Simulated seconds per Azure request in offline mode")
+    args = parser.parse_args()
+
+    gateway = import_gateway(args.offline).AzureGateway()
+    if args.offline:
+        gateway.azure_clients = fake_clients(args.service_latency)
+        cases = offline_cli(build_cases(gateway, args.resource_group or "rg", args.gallery_name, args.image_definition or "Image0"),
+                            args.service_latency)
+    else:
+        cases = build_cases(gateway, args.resource_group, args.gallery_name, args.image_definition)
+
+    print(f"{'operation':<24} {'az CLI (s)':>12} {'SDK (s)':>12} {'speedup':>9}")
+    for name, cli_call, sdk_call in cases:
+        if args.offline and cli_call() != sdk_call():
+            raise RuntimeError(f"{name}: CLI and SDK results differ")
+        # First SDK call includes token acquisition and the TLS handshake; report the warm median
+        sdk_call()
+        cli_median = statistics.median(time_calls(cli_call, args.iterations))
+        sdk_median = statistics.median(time_calls(sdk_call, args.iterations))
+        print(f"{name:<24} {cli_median:>12.3f} {sdk_median:>12.3f} {cli_median / sdk_median:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
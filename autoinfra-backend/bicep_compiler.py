@@ -0,0 +1,203 @@
+"""
+Bicep compilation with a content-addressed cache of the compiled ARM templates.
+
+`az bicep build` takes several seconds per run, and most builds compile the
+same ScenarioManager.bicep against unchanged modules. A compile is keyed by a
+sha256 over the source file and every file it transitively references:
+- modules (module x './base/Foo.bicep'), e.g. under templates/base and
+  templates/generated
+- files embedded with loadTextContent()/loadJsonContent()/loadFileAsBase64(),
+  such as the PowerShell scripts in config/
+
+each recorded with its path relative to the source file. The compiled JSON of
+every successful compile is stored as <key>.json in BICEP_CACHE_DIRECTORY;
+a compile whose key is already cached copies that JSON to the output file
+instead of running az. Failed compiles are not cached.
+
+File hashes are kept in memory by inode/mtime/size, so computing the key of
+an unchanged tree costs one stat per file. Entries written by a different
+Bicep CLI version are not told apart: clear the cache directory after
+upgrading it.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import command_runner
+import helpers
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+CACHE_FORMAT_VERSION = 1
+
+_MODULE_REFERENCE = re.compile(r"^\s*module\s+\w+\s+'([^']+)'", re.MULTILINE)
+_FILE_REFERENCE = re.compile(r"\bload(?:TextContent|JsonContent|YamlContent|FileAsBase64)\(\s*'([^']+)'")
+
+
+class CompileResult(NamedTuple):
+    exit_code: int
+    output: str
+    template: Optional[Dict[str, Any]]  # Compiled template, None when the compile failed
+    cached: bool
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class BicepCompiler:
+    def __init__(self, cache_directory: str = helpers.BICEP_CACHE_DIRECTORY,
+                 max_entries: int = helpers.BICEP_CACHE_MAX_ENTRIES):
+        self.cache_directory = cache_directory
+        self.max_entries = max_entries
+        # Absolute path -> (signature, sha256, absolute paths of referenced files)
+        self._files: Dict[str, Tuple[Tuple[int, int, int], str, Tuple[str, ...]]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _file_info(self, path: str) -> Optional[Tuple[str, Tuple[str, ...]]]:
+        """(sha256, referenced files) of a file, or None when it does not exist"""
+        signature = _file_signature(path)
+        if signature is None:
+            return None
+        with self._lock:
+            cached = self._files.get(path)
+        if cached and cached[0] == signature:
+            return cached[1], cached[2]
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        references: Tuple[str, ...] = ()
+        if path.endswith('.bicep'):
+            text = data.decode('utf-8', errors='replace')
+            directory = os.path.dirname(path)
+            references = tuple(
+                os.path.normpath(os.path.join(directory, reference))
+                for reference in _MODULE_REFERENCE.findall(text) + _FILE_REFERENCE.findall(text)
+                if ':' not in reference  # Registry (br:) and template spec (ts:) modules
+            )
+        sha256 = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._files[path] = (signature, sha256, references)
+        return sha256, references
+
+    def source_hash(self, bicep_path: str) -> str:
+        """Cache key of a Bicep file: its content and that of every file it transitively references"""
+        root = os.path.abspath(bicep_path)
+        root_directory = os.path.dirname(root)
+        seen = {root}
+        pending = [root]
+        entries: List[str] = []
+        while pending:
+            path = pending.pop()
+            info = self._file_info(path)
+            relative_path = os.path.relpath(path, root_directory).replace(os.sep, '/')
+            if info is None:
+                # Still compiled, so az reports the missing file; the entry keeps the key distinct
+                entries.append(f"{relative_path} missing")
+                continue
+            sha256, references = info
+            entries.append(f"{relative_path} {sha256}")
+            for reference in references:
+                if reference not in seen:
+                    seen.add(reference)
+                    pending.append(reference)
+
+        key_material = f"v{CACHE_FORMAT_VERSION}\n" + "\n".join(sorted(entries))
+        return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_directory, f"{key}.json")
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _write_output(self, json_path: str, data: bytes) -> None:
+        """Write compiled JSON to the output file unless it already holds it"""
+        try:
+            with open(json_path, 'rb') as f:
+                if f.read() == data:
+                    return
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(json_path) or '.', exist_ok=True)
+        temp_path = f"{json_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, json_path)
+
+    def _store(self, key: str, data: bytes) -> None:
+        os.makedirs(self.cache_directory, exist_ok=True)
+        path = self._cache_path(key)
+        # Write to a temp file and rename so a concurrent reader never sees a partial template
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self._prune()
+
+    def _prune(self) -> None:
+        """Drop the least recently used entries beyond max_entries"""
+        try:
+            entries = [entry for entry in os.scandir(self.cache_directory) if entry.name.endswith('.json')]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def compile(self, bicep_path: str, json_path: str) -> CompileResult:
+        """
+        Compile bicep_path to json_path, or copy the cached template of the
+        same sources there. The az output and exit code come from a single run.
+        """
+        key = self.source_hash(bicep_path)
+        cache_path = self._cache_path(key)
+        with self._key_lock(key):
+            try:
+                with open(cache_path, 'rb') as f:
+                    data = f.read()
+                template = json.loads(data)
+            except (OSError, ValueError):
+                template = None
+            if template is not None:
+                self._write_output(json_path, data)
+                os.utime(cache_path)  # Mark as recently used for _prune()
+                logger.info(f"BICEP_COMPILER: Using cached template for {bicep_path} ({key[:12]})")
+                return CompileResult(0, f"Using cached template {key[:12]}", template, True)
+
+            command = ["az", "bicep", "build", "--file", bicep_path, "--outfile", json_path]
+            output, exit_code = command_runner.run_command_and_get_output_and_exit_code(command)
+            if exit_code != 0:
+                return CompileResult(exit_code, output, None, False)
+
+            try:
+                with open(json_path, 'rb') as f:
+                    data = f.read()
+                template = json.loads(data)
+            except (OSError, ValueError) as e:
+                return CompileResult(1, f"{output}\nCould not read compiled template {json_path}: {e}", None, False)
+
+            try:
+                self._store(key, data)
+            except OSError as e:
+                logger.warning(f"BICEP_COMPILER: Could not cache template for {bicep_path}: {e}")
+            logger.info(f"BICEP_COMPILER: Compiled {bicep_path} ({key[:12]}, {len(data)} bytes)")
+            return CompileResult(0, output, template, False)
+
+
+bicep_compiler = BicepCompiler()
@@ -0,0 +1,113 @@
+"""
+On-disk cache of parsed BloodHound uploads.
+
+Parsing a large SharpHound export is by far the slowest step of the import
+flow, and the result only depends on the uploaded zip. ParsedBloodHoundData is
+pickled (protocol 5) once per upload, keyed by upload ID and the SHA-256 of the
+zip, so regenerating a topology with different options loads the parsed data
+instead of parsing the archive again. The most recently used entries are also
+kept in memory.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from bloodhound.parser import ParsedBloodHoundData
+
+logger = logging.getLogger(__name__)
+
+# Bump when ParsedBloodHoundData changes shape so stale cache files are ignored
+CACHE_FORMAT_VERSION = 4
+CACHE_FILE_SUFFIX = ".pickle"
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParsedDataCache:
+    """Parsed BloodHound data by (upload ID, content hash), on disk and in a small LRU"""
+
+    def __init__(self, directory: str, memory_entries: int = 2):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[Tuple[str, str], ParsedBloodHoundData]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, upload_id: str, content_hash: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}-{content_hash[:16]}{CACHE_FILE_SUFFIX}")
+
+    def _remember(self, key: Tuple[str, str], data: ParsedBloodHoundData) -> None:
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, upload_id: str, content_hash: str) -> Optional[ParsedBloodHoundData]:
+        """Cached parse result, or None when this upload/content has not been parsed yet"""
+        key = (upload_id, content_hash)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+
+        path = self._path(upload_id, content_hash)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"BLOODHOUND_CACHE: Ignoring unreadable cache file {path}: {e}")
+            return None
+        if entry.get("version") != CACHE_FORMAT_VERSION or entry.get("content_hash") != content_hash:
+            return None
+
+        data = entry["data"]
+        self._remember(key, data)
+        return data
+
+    def put(self, upload_id: str, content_hash: str, data: ParsedBloodHoundData) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(upload_id, content_hash)
+        entry = {"version": CACHE_FORMAT_VERSION, "upload_id": upload_id, "content_hash": content_hash, "data": data}
+
+        # Write to a temp file and rename so a concurrent reader never sees a partial pickle
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=5)
+        os.replace(temp_path, path)
+        self._remember((upload_id, content_hash), data)
+        logger.info(f"BLOODHOUND_CACHE: Cached parsed data for upload {upload_id} ({os.path.getsize(path)} bytes)")
+
+    def get_or_parse(self, upload_id: str, content_hash: str, parse) -> ParsedBloodHoundData:
+        """Cached data for the upload, or parse() it and cache the result"""
+        data = self.get(upload_id, content_hash)
+        if data is None:
+            data = parse()
+            self.put(upload_id, content_hash, data)
+        return data
+
+    def delete(self, upload_id: str) -> None:
+        """Drop every cached entry of an upload"""
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == upload_id]:
+                del self._memory[key]
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if filename.startswith(f"{upload_id}-") and filename.endswith(CACHE_FILE_SUFFIX):
+                os.remove(os.path.join(self.directory, filename))
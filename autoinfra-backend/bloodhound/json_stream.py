@@ -0,0 +1,122 @@
+"""
+Incremental reader for SharpHound JSON files.
+
+SharpHound writes each object type as {"data": [...], "meta": {...}}. For large
+exports the data array can be gigabytes, so instead of json.load() on the whole
+file, iter_json_array() walks the top-level object with json.JSONDecoder.raw_decode
+and yields the items of one array key one at a time. Only the item currently
+being decoded (plus one read chunk) is held in memory.
+"""
+
+import json
+from typing import Any, Dict, Iterator, TextIO
+
+# Characters read from the underlying file per refill
+READ_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = " \t\n\r"
+
+
+class _StreamReader:
+    """Text buffer over a file object with raw_decode that refills on truncated input."""
+
+    def __init__(self, fp: TextIO, chunk_size: int = READ_CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size: int) -> bool:
+        if self.eof:
+            return False
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.fp.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ("" at end of input)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON: expected '{char}', found '{found or 'end of input'}'")
+        self.pos += 1
+
+    def decode(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Value is cut off at the end of the buffer; grow the read size with
+                # the pending value so a huge item is not re-decoded once per chunk
+                if not self._fill(max(self.chunk_size, len(self.buffer) - self.pos)):
+                    raise
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # A number at the very end of the buffer may continue in the next chunk
+                if self._fill(self.chunk_size):
+                    continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(fp: TextIO, key: str = "data", chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the items of the top-level array `key` from a JSON object, one at a time.
+
+    Other top-level keys are decoded and discarded. A file whose top level is an
+    array is treated as that array.
+    """
+    reader = _StreamReader(fp, chunk_size)
+
+    if reader.peek() == "[":
+        yield from _iter_array(reader)
+        return
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.decode()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            yield from _iter_array(reader)
+        else:
+            reader.decode()
+
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("}")
+        return
+
+
+def _iter_array(reader: _StreamReader) -> Iterator[Any]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.decode()
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("]")
+        return
@@ -41,10 +41,12 @@ AutoInfra topology format:
 """
 
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 
 from .parser import ParsedBloodHoundData, BloodHoundComputer, BloodHoundUser
+from .graph import AttackGraph, EDGE_NAMES, EDGE_WEIGHTS, NODE_USER, Path
+from .network import SubnetAllocator, apportion, parent_domain, sample_round_robin
 
 logger = logging.getLogger(__name__)
 
@@ -54,11 +56,12 @@ class TopologyConfig:
     """Configuration options for topology generation"""
     admin_username: str = "labadmin"
     admin_password: str = "P@ssw0rd123!"
-    base_ip_prefix: str = "10.10.0"
+    base_ip_prefix: str = "10.10.0"  # Subnet of the root domain (see bloodhound.network)
     start_ip_octet: int = 5
     include_jumpbox: bool = True
     include_all_machines: bool = True  # If False, only include DCs
-    max_workstations: int = 10  # Limit workstations to avoid huge deployments
+    max_workstations: int = 10  # Limit workstations to avoid huge deployments, sampled across domains and OUs
+    max_acl_attacks: int = 20  # Limit ACL attacks taken from multi-hop paths and single ACEs
 
 
 class TopologyMapper:
@@ -74,7 +77,6 @@ class TopologyMapper:
     def __init__(self, config: Optional[TopologyConfig] = None):
         self.config = config or TopologyConfig()
         self._node_counter = 0
-        self._ip_counter = self.config.start_ip_octet
     
     def map_to_topology(self, bh_data: ParsedBloodHoundData) -> Dict[str, Any]:
         """
@@ -89,7 +91,6 @@ class TopologyMapper:
         logger.info("TOPOLOGY_MAPPER: Starting topology generation from BloodHound data")
         
         self._node_counter = 0
-        self._ip_counter = self.config.start_ip_octet
         
         # Build the topology structure
         topology = {
@@ -117,8 +118,14 @@ class TopologyMapper:
         # Sort by domain depth (root domain has fewer parts)
         dc_computers.sort(key=lambda c: len(c.name.split('.')))
         
+        # Addresses for DCs, sampled workstations and the jumpbox, per domain shard
+        addresses, jumpbox_ip = self._plan_network(bh_data.computers, dc_computers, root_domain_name)
+        
         for computer in dc_computers:
-            node = self._create_dc_node(computer, root_domain_name)
+            ip_address = addresses.get(id(computer))
+            if ip_address is None:
+                continue
+            node = self._create_dc_node(computer, root_domain_name, ip_address)
             topology["nodes"].append(node)
             dc_nodes.append(node["id"])
             
@@ -130,21 +137,21 @@ class TopologyMapper:
         
         # Create workstation/server nodes
         if self.config.include_all_machines:
-            non_dc_count = 0
             for computer in bh_data.computers:
-                if not computer.is_domain_controller:
-                    if non_dc_count >= self.config.max_workstations:
-                        logger.warning(f"TOPOLOGY_MAPPER: Limiting workstations to {self.config.max_workstations}")
-                        break
-                    
-                    node = self._create_workstation_node(computer, root_domain_name)
-                    topology["nodes"].append(node)
-                    workstation_nodes.append(node["id"])
-                    non_dc_count += 1
+                if computer.is_domain_controller:
+                    continue
+                # Only the workstations sampled by _plan_network have an address
+                ip_address = addresses.get(id(computer))
+                if ip_address is None:
+                    continue
+                
+                node = self._create_workstation_node(computer, root_domain_name, ip_address)
+                topology["nodes"].append(node)
+                workstation_nodes.append(node["id"])
         
         # Add jumpbox if configured
         if self.config.include_jumpbox:
-            jumpbox_node = self._create_jumpbox_node()
+            jumpbox_node = self._create_jumpbox_node(jumpbox_ip)
             topology["nodes"].append(jumpbox_node)
             
             # Find the deepest subdomain DC (most domain parts = most nested)
@@ -256,12 +263,101 @@ class TopologyMapper:
         
         return topology
     
-    def _create_dc_node(self, computer: BloodHoundComputer, root_domain_name: str) -> Dict[str, Any]:
-        """Create a domain controller node"""
-        self._node_counter += 1
-        node_id = f"node-{self._node_counter}"
+    def _plan_network(
+        self,
+        computers: List[BloodHoundComputer],
+        dc_computers: List[BloodHoundComputer],
+        root_domain_name: str
+    ) -> Tuple[Dict[int, str], Optional[str]]:
+        """
+        Plan one address shard per domain across the VNet subnets (see
+        bloodhound.network) and sample the workstations that fit.
+        
+        Workstations are capped by max_workstations and by what is left of the
+        subnets after the DCs and the jumpbox, apportioned across domains by
+        size and sampled round-robin across each domain's OUs. Workstations of
+        a domain without a DC are placed with the root domain, whose DC they
+        get connected to.
+        
+        Returns:
+            ({id(computer): IP} for every placed DC and workstation, jumpbox IP)
+        """
+        allocator = SubnetAllocator(self.config.base_ip_prefix, self.config.start_ip_octet)
+        
+        dcs_by_domain: Dict[str, List[BloodHoundComputer]] = {}
+        for computer in dc_computers:
+            dcs_by_domain.setdefault(self._split_name(computer, root_domain_name)[1], []).append(computer)
+        
+        # Workstations by placement domain, then by OU
+        workstations: Dict[str, Dict[str, List[BloodHoundComputer]]] = {}
+        if self.config.include_all_machines:
+            for computer in computers:
+                if computer.is_domain_controller:
+                    continue
+                domain = self._split_name(computer, root_domain_name)[1]
+                if domain not in dcs_by_domain:
+                    domain = root_domain_name
+                workstations.setdefault(domain, {}).setdefault(computer.ou or '', []).append(computer)
+        
+        domains = list(dcs_by_domain) + [domain for domain in workstations if domain not in dcs_by_domain]
+        domains.sort(key=lambda domain: (domain != root_domain_name, len(domain.split('.'))))
+        
+        # The jumpbox takes the last address of the deepest DC domain's shard
+        jumpbox_domain = None
+        if self.config.include_jumpbox and domains:
+            jumpbox_domain = max(dcs_by_domain or domains, key=lambda domain: len(domain.split('.')))
+        
+        counts = {domain: sum(len(group) for group in ous.values()) for domain, ous in workstations.items()}
+        total = sum(counts.values())
+        budget = min(self.config.max_workstations, allocator.capacity - len(dc_computers) - (1 if jumpbox_domain else 0))
+        if total > budget:
+            logger.warning(f"TOPOLOGY_MAPPER: Sampling {max(budget, 0)} of {total} workstations across {len(counts)} domain(s)")
+        quotas = apportion(counts, budget)
+        
+        addresses: Dict[int, str] = {}
+        vnets: Dict[str, str] = {}
+        jumpbox_ip = None
+        for domain in domains:
+            dcs = dcs_by_domain.get(domain, [])
+            sampled = sample_round_robin(workstations.get(domain, {}).values(), quotas.get(domain, 0))
+            extra = 1 if domain == jumpbox_domain else 0
+            
+            # Children go next to their parent unless its subnet is full
+            preferred = allocator.base_vnet
+            parent = parent_domain(domain)
+            while parent is not None:
+                if parent in vnets:
+                    preferred = vnets[parent]
+                    break
+                parent = parent_domain(parent)
+            
+            shard = allocator.allocate(domain, len(dcs) + len(sampled) + extra, preferred)
+            if shard is None:
+                room = allocator.largest_free() - len(dcs) - extra
+                if room < 0:
+                    logger.warning(f"TOPOLOGY_MAPPER: No address space left for domain {domain}, skipping its {len(dcs)} DC(s)")
+                    continue
+                logger.warning(f"TOPOLOGY_MAPPER: Subnets full, keeping {room} of {len(sampled)} workstations for {domain}")
+                sampled = sampled[:room]
+                shard = allocator.allocate(domain, len(dcs) + len(sampled) + extra, preferred)
+            
+            vnets[domain] = shard.vnet
+            for index, computer in enumerate(dcs + sampled):
+                addresses[id(computer)] = shard.address(index)
+            if extra:
+                jumpbox_ip = shard.address(shard.size - 1)
+            
+            logger.info(f"TOPOLOGY_MAPPER: Domain {domain}: {len(dcs)} DC(s), {len(sampled)} workstation(s) "
+                        f"at {shard.address(0)}-{shard.address(shard.size - 1)} (vnet-{shard.vnet})")
         
-        # Extract hostname and domain from FQDN (e.g., DC02.SUB.BUILD.LAB -> DC02, sub.build.lab)
+        if self.config.include_jumpbox and jumpbox_ip is None:
+            shard = allocator.allocate("jumpbox", 1, allocator.base_vnet)
+            jumpbox_ip = shard.address(0) if shard else f"{self.config.base_ip_prefix}.{self.config.start_ip_octet}"
+        
+        return addresses, jumpbox_ip
+    
+    def _split_name(self, computer: BloodHoundComputer, root_domain_name: str) -> Tuple[str, str]:
+        """Hostname and domain from FQDN (e.g., DC02.SUB.BUILD.LAB -> DC02, sub.build.lab)"""
         parts = computer.name.split('.')
         hostname = parts[0].upper() if parts else computer.name.upper()
         
@@ -270,15 +366,20 @@ class TopologyMapper:
             computer_domain = '.'.join(parts[1:]).lower()
         else:
             computer_domain = root_domain_name
+        return hostname, computer_domain
+    
+    def _create_dc_node(self, computer: BloodHoundComputer, root_domain_name: str, ip_address: str) -> Dict[str, Any]:
+        """Create a domain controller node"""
+        self._node_counter += 1
+        node_id = f"node-{self._node_counter}"
+        
+        hostname, computer_domain = self._split_name(computer, root_domain_name)
         
         # Determine if this is a sub DC by comparing to root domain
         is_sub = computer_domain.lower() != root_domain_name.lower()
         
         logger.info(f"TOPOLOGY_MAPPER: DC {hostname} domain={computer_domain}, root={root_domain_name}, isSub={is_sub}")
         
-        ip_address = f"{self.config.base_ip_prefix}.{self._ip_counter}"
-        self._ip_counter += 1
-        
         return {
             "id": node_id,
             "type": "domainController",
@@ -293,26 +394,15 @@ class TopologyMapper:
             }
         }
     
-    def _create_workstation_node(self, computer: BloodHoundComputer, root_domain_name: str) -> Dict[str, Any]:
+    def _create_workstation_node(self, computer: BloodHoundComputer, root_domain_name: str, ip_address: str) -> Dict[str, Any]:
         """Create a workstation/server node"""
         self._node_counter += 1
         node_id = f"node-{self._node_counter}"
         
-        # Extract hostname and domain from FQDN (e.g., SRV01.SUB.BUILD.LAB -> SRV01, sub.build.lab)
-        parts = computer.name.split('.')
-        hostname = parts[0].upper() if parts else computer.name.upper()
-        
-        # Domain is everything after the hostname
-        if len(parts) > 1:
-            computer_domain = '.'.join(parts[1:]).lower()
-        else:
-            computer_domain = root_domain_name
+        hostname, computer_domain = self._split_name(computer, root_domain_name)
         
         logger.info(f"TOPOLOGY_MAPPER: Workstation {hostname} domain={computer_domain}")
         
-        ip_address = f"{self.config.base_ip_prefix}.{self._ip_counter}"
-        self._ip_counter += 1
-        
         return {
             "id": node_id,
             "type": "workstation",
@@ -327,14 +417,11 @@ class TopologyMapper:
             }
         }
     
-    def _create_jumpbox_node(self) -> Dict[str, Any]:
+    def _create_jumpbox_node(self, ip_address: str) -> Dict[str, Any]:
         """Create a Kali jumpbox node"""
         self._node_counter += 1
         node_id = f"node-{self._node_counter}"
         
-        ip_address = f"{self.config.base_ip_prefix}.{self._ip_counter}"
-        self._ip_counter += 1
-        
         return {
             "id": node_id,
             "type": "jumpbox",
@@ -456,31 +543,13 @@ class TopologyMapper:
                     "enabled": True
                 })
         
-        # ACL-based attacks - only GenericAll is supported
-        supported_acl_count = 0
-        for acl_path in bh_data.acl_attack_paths[:20]:  # Limit to first 20
-            if acl_path['right'] == 'GenericAll':
-                attacks["ACLs"].append({
-                    "grantingUser": acl_path['source'],
-                    "receivingUser": acl_path['target'],
-                    "right": acl_path['right'],
-                    "enabled": True
-                })
-                supported_acl_count += 1
-            else:
-                # Track unsupported ACL rights (WriteDacl, WriteOwner, ForceChangePassword, etc.)
-                unsupported_count += 1
-        
-        # Check if we have unsupported ACL types
-        unsupported_acl_rights = set()
-        for acl_path in bh_data.acl_attack_paths[:20]:
-            if acl_path['right'] != 'GenericAll':
-                unsupported_acl_rights.add(acl_path['right'])
-        
-        if unsupported_acl_rights:
-            for right in unsupported_acl_rights:
-                if right not in unsupported_types:
-                    unsupported_types.append(f"ACL-{right}")
+        # ACL-based attacks - only GenericAll between users is supported
+        acl_result = self._select_acl_attacks(bh_data)
+        attacks["ACLs"] = acl_result["attacks"]
+        unsupported_count += acl_result["unsupported_count"]
+        for right in acl_result["unsupported_rights"]:
+            if f"ACL-{right}" not in unsupported_types:
+                unsupported_types.append(f"ACL-{right}")
         
         # Filter out empty attack types
         attacks = {k: v for k, v in attacks.items() if v}
@@ -491,8 +560,108 @@ class TopologyMapper:
         return {
             "attacks": attacks,
             "unsupported_count": unsupported_count,
-            "unsupported_types": unsupported_types
+            "unsupported_types": unsupported_types,
+            "attack_chains": acl_result["chains"]
         }
+    
+    def _select_acl_attacks(self, bh_data: ParsedBloodHoundData) -> Dict[str, Any]:
+        """
+        Pick ACL attacks from the shortest multi-hop paths that lead enabled users
+        to Domain/Enterprise Admins or Administrators, then top up with single ACEs.
+        
+        Paths are taken longest first, and a path is only kept when it adds an ACL
+        step that no earlier path covered, so the selection shows distinct chains
+        rather than many variations of the same one. Group memberships on a path
+        are collapsed onto the user that holds them, since the sandbox only
+        recreates users.
+        """
+        limit = self.config.max_acl_attacks
+        acl_attacks: List[Dict[str, Any]] = []
+        seen_pairs = set()
+        unsupported_count = 0
+        unsupported_rights = set()
+        chains = []
+        
+        graph = AttackGraph.from_parsed(bh_data)
+        targets = graph.high_value_targets()
+        paths = list(graph.paths_to(targets).values()) if targets else []
+        paths = [path for path in paths if any(EDGE_WEIGHTS[edge] for edge in path[1])]
+        paths.sort(key=lambda path: (-sum(EDGE_WEIGHTS[edge] for edge in path[1]), graph.names[path[0][0]]))
+        
+        covered_steps = set()
+        for path in paths:
+            if len(acl_attacks) >= limit:
+                break
+            steps = self._acl_steps(graph, path)
+            if all(step in covered_steps for step in steps):
+                continue
+            covered_steps.update(steps)
+            chains.append(graph.describe(path))
+            
+            for actor, edge, target in steps:
+                right = EDGE_NAMES[edge]
+                if actor is None or right != 'GenericAll' or graph.kinds[target] != NODE_USER:
+                    unsupported_count += 1
+                    unsupported_rights.add(right)
+                    continue
+                pair = (graph.names[target], graph.names[actor])
+                if pair not in seen_pairs and len(acl_attacks) < limit:
+                    seen_pairs.add(pair)
+                    acl_attacks.append({
+                        "grantingUser": pair[0],
+                        "receivingUser": pair[1],
+                        "right": right,
+                        "chain": len(chains) - 1,
+                        "enabled": True
+                    })
+        
+        if chains:
+            logger.info(f"TOPOLOGY_MAPPER: Selected {len(chains)} multi-hop attack chain(s) out of {len(paths)} candidate path(s)")
+        
+        # Single ACEs between users, as before, for whatever room the chains left
+        for ace in bh_data.acl_attack_paths[:limit]:
+            if len(acl_attacks) >= limit:
+                break
+            if ace.right != 'GenericAll':
+                # Track unsupported ACL rights (WriteDacl, WriteOwner, ForceChangePassword, etc.)
+                unsupported_count += 1
+                unsupported_rights.add(ace.right)
+                continue
+            if ace.source_type != 'User' or ace.target_type != 'User':
+                continue
+            # Names are only resolved for the ACEs that are actually used
+            pair = (graph.names[ace.source_id], graph.names[ace.target_id])
+            if pair not in seen_pairs:
+                seen_pairs.add(pair)
+                acl_attacks.append({
+                    "grantingUser": pair[0],
+                    "receivingUser": pair[1],
+                    "right": ace.right,
+                    "enabled": True
+                })
+        
+        return {
+            "attacks": acl_attacks,
+            "unsupported_count": unsupported_count,
+            "unsupported_rights": sorted(unsupported_rights),
+            "chains": chains
+        }
+    
+    def _acl_steps(self, graph: AttackGraph, path: Path) -> List[tuple]:
+        """
+        (acting user, edge kind, object) for each ACL hop of a path. The acting
+        user is the last user reached so far; membership hops keep it unchanged.
+        """
+        nodes, edges = path
+        steps = []
+        actor = nodes[0] if graph.kinds[nodes[0]] == NODE_USER else None
+        for index, edge in enumerate(edges):
+            target = nodes[index + 1]
+            if EDGE_WEIGHTS[edge]:
+                steps.append((actor, edge, target))
+            if graph.kinds[target] == NODE_USER:
+                actor = target
+        return steps
 
 
 def map_bloodhound_to_autoinfra(
@@ -521,6 +690,7 @@ def map_bloodhound_to_autoinfra(
         "attacks": attack_result.get("attacks", {}),
         "unsupported_attacks_count": attack_result.get("unsupported_count", 0),
         "unsupported_attack_types": attack_result.get("unsupported_types", []),
+        "attack_chains": attack_result.get("attack_chains", []),
         "summary": {
             "domain": bh_data.domains[0].name if bh_data.domains else "Unknown",
             "computers_count": len(bh_data.computers),
@@ -528,6 +698,7 @@ def map_bloodhound_to_autoinfra(
             "asrep_roastable": len(bh_data.asrep_roastable_users),
             "kerberoastable": len(bh_data.kerberoastable_users),
             "delegation_issues": len(bh_data.constrained_delegation) + len(bh_data.unconstrained_delegation),
-            "acl_paths": len(bh_data.acl_attack_paths)
+            "acl_paths": len(bh_data.acl_attack_paths),
+            "attack_chains": len(attack_result.get("attack_chains", []))
         }
     }
@@ -0,0 +1,140 @@
+"""
+Network Planning for AutoInfra
+
+Plans private IPs for topologies generated from BloodHound data.
+
+The deployment templates provide three VNets, each with a single /24 subnet,
+told apart by their first octet (see build_apis.get_vnet_prefix and
+update_apis.get_vnet_config):
+- "10"  -> 10.10.0.0/24
+- "172" -> 172.16.0.0/24
+- "192" -> 192.168.0.0/24
+
+Every domain gets one contiguous block of addresses (a shard) inside one of
+these subnets, holding its DCs and its sampled workstations. A child domain
+goes into its parent's VNet while there is room and spills over into the
+emptiest other VNet once there is not, so small forests stay in one VNet and
+large ones are spread out, with peerings only where a domain and its parent
+ended up apart.
+
+Workstations are sampled per domain and, within a domain, round-robin across
+OUs, so the sandbox keeps a representative machine of each OU rather than the
+first N computers of the export. Grouping, apportioning and sampling are each
+a single pass over the computers.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# (VNet ID, subnet prefix) in the order spare capacity is used
+VNET_SUBNETS = (("10", "10.10.0"), ("172", "172.16.0"), ("192", "192.168.0"))
+
+# Azure reserves .0-.3 and .255 of every subnet
+FIRST_HOST_OCTET = 4
+LAST_HOST_OCTET = 254
+
+
+@dataclass(slots=True)
+class Shard:
+    """Contiguous block of addresses for one domain"""
+    domain: str
+    vnet: str  # "10", "172" or "192"
+    prefix: str  # First three octets, e.g. "10.10.0"
+    first: int  # Last octet of the first address
+    size: int
+
+    def address(self, index: int) -> str:
+        return f"{self.prefix}.{self.first + index}"
+
+
+class SubnetAllocator:
+    """Hands out shards from the VNet subnets, starting with the one at base_prefix"""
+
+    def __init__(self, base_prefix: str = "10.10.0", start_octet: int = FIRST_HOST_OCTET):
+        subnets = sorted(VNET_SUBNETS, key=lambda subnet: subnet[1] != base_prefix)
+        self._prefixes: Dict[str, str] = dict(subnets)
+        self._next: Dict[str, int] = {vnet: FIRST_HOST_OCTET for vnet, _ in subnets}
+        if subnets[0][1] == base_prefix:
+            self._next[subnets[0][0]] = max(start_octet, FIRST_HOST_OCTET)
+        self.base_vnet = subnets[0][0]
+
+    def free(self, vnet: str) -> int:
+        return LAST_HOST_OCTET + 1 - self._next[vnet]
+
+    @property
+    def capacity(self) -> int:
+        return sum(self.free(vnet) for vnet in self._next)
+
+    def largest_free(self) -> int:
+        return max(self.free(vnet) for vnet in self._next)
+
+    def allocate(self, domain: str, size: int, preferred: Optional[str] = None) -> Optional[Shard]:
+        """Shard of size addresses in the preferred VNet, else the emptiest one; None if nothing fits"""
+        vnet = preferred if preferred in self._next and self.free(preferred) >= size else None
+        if vnet is None:
+            vnet = max(self._next, key=self.free)
+            if self.free(vnet) < size:
+                return None
+
+        shard = Shard(domain=domain, vnet=vnet, prefix=self._prefixes[vnet], first=self._next[vnet], size=size)
+        self._next[vnet] += size
+        return shard
+
+
+def parent_domain(domain: str) -> Optional[str]:
+    """sub.build.lab -> build.lab; None for a root domain"""
+    parts = domain.split('.')
+    return '.'.join(parts[1:]) if len(parts) > 2 else None
+
+
+def apportion(counts: Dict[str, int], budget: int) -> Dict[str, int]:
+    """
+    Split budget across keys proportionally to counts (largest remainder),
+    giving every key at least one while the budget allows it.
+    """
+    quotas = {key: 0 for key in counts}
+    total = sum(counts.values())
+    if budget <= 0 or total == 0:
+        return quotas
+    if budget >= total:
+        return dict(counts)
+
+    # One each first, biggest keys first when there are more keys than budget
+    by_size = sorted((key for key in counts if counts[key]), key=lambda key: -counts[key])
+    for key in by_size[:budget]:
+        quotas[key] = 1
+    remaining = budget - min(budget, len(by_size))
+    if not remaining:
+        return quotas
+
+    spare = {key: counts[key] - quotas[key] for key in counts}
+    spare_total = sum(spare.values())
+    shares = {key: remaining * spare[key] / spare_total for key in counts}
+    for key in counts:
+        quotas[key] += int(shares[key])
+    leftover = budget - sum(quotas.values())
+    for key in sorted(counts, key=lambda key: -(shares[key] - int(shares[key])))[:leftover]:
+        quotas[key] += 1
+    return quotas
+
+
+def sample_round_robin(groups: Iterable[Sequence[Any]], quota: int) -> List[Any]:
+    """
+    Up to quota items taken round-robin across groups (largest group first),
+    so each group is represented before any group gets a second pick.
+    """
+    ordered = sorted(groups, key=len, reverse=True)
+    picked: List[Any] = []
+    depth = 0
+    while len(picked) < quota and ordered:
+        ordered = [group for group in ordered if len(group) > depth]
+        for group in ordered:
+            if len(picked) >= quota:
+                break
+            picked.append(group[depth])
+        depth += 1
+    return picked
+
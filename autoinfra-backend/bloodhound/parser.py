@@ -11,46 +11,173 @@ Parses BloodHound v6 JSON exports (from SharpHound) and extracts:
 This data is then mapped to AutoInfra's topology format for sandbox replication.
 """
 
+import io
 import json
+import sys
 import zipfile
 import os
-import tempfile
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from itertools import compress
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Sequence, TextIO, Tuple
 from dataclasses import dataclass, field
+from bloodhound.json_stream import iter_json_array
+from bloodhound.sid_table import (
+    SidTable, NODE_USER, NODE_GROUP, NODE_COMPUTER, NODE_DOMAIN, node_kind
+)
 
 logger = logging.getLogger(__name__)
 
+# Uncompressed JSON size from which parse_zip/parse_directory use a process pool by default
+PARALLEL_PARSE_MIN_BYTES = 64 << 20
+
+
+# Bit flags packed into BloodHoundUser.flags. The low byte holds everything attack
+# detection looks at and is mirrored into ParsedBloodHoundData.user_flags.
+USER_ENABLED = 1 << 0
+USER_DONTREQPREAUTH = 1 << 1          # AS-REP Roastable
+USER_HASSPN = 1 << 2                  # Kerberoastable
+USER_UNCONSTRAINED_DELEGATION = 1 << 3
+USER_TRUSTEDTOAUTH = 1 << 4           # Constrained delegation
+USER_ADMINCOUNT = 1 << 5
+USER_PASSWORDNOTREQD = 1 << 6
+USER_PWDNEVEREXPIRES = 1 << 7
+USER_IS_ADMIN = 1 << 8
+USER_IS_DOMAIN_ADMIN = 1 << 9
+
+_USER_FLAG_FIELDS = (
+    ('enabled', USER_ENABLED),
+    ('is_admin', USER_IS_ADMIN),
+    ('is_domain_admin', USER_IS_DOMAIN_ADMIN),
+    ('dontreqpreauth', USER_DONTREQPREAUTH),
+    ('hasspn', USER_HASSPN),
+    ('unconstraineddelegation', USER_UNCONSTRAINED_DELEGATION),
+    ('trustedtoauth', USER_TRUSTEDTOAUTH),
+    ('admincount', USER_ADMINCOUNT),
+    ('passwordnotreqd', USER_PASSWORDNOTREQD),
+    ('pwdneverexpires', USER_PWDNEVEREXPIRES),
+)
+
+
+# (Properties key, flag, default) used to build BloodHoundUser.flags straight from SharpHound data
+_USER_PROPERTY_FLAGS = (
+    ('enabled', USER_ENABLED, True),
+    ('dontreqpreauth', USER_DONTREQPREAUTH, False),
+    ('hasspn', USER_HASSPN, False),
+    ('unconstraineddelegation', USER_UNCONSTRAINED_DELEGATION, False),
+    ('trustedtoauth', USER_TRUSTEDTOAUTH, False),
+    ('admincount', USER_ADMINCOUNT, False),
+    ('passwordnotreqd', USER_PASSWORDNOTREQD, False),
+    ('pwdneverexpires', USER_PWDNEVEREXPIRES, False),
+)
+
+# Mask of the flags mirrored into ParsedBloodHoundData.user_flags
+USER_FLAG_COLUMN_MASK = 0xFF
+
+
+def _intern(value: Any) -> Any:
+    """Intern strings that repeat across objects (domains, SIDs, ACE rights and types)"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _parent_dn(dn: Optional[str]) -> Optional[str]:
+    """CN=WS01,OU=Workstations,DC=lab,DC=local -> OU=Workstations,DC=lab,DC=local"""
+    if not dn:
+        return None
+    index = dn.find(',')
+    while index > 0 and dn[index - 1] == '\\':
+        index = dn.find(',', index + 1)
+    return _intern(dn[index + 1:].upper()) if index >= 0 else None
+
+
+def _select(flags: bytearray, mask: int) -> List[int]:
+    """
+    Indexes into a flag column whose value has every bit of mask set.
+    One bytes.translate over the column does the test for all rows at C speed.
+    """
+    table = bytes(1 if value & mask == mask else 0 for value in range(256))
+    return list(compress(range(len(flags)), flags.translate(table)))
+
+
+def _flag_property(bit: int) -> property:
+    def getter(self) -> bool:
+        return bool(self.flags & bit)
+
+    def setter(self, value: bool) -> None:
+        self.flags = self.flags | bit if value else self.flags & ~bit
+
+    return property(getter, setter)
+
 
-@dataclass
 class BloodHoundUser:
-    """Represents a user from BloodHound data with attack-relevant attributes"""
-    samaccountname: str
-    name: str  # Full UPN like USER1@BUILD.LAB
-    sid: str
-    domain: str
-    enabled: bool = True
-    is_admin: bool = False
-    is_domain_admin: bool = False
+    """
+    Represents a user from BloodHound data with attack-relevant attributes.
     
-    # Attack-relevant attributes
-    dontreqpreauth: bool = False      # AS-REP Roastable
-    hasspn: bool = False              # Kerberoastable
-    unconstraineddelegation: bool = False
-    trustedtoauth: bool = False       # Constrained delegation
-    admincount: bool = False
-    passwordnotreqd: bool = False
-    pwdneverexpires: bool = False
+    Slotted, with the boolean attributes packed into one int (see USER_* flags)
+    and exposed as properties, so large exports cost a fraction of the memory
+    of a regular dataclass. Strings are interned by the parser.
+    """
+    __slots__ = ('samaccountname', 'name', 'sid', 'domain', 'flags',
+                 'allowed_to_delegate', 'spn_targets', 'primary_group_sid')
     
-    # Delegation targets
-    allowed_to_delegate: List[str] = field(default_factory=list)
-    spn_targets: List[str] = field(default_factory=list)
+    def __init__(self, samaccountname: str, name: str, sid: str, domain: str,
+                 enabled: bool = True, is_admin: bool = False, is_domain_admin: bool = False,
+                 dontreqpreauth: bool = False, hasspn: bool = False,
+                 unconstraineddelegation: bool = False, trustedtoauth: bool = False,
+                 admincount: bool = False, passwordnotreqd: bool = False, pwdneverexpires: bool = False,
+                 allowed_to_delegate: Sequence[str] = (), spn_targets: Sequence[str] = (),
+                 primary_group_sid: Optional[str] = None, flags: Optional[int] = None):
+        self.samaccountname = samaccountname
+        self.name = name  # Full UPN like USER1@BUILD.LAB
+        self.sid = sid
+        self.domain = domain
+        if flags is None:
+            flags = 0
+            for value, bit in ((enabled, USER_ENABLED), (is_admin, USER_IS_ADMIN),
+                               (is_domain_admin, USER_IS_DOMAIN_ADMIN), (dontreqpreauth, USER_DONTREQPREAUTH),
+                               (hasspn, USER_HASSPN), (unconstraineddelegation, USER_UNCONSTRAINED_DELEGATION),
+                               (trustedtoauth, USER_TRUSTEDTOAUTH), (admincount, USER_ADMINCOUNT),
+                               (passwordnotreqd, USER_PASSWORDNOTREQD), (pwdneverexpires, USER_PWDNEVEREXPIRES)):
+                if value:
+                    flags |= bit
+        self.flags = flags
+        
+        # Delegation targets (tuples; empty ones share the () singleton)
+        self.allowed_to_delegate: Tuple[str, ...] = tuple(allowed_to_delegate)
+        self.spn_targets: Tuple[str, ...] = tuple(spn_targets)
+        
+        # Group memberships (SIDs)
+        self.primary_group_sid = primary_group_sid
     
-    # Group memberships (SIDs)
-    primary_group_sid: Optional[str] = None
+    enabled = _flag_property(USER_ENABLED)
+    is_admin = _flag_property(USER_IS_ADMIN)
+    is_domain_admin = _flag_property(USER_IS_DOMAIN_ADMIN)
+    dontreqpreauth = _flag_property(USER_DONTREQPREAUTH)
+    hasspn = _flag_property(USER_HASSPN)
+    unconstraineddelegation = _flag_property(USER_UNCONSTRAINED_DELEGATION)
+    trustedtoauth = _flag_property(USER_TRUSTEDTOAUTH)
+    admincount = _flag_property(USER_ADMINCOUNT)
+    passwordnotreqd = _flag_property(USER_PASSWORDNOTREQD)
+    pwdneverexpires = _flag_property(USER_PWDNEVEREXPIRES)
+    
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, BloodHoundUser):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+    
+    def __repr__(self) -> str:
+        flags = ', '.join(f"{name}={bool(self.flags & bit)}" for name, bit in _USER_FLAG_FIELDS)
+        return (f"BloodHoundUser(samaccountname={self.samaccountname!r}, name={self.name!r}, "
+                f"sid={self.sid!r}, domain={self.domain!r}, {flags}, "
+                f"allowed_to_delegate={self.allowed_to_delegate!r}, spn_targets={self.spn_targets!r}, "
+                f"primary_group_sid={self.primary_group_sid!r})")
 
 
-@dataclass  
+@dataclass(slots=True)
 class BloodHoundComputer:
     """Represents a computer from BloodHound data"""
     name: str  # Hostname like DC01.BUILD.LAB
@@ -58,6 +185,7 @@ class BloodHoundComputer:
     sid: str
     domain: str
     os: Optional[str] = None
+    ou: Optional[str] = None  # DN of the containing OU/container
     
     # Machine type detection
     is_domain_controller: bool = False
@@ -65,10 +193,10 @@ class BloodHoundComputer:
     trustedtoauth: bool = False
     
     # Delegation targets
-    allowed_to_delegate: List[str] = field(default_factory=list)
+    allowed_to_delegate: Tuple[str, ...] = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class BloodHoundDomain:
     """Represents a domain from BloodHound data"""
     name: str  # FQDN like BUILD.LAB
@@ -80,12 +208,17 @@ class BloodHoundDomain:
     machine_account_quota: int = 10
 
 
-@dataclass
+@dataclass(slots=True)
 class BloodHoundACE:
-    """Represents an ACL-based attack path"""
-    source_sid: str
+    """
+    Represents an ACL-based attack path.
+    
+    Source (the object carrying the ACE) and target (the principal holding the
+    right) are IDs in ParsedBloodHoundData.sid_table.
+    """
+    source_id: int
     source_type: str  # User, Group, Computer
-    target_sid: str
+    target_id: int
     target_type: str
     right: str  # GenericAll, WriteDacl, WriteOwner, etc.
     is_inherited: bool
@@ -97,15 +230,59 @@ class ParsedBloodHoundData:
     domains: List[BloodHoundDomain] = field(default_factory=list)
     computers: List[BloodHoundComputer] = field(default_factory=list)
     users: List[BloodHoundUser] = field(default_factory=list)
-    groups: Dict[str, Dict] = field(default_factory=dict)  # SID -> group info
+    user_flags: bytearray = field(default_factory=bytearray)  # Low byte of users[i].flags, parallel to users
+    groups: Dict[str, Dict] = field(default_factory=dict)  # SID -> group info, members as sid_table IDs
     aces: List[BloodHoundACE] = field(default_factory=list)
+    sid_table: SidTable = field(default_factory=SidTable)
     
     # Attack path detection results
     asrep_roastable_users: List[str] = field(default_factory=list)
     kerberoastable_users: List[str] = field(default_factory=list)
     unconstrained_delegation: List[str] = field(default_factory=list)
     constrained_delegation: List[str] = field(default_factory=list)
-    acl_attack_paths: List[Dict] = field(default_factory=list)
+    acl_attack_paths: List[BloodHoundACE] = field(default_factory=list)  # Dangerous entries of aces
+    
+    def describe_ace(self, ace: BloodHoundACE) -> Dict[str, str]:
+        """ACE with its SIDs resolved to names, for display"""
+        return {
+            'source': self.sid_table.name(ace.source_id),
+            'source_type': ace.source_type,
+            'target': self.sid_table.name(ace.target_id),
+            'target_type': ace.target_type,
+            'right': ace.right
+        }
+
+
+def _object_type(filename: str) -> Optional[str]:
+    """Object type of a SharpHound JSON file (domains, computers, users, groups), None for others"""
+    lower = filename.lower()
+    if not lower.endswith('.json'):
+        return None
+    for object_type in ('domains', 'computers', 'users', 'groups'):
+        if f'_{object_type}' in lower:
+            return object_type
+    return None
+
+
+@contextmanager
+def _open_member(source: str, name: str, from_zip: bool) -> Iterator[TextIO]:
+    """Open one JSON member of a zip archive or a directory as text"""
+    if from_zip:
+        with zipfile.ZipFile(source, 'r') as zf:
+            with zf.open(name) as raw:
+                with io.TextIOWrapper(raw, encoding='utf-8-sig') as f:
+                    yield f
+    else:
+        with open(os.path.join(source, name), 'r', encoding='utf-8-sig') as f:
+            yield f
+
+
+def _parse_member(source: str, name: str, from_zip: bool, stream: bool) -> "ParsedBloodHoundData":
+    """Worker process entry point: parse one member into a fresh result"""
+    parser = BloodHoundParser()
+    with _open_member(source, name, from_zip) as f:
+        parser._parse_file(os.path.basename(name), f, stream)
+    return parser.result
 
 
 class BloodHoundParser:
@@ -124,87 +301,143 @@ class BloodHoundParser:
     
     def __init__(self):
         self.result = ParsedBloodHoundData()
-        self._sid_to_name: Dict[str, str] = {}  # Cache for SID resolution
+        self.sid_table = self.result.sid_table  # Shared with the result, the graph and the mapper
     
-    def parse_zip(self, zip_path: str) -> ParsedBloodHoundData:
+    def parse_zip(self, zip_path: str, stream: bool = True, workers: int = 0) -> ParsedBloodHoundData:
         """
         Parse a BloodHound zip file containing JSON exports.
         
+        Members are read straight out of the archive. In streaming mode (the
+        default) the data array of each member is decoded one object at a time,
+        so peak memory stays bounded by the largest single object rather than
+        the size of the export. Large exports are parsed one member per process
+        (see _resolve_workers).
+        
         Args:
             zip_path: Path to the BloodHound zip file
+            stream: Decode members incrementally instead of json.load()ing each one
+            workers: Parser processes; 0 picks automatically, 1 forces single-process
             
         Returns:
             ParsedBloodHoundData containing all extracted information
         """
-        logger.info(f"BLOODHOUND_PARSER: Parsing zip file: {zip_path}")
-        
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Extract zip contents
-            with zipfile.ZipFile(zip_path, 'r') as zf:
-                zf.extractall(temp_dir)
-            
-            # Find and parse each JSON file type
-            for filename in os.listdir(temp_dir):
-                filepath = os.path.join(temp_dir, filename)
-                if not filename.endswith('.json'):
-                    continue
-                    
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                if '_domains' in filename.lower():
-                    self._parse_domains(data)
-                elif '_computers' in filename.lower():
-                    self._parse_computers(data)
-                elif '_users' in filename.lower():
-                    self._parse_users(data)
-                elif '_groups' in filename.lower():
-                    self._parse_groups(data)
-        
-        # Detect attack paths after parsing all data
-        self._detect_attack_paths()
+        logger.info(f"BLOODHOUND_PARSER: Parsing zip file: {zip_path} (stream={stream})")
         
-        logger.info(f"BLOODHOUND_PARSER: Parsed {len(self.result.domains)} domains, "
-                    f"{len(self.result.computers)} computers, {len(self.result.users)} users")
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            members = [
+                (member.filename, member.file_size) for member in zf.infolist()
+                if not member.is_dir() and _object_type(os.path.basename(member.filename))
+            ]
         
+        self._parse_members(zip_path, members, True, stream, workers)
         return self.result
     
-    def parse_directory(self, dir_path: str) -> ParsedBloodHoundData:
+    def parse_directory(self, dir_path: str, stream: bool = True, workers: int = 0) -> ParsedBloodHoundData:
         """
         Parse BloodHound JSON files from a directory.
         
         Args:
             dir_path: Path to directory containing BloodHound JSON files
+            stream: Decode files incrementally instead of json.load()ing each one
+            workers: Parser processes; 0 picks automatically, 1 forces single-process
             
         Returns:
             ParsedBloodHoundData containing all extracted information
         """
-        logger.info(f"BLOODHOUND_PARSER: Parsing directory: {dir_path}")
+        logger.info(f"BLOODHOUND_PARSER: Parsing directory: {dir_path} (stream={stream})")
         
-        for filename in os.listdir(dir_path):
-            filepath = os.path.join(dir_path, filename)
-            if not filename.endswith('.json'):
-                continue
-                
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if '_domains' in filename.lower():
-                self._parse_domains(data)
-            elif '_computers' in filename.lower():
-                self._parse_computers(data)
-            elif '_users' in filename.lower():
-                self._parse_users(data)
-            elif '_groups' in filename.lower():
-                self._parse_groups(data)
+        members = [
+            (filename, os.path.getsize(os.path.join(dir_path, filename)))
+            for filename in os.listdir(dir_path) if _object_type(filename)
+        ]
+        
+        self._parse_members(dir_path, members, False, stream, workers)
+        return self.result
+    
+    def _parse_members(self, source: str, members: List[Tuple[str, int]], from_zip: bool, stream: bool, workers: int) -> None:
+        """Parse every member in this process or across a process pool, then detect attack paths"""
+        workers = self._resolve_workers(members, workers)
+        
+        if workers > 1:
+            try:
+                self._parse_members_parallel(source, members, from_zip, stream, workers)
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning(f"BLOODHOUND_PARSER: Process pool unavailable ({e}), parsing in a single process")
+                self.result = ParsedBloodHoundData()
+                self.sid_table = self.result.sid_table
+                workers = 1
+        
+        if workers <= 1:
+            for name, _ in members:
+                with _open_member(source, name, from_zip) as f:
+                    self._parse_file(os.path.basename(name), f, stream)
         
         # Detect attack paths after parsing all data
         self._detect_attack_paths()
         
         logger.info(f"BLOODHOUND_PARSER: Parsed {len(self.result.domains)} domains, "
-                    f"{len(self.result.computers)} computers, {len(self.result.users)} users")
+                    f"{len(self.result.computers)} computers, {len(self.result.users)} users "
+                    f"using {workers} process(es)")
+    
+    def _resolve_workers(self, members: List[Tuple[str, int]], workers: int) -> int:
+        """
+        Number of parser processes for these members. Automatic mode (0) only
+        uses a pool when the export is big enough to pay for starting it.
+        """
+        if workers == 1 or len(members) < 2:
+            return 1
+        if workers <= 0:
+            if sum(size for _, size in members) < PARALLEL_PARSE_MIN_BYTES:
+                return 1
+            workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+        return min(workers, len(members))
+    
+    def _parse_members_parallel(self, source: str, members: List[Tuple[str, int]], from_zip: bool, stream: bool, workers: int) -> None:
+        """Parse one member per worker process and merge the partial results in member order"""
+        # spawn rather than fork: the backend process runs many threads
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(_parse_member, source, name, from_zip, stream)
+                for name, _ in members
+            ]
+            for future in futures:
+                self._merge(future.result())
+    
+    def _merge(self, partial: ParsedBloodHoundData) -> None:
+        """Add the records parsed from one member to this parser's result, renumbering its SID IDs"""
+        remap = self.sid_table.merge(partial.sid_table)
+        for group in partial.groups.values():
+            group['members'] = array('l', (remap[member] for member in group['members']))
+        for ace in partial.aces:
+            ace.source_id = remap[ace.source_id]
+            ace.target_id = remap[ace.target_id]
         
-        return self.result
+        self.result.domains.extend(partial.domains)
+        self.result.computers.extend(partial.computers)
+        self.result.users.extend(partial.users)
+        self.result.user_flags.extend(partial.user_flags)
+        self.result.groups.update(partial.groups)
+        self.result.aces.extend(partial.aces)
+    
+    def _parse_file(self, filename: str, f, stream: bool) -> None:
+        """Route one JSON file to the parser for its object type"""
+        object_type = _object_type(filename)
+        if object_type == 'domains':
+            parse = self._parse_domains
+        elif object_type == 'computers':
+            parse = self._parse_computers
+        elif object_type == 'users':
+            parse = self._parse_users
+        elif object_type == 'groups':
+            parse = self._parse_groups
+        else:
+            return
+        
+        if stream:
+            parse(iter_json_array(f, 'data'))
+        else:
+            parse(json.load(f).get('data', []))
     
     def _normalize_delegation_targets(self, targets: List) -> List[str]:
         """
@@ -214,24 +447,23 @@ class BloodHoundParser:
         normalized = []
         for target in targets:
             if isinstance(target, str):
-                normalized.append(target)
+                normalized.append(_intern(target))
             elif isinstance(target, dict):
                 # Extract ObjectIdentifier (SID) or any useful string
                 obj_id = target.get('ObjectIdentifier', '')
                 obj_type = target.get('ObjectType', '')
                 if obj_id:
-                    normalized.append(f"{obj_id} ({obj_type})" if obj_type else obj_id)
+                    normalized.append(_intern(f"{obj_id} ({obj_type})" if obj_type else obj_id))
         return normalized
     
-    def _parse_domains(self, data: Dict) -> None:
-        """Parse domains JSON file"""
-        items = data.get('data', [])
+    def _parse_domains(self, items: Iterable[Dict]) -> None:
+        """Parse the data items of a domains JSON file"""
         for item in items:
             props = item.get('Properties', {})
             
             domain = BloodHoundDomain(
-                name=props.get('name', props.get('domain', '')),
-                sid=item.get('ObjectIdentifier', ''),
+                name=_intern(props.get('name', props.get('domain', ''))),
+                sid=_intern(item.get('ObjectIdentifier', '')),
                 functional_level=props.get('functionallevel', None)
             )
             
@@ -242,32 +474,34 @@ class BloodHoundParser:
                 domain.machine_account_quota = props.get('machineaccountquota', 10) or 10
             
             self.result.domains.append(domain)
-            self._sid_to_name[domain.sid] = domain.name
+            self.sid_table.define(domain.sid, domain.name, NODE_DOMAIN)
     
-    def _parse_computers(self, data: Dict) -> None:
-        """Parse computers JSON file"""
-        items = data.get('data', [])
+    def _parse_computers(self, items: Iterable[Dict]) -> None:
+        """Parse the data items of a computers JSON file"""
         for item in items:
             props = item.get('Properties', {})
             
             computer = BloodHoundComputer(
-                name=props.get('name', ''),
+                name=_intern(props.get('name', '')),
                 samaccountname=props.get('samaccountname', ''),
-                sid=item.get('ObjectIdentifier', ''),
-                domain=props.get('domain', ''),
-                os=props.get('operatingsystem', None),
+                sid=_intern(item.get('ObjectIdentifier', '')),
+                domain=_intern(props.get('domain', '')),
+                os=_intern(props.get('operatingsystem', None)),
+                ou=_parent_dn(props.get('distinguishedname')),
                 is_domain_controller=props.get('isdc', False),
                 unconstraineddelegation=props.get('unconstraineddelegation', False),
                 trustedtoauth=props.get('trustedtoauth', False),
-                allowed_to_delegate=self._normalize_delegation_targets(item.get('AllowedToDelegate', []))
+                allowed_to_delegate=tuple(self._normalize_delegation_targets(item.get('AllowedToDelegate', [])))
             )
             
             self.result.computers.append(computer)
-            self._sid_to_name[computer.sid] = computer.name
+            self.sid_table.define(computer.sid, computer.name, NODE_COMPUTER)
+            
+            # ACEs on computers feed multi-hop attack paths (see bloodhound.graph)
+            self._parse_aces(item, 'Computer')
     
-    def _parse_users(self, data: Dict) -> None:
-        """Parse users JSON file"""
-        items = data.get('data', [])
+    def _parse_users(self, items: Iterable[Dict]) -> None:
+        """Parse the data items of a users JSON file"""
         for item in items:
             props = item.get('Properties', {})
             
@@ -276,55 +510,65 @@ class BloodHoundParser:
             if not samaccountname or samaccountname.startswith('$'):
                 continue
             
+            # Attack-relevant attributes, packed into one int
+            flags = 0
+            for key, bit, default in _USER_PROPERTY_FLAGS:
+                if props.get(key, default):
+                    flags |= bit
+            
             user = BloodHoundUser(
                 samaccountname=samaccountname,
                 name=props.get('name', ''),
-                sid=item.get('ObjectIdentifier', ''),
-                domain=props.get('domain', ''),
-                enabled=props.get('enabled', True),
-                
-                # Attack-relevant attributes
-                dontreqpreauth=props.get('dontreqpreauth', False),
-                hasspn=props.get('hasspn', False),
-                unconstraineddelegation=props.get('unconstraineddelegation', False),
-                trustedtoauth=props.get('trustedtoauth', False),
-                admincount=props.get('admincount', False),
-                passwordnotreqd=props.get('passwordnotreqd', False),
-                pwdneverexpires=props.get('pwdneverexpires', False),
+                sid=_intern(item.get('ObjectIdentifier', '')),
+                domain=_intern(props.get('domain', '')),
+                flags=flags,
                 
                 # Delegation - normalize to strings (newer BH versions use objects)
                 allowed_to_delegate=self._normalize_delegation_targets(item.get('AllowedToDelegate', [])),
                 spn_targets=self._normalize_delegation_targets(item.get('SPNTargets', [])),
-                primary_group_sid=item.get('PrimaryGroupSID', None)
+                primary_group_sid=_intern(item.get('PrimaryGroupSID', None))
             )
             
             self.result.users.append(user)
-            self._sid_to_name[user.sid] = user.name
+            self.result.user_flags.append(flags & USER_FLAG_COLUMN_MASK)
+            self.sid_table.define(user.sid, user.name, NODE_USER)
             
             # Also parse ACEs for this user
             self._parse_aces(item, 'User')
     
-    def _parse_groups(self, data: Dict) -> None:
-        """Parse groups JSON file"""
-        items = data.get('data', [])
+    def _parse_groups(self, items: Iterable[Dict]) -> None:
+        """Parse the data items of a groups JSON file"""
         for item in items:
             props = item.get('Properties', {})
-            sid = item.get('ObjectIdentifier', '')
+            sid = _intern(item.get('ObjectIdentifier', ''))
+            
+            # Members are kept as SID table IDs rather than the raw member objects
+            members = array('l')
+            for member in item.get('Members', []):
+                if isinstance(member, dict):
+                    member_sid = member.get('ObjectIdentifier')
+                    if member_sid:
+                        members.append(self.sid_table.intern(member_sid, node_kind(member.get('ObjectType', ''))))
+                elif member:
+                    members.append(self.sid_table.intern(member))
             
             self.result.groups[sid] = {
                 'name': props.get('name', ''),
                 'samaccountname': props.get('samaccountname', ''),
-                'domain': props.get('domain', ''),
-                'members': item.get('Members', []),
+                'domain': _intern(props.get('domain', '')),
+                'members': members,
                 'admincount': props.get('admincount', False)
             }
             
-            self._sid_to_name[sid] = props.get('name', '')
+            self.sid_table.define(sid, props.get('name', ''), NODE_GROUP)
+            
+            # ACEs on groups feed multi-hop attack paths (see bloodhound.graph)
+            self._parse_aces(item, 'Group')
     
     def _parse_aces(self, item: Dict, source_type: str) -> None:
         """Parse ACEs from an object"""
         aces = item.get('Aces', [])
-        source_sid = item.get('ObjectIdentifier', '')
+        source_id = self.sid_table.intern(item.get('ObjectIdentifier', ''), node_kind(source_type))
         
         # Important rights for attack paths
         important_rights = {
@@ -338,33 +582,43 @@ class BloodHoundParser:
             if right not in important_rights:
                 continue
             
-            ace = BloodHoundACE(
-                source_sid=source_sid,
-                source_type=source_type,
-                target_sid=ace_data.get('PrincipalSID', ''),
-                target_type=ace_data.get('PrincipalType', ''),
-                right=right,
-                is_inherited=ace_data.get('IsInherited', False)
-            )
-            
             # Only track non-inherited ACEs for attack paths
-            if not ace.is_inherited:
-                self.result.aces.append(ace)
+            if ace_data.get('IsInherited', False):
+                continue
+            
+            target_type = _intern(ace_data.get('PrincipalType', ''))
+            self.result.aces.append(BloodHoundACE(
+                source_id=source_id,
+                source_type=source_type,
+                target_id=self.sid_table.intern(ace_data.get('PrincipalSID', ''), node_kind(target_type)),
+                target_type=target_type,
+                right=_intern(right),
+                is_inherited=False
+            ))
     
     def _detect_attack_paths(self) -> None:
-        """Analyze parsed data to detect attack paths"""
+        """
+        Analyze parsed data to detect attack paths.
+        
+        User checks select rows from the user_flags column instead of walking
+        every BloodHoundUser once per attack type.
+        """
+        users = self.result.users
+        flags = self.result.user_flags
+        if len(flags) != len(users):
+            # Users were added without going through _parse_users; rebuild the column
+            flags = self.result.user_flags = bytearray(user.flags & USER_FLAG_COLUMN_MASK for user in users)
         
         # AS-REP Roastable users
-        for user in self.result.users:
-            if user.enabled and user.dontreqpreauth:
-                self.result.asrep_roastable_users.append(user.samaccountname)
-                logger.info(f"BLOODHOUND_PARSER: Found AS-REP Roastable user: {user.samaccountname}")
+        for index in _select(flags, USER_ENABLED | USER_DONTREQPREAUTH):
+            self.result.asrep_roastable_users.append(users[index].samaccountname)
+            logger.debug(f"BLOODHOUND_PARSER: Found AS-REP Roastable user: {users[index].samaccountname}")
         
         # Kerberoastable users
-        for user in self.result.users:
-            if user.enabled and user.hasspn and not user.samaccountname.lower() == 'krbtgt':
-                self.result.kerberoastable_users.append(user.samaccountname)
-                logger.info(f"BLOODHOUND_PARSER: Found Kerberoastable user: {user.samaccountname}")
+        for index in _select(flags, USER_ENABLED | USER_HASSPN):
+            if users[index].samaccountname.lower() != 'krbtgt':
+                self.result.kerberoastable_users.append(users[index].samaccountname)
+                logger.debug(f"BLOODHOUND_PARSER: Found Kerberoastable user: {users[index].samaccountname}")
         
         # Unconstrained delegation
         for computer in self.result.computers:
@@ -372,9 +626,8 @@ class BloodHoundParser:
                 self.result.unconstrained_delegation.append(computer.name)
                 logger.info(f"BLOODHOUND_PARSER: Found unconstrained delegation: {computer.name}")
         
-        for user in self.result.users:
-            if user.enabled and user.unconstraineddelegation:
-                self.result.unconstrained_delegation.append(user.samaccountname)
+        for index in _select(flags, USER_ENABLED | USER_UNCONSTRAINED_DELEGATION):
+            self.result.unconstrained_delegation.append(users[index].samaccountname)
         
         # Constrained delegation
         for computer in self.result.computers:
@@ -385,8 +638,9 @@ class BloodHoundParser:
                     'targets': computer.allowed_to_delegate
                 })
         
-        for user in self.result.users:
-            if user.enabled and user.allowed_to_delegate:
+        for index in _select(flags, USER_ENABLED):
+            user = users[index]
+            if user.allowed_to_delegate:
                 self.result.constrained_delegation.append({
                     'name': user.samaccountname,
                     'type': 'user',
@@ -395,18 +649,13 @@ class BloodHoundParser:
         
         # ACL-based attack paths (non-inherited dangerous ACLs)
         dangerous_rights = {'GenericAll', 'WriteDacl', 'WriteOwner', 'ForceChangePassword'}
-        for ace in self.result.aces:
-            if ace.right in dangerous_rights:
-                source_name = self._sid_to_name.get(ace.source_sid, ace.source_sid)
-                target_name = self._sid_to_name.get(ace.target_sid, ace.target_sid)
-                
-                self.result.acl_attack_paths.append({
-                    'source': source_name,
-                    'source_type': ace.source_type,
-                    'target': target_name,
-                    'target_type': ace.target_type,
-                    'right': ace.right
-                })
+        self.result.acl_attack_paths = [ace for ace in self.result.aces if ace.right in dangerous_rights]
+        
+        logger.info(f"BLOODHOUND_PARSER: Found {len(self.result.asrep_roastable_users)} AS-REP Roastable, "
+                    f"{len(self.result.kerberoastable_users)} Kerberoastable, "
+                    f"{len(self.result.unconstrained_delegation)} unconstrained delegation, "
+                    f"{len(self.result.constrained_delegation)} constrained delegation, "
+                    f"{len(self.result.acl_attack_paths)} ACL attack paths")
     
     def get_attack_summary(self) -> Dict[str, Any]:
         """Get a summary of detected attack paths"""
@@ -415,7 +664,7 @@ class BloodHoundParser:
             'kerberoastable': self.result.kerberoastable_users,
             'unconstrained_delegation': self.result.unconstrained_delegation,
             'constrained_delegation': self.result.constrained_delegation,
-            'acl_attack_paths': self.result.acl_attack_paths[:20]  # Limit for display
+            'acl_attack_paths': [self.result.describe_ace(ace) for ace in self.result.acl_attack_paths[:20]]  # Limit for display
         }
     
     def get_domain_info(self) -> Optional[Dict[str, Any]]:
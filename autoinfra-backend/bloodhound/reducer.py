@@ -0,0 +1,141 @@
+"""
+Reduction Module for AutoInfra
+
+Shrinks parsed BloodHound data to what a sandbox lab needs before it is handed
+to the TopologyMapper. Exports of real environments hold tens of thousands of
+users and computers, almost all of which play no part in an attack path.
+
+The reduced data keeps:
+- every AS-REP Roastable, Kerberoastable and delegation user/computer
+- every node of the top ACL chains to Domain/Enterprise Admins and
+  Administrators (see bloodhound.graph), and both ends of the first single
+  dangerous ACEs, the same ones the mapper picks from
+- all domain controllers
+- a seeded random sample of other enabled users and other computers as noise
+
+Groups and ACEs are restricted to the kept objects, so attack chains found by
+the mapper on the reduced data are chains of the original data. The result
+shares the original SidTable, so IDs stay valid across both.
+"""
+
+import logging
+import random
+from array import array
+from dataclasses import dataclass
+from typing import Optional, Set
+
+from .parser import ParsedBloodHoundData, USER_FLAG_COLUMN_MASK
+from .graph import AttackGraph, EDGE_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReductionConfig:
+    """Configuration options for reducing BloodHound data"""
+    noise_users: int = 25  # Enabled users kept on top of the attack path users
+    noise_computers: int = 10  # Non-DC computers kept on top of the attack path computers
+    max_acl_paths: int = 20  # ACL chains and single ACEs whose objects are kept
+    seed: int = 0  # Noise sampling seed; the same seed and export give the same lab
+
+
+def reduce_bloodhound_data(bh_data: ParsedBloodHoundData, config: Optional[ReductionConfig] = None) -> ParsedBloodHoundData:
+    """
+    Minimal subset of the parsed data that keeps every detected attack path,
+    plus a deterministic sample of noise users and computers.
+
+    Args:
+        bh_data: Parsed BloodHound data (left unchanged)
+        config: Reduction options
+
+    Returns:
+        New ParsedBloodHoundData sharing bh_data's SID table
+    """
+    config = config or ReductionConfig()
+    table = bh_data.sid_table
+    rng = random.Random(config.seed)
+
+    keep: Set[int] = set()  # SID table IDs of kept objects
+
+    # Users and computers with a detected attack, by name
+    attack_names = set(bh_data.asrep_roastable_users) | set(bh_data.kerberoastable_users)
+    attack_names.update(bh_data.unconstrained_delegation)
+    attack_names.update(delegation['name'] for delegation in bh_data.constrained_delegation)
+
+    # ACL chains, longest first, each adding an ACL edge no earlier chain covered
+    graph = AttackGraph.from_parsed(bh_data)
+    targets = graph.high_value_targets()
+    paths = list(graph.paths_to(targets).values()) if targets else []
+    paths = [path for path in paths if any(EDGE_WEIGHTS[edge] for edge in path[1])]
+    paths.sort(key=lambda path: (-sum(EDGE_WEIGHTS[edge] for edge in path[1]), graph.names[path[0][0]]))
+
+    covered_edges = set()
+    kept_paths = 0
+    for nodes, edges in paths:
+        if kept_paths >= config.max_acl_paths:
+            break
+        path_edges = {(nodes[i], edge, nodes[i + 1]) for i, edge in enumerate(edges) if EDGE_WEIGHTS[edge]}
+        if path_edges <= covered_edges:
+            continue
+        covered_edges |= path_edges
+        keep.update(nodes)
+        kept_paths += 1
+
+    for ace in bh_data.acl_attack_paths[:config.max_acl_paths]:
+        keep.add(ace.source_id)
+        keep.add(ace.target_id)
+
+    reduced = ParsedBloodHoundData(sid_table=table, domains=list(bh_data.domains))
+
+    # Users: attack path users, then seeded noise among the remaining enabled ones
+    noise = []
+    for user in bh_data.users:
+        user_id = table.get(user.sid)
+        if user.samaccountname in attack_names or user_id in keep:
+            reduced.users.append(user)
+        elif user.enabled:
+            noise.append(user)
+    noise_users = _sample(rng, noise, config.noise_users)
+
+    # Computers: DCs and attack path computers, then seeded noise
+    noise = []
+    for computer in bh_data.computers:
+        if computer.is_domain_controller or computer.name in attack_names or table.get(computer.sid) in keep:
+            reduced.computers.append(computer)
+        else:
+            noise.append(computer)
+    noise_computers = _sample(rng, noise, config.noise_computers)
+
+    reduced.users.extend(noise_users)
+    reduced.computers.extend(noise_computers)
+    keep.update(table.get(record.sid) for record in reduced.users)
+    keep.update(table.get(record.sid) for record in reduced.computers)
+    reduced.user_flags = bytearray(user.flags & USER_FLAG_COLUMN_MASK for user in reduced.users)
+
+    # Groups on kept chains, with memberships between kept objects only
+    for sid, group in bh_data.groups.items():
+        if table.get(sid) in keep:
+            reduced.groups[sid] = dict(group, members=array('l', (member for member in group['members'] if member in keep)))
+
+    reduced.aces = [ace for ace in bh_data.aces if ace.source_id in keep and ace.target_id in keep]
+
+    # Detection results only refer to kept objects, except for ACEs
+    reduced.asrep_roastable_users = list(bh_data.asrep_roastable_users)
+    reduced.kerberoastable_users = list(bh_data.kerberoastable_users)
+    reduced.unconstrained_delegation = list(bh_data.unconstrained_delegation)
+    reduced.constrained_delegation = list(bh_data.constrained_delegation)
+    reduced.acl_attack_paths = [ace for ace in bh_data.acl_attack_paths if ace.source_id in keep and ace.target_id in keep]
+
+    logger.info(f"BLOODHOUND_REDUCER: Reduced {len(bh_data.users)} users / {len(bh_data.computers)} computers / "
+                f"{len(bh_data.groups)} groups to {len(reduced.users)} / {len(reduced.computers)} / {len(reduced.groups)} "
+                f"({kept_paths} ACL chain(s), {len(noise_users)} noise users, {len(noise_computers)} noise computers, seed={config.seed})")
+    return reduced
+
+
+def _sample(rng: random.Random, items: list, count: int) -> list:
+    """Seeded sample of up to count items, in their original order"""
+    if count <= 0:
+        return []
+    if count >= len(items):
+        return items
+    return [items[index] for index in sorted(rng.sample(range(len(items)), count))]
@@ -0,0 +1,151 @@
+"""
+Compact records for bh-<upload_id> session files.
+
+One JSON object per user and computer repeats every key name and domain/OS
+string per record, which puts session files of large imports at 100 MB+.
+Records are stored as rows of positional values instead, with the
+repeated strings (domains, operating systems) stored once in a string table and
+referenced by index, and user/computer names stored without the domain suffix
+whenever they follow the usual SAMACCOUNTNAME@DOMAIN / HOST.DOMAIN form:
+
+    "session_format": 2,
+    "strings": ["BUILD.LAB", "Windows Server 2022 Datacenter", ...],
+    "users": [[samaccountname, domain ref, USER_* flags(, full name)], ...],
+    "computers": [[name, domain ref, os ref, COMPUTER_* flags], ...]
+
+A ref of -1 means no value. unpack_users()/unpack_computers() expand either
+format back into the dicts the API returns, and session_counts() computes the
+summary counts straight from the rows.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from .parser import (
+    ParsedBloodHoundData, USER_ENABLED, USER_DONTREQPREAUTH, USER_HASSPN, USER_ADMINCOUNT
+)
+
+SESSION_FORMAT_VERSION = 2
+
+# Flags of a computer row
+COMPUTER_IS_DC = 1 << 0
+COMPUTER_UNCONSTRAINED_DELEGATION = 1 << 1
+COMPUTER_QUALIFIED_NAME = 1 << 2  # Stored name is the host part of HOST.DOMAIN
+
+# User flags kept in session rows
+SESSION_USER_FLAGS = USER_ENABLED | USER_DONTREQPREAUTH | USER_HASSPN | USER_ADMINCOUNT
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings: List[str] = []
+        self._refs: Dict[str, int] = {}
+
+    def ref(self, value: Optional[str]) -> int:
+        if not value:
+            return -1
+        ref = self._refs.get(value)
+        if ref is None:
+            ref = self._refs[value] = len(self.strings)
+            self.strings.append(value)
+        return ref
+
+
+def pack_session_records(bh_data: ParsedBloodHoundData) -> Dict[str, Any]:
+    """Users and computers of a parse result as compact session file fields"""
+    strings = _StringTable()
+
+    users = []
+    for user in bh_data.users:
+        row = [user.samaccountname, strings.ref(user.domain), user.flags & SESSION_USER_FLAGS]
+        if user.name != _user_name(user.samaccountname, user.domain):
+            row.append(user.name)
+        users.append(row)
+
+    computers = []
+    for computer in bh_data.computers:
+        flags = 0
+        if computer.is_domain_controller:
+            flags |= COMPUTER_IS_DC
+        if computer.unconstraineddelegation:
+            flags |= COMPUTER_UNCONSTRAINED_DELEGATION
+        name = computer.name
+        suffix = f".{computer.domain}"
+        if computer.domain and name.endswith(suffix) and len(name) > len(suffix):
+            name = name[:-len(suffix)]
+            flags |= COMPUTER_QUALIFIED_NAME
+        computers.append([name, strings.ref(computer.domain), strings.ref(computer.os), flags])
+
+    return {
+        "session_format": SESSION_FORMAT_VERSION,
+        "strings": strings.strings,
+        "users": users,
+        "computers": computers
+    }
+
+
+def _user_name(samaccountname: str, domain: str) -> str:
+    return f"{samaccountname.upper()}@{domain}" if domain else samaccountname.upper()
+
+
+def _is_compact(session: Dict[str, Any]) -> bool:
+    return session.get("session_format", 1) >= SESSION_FORMAT_VERSION
+
+
+def unpack_users(session: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Users of a session file as {username, name, enabled, dontreqpreauth, hasspn, admincount}"""
+    if not _is_compact(session):
+        return session.get("users", [])
+
+    strings = session.get("strings", [])
+    users = []
+    for row in session.get("users", []):
+        samaccountname, domain_ref, flags = row[0], row[1], row[2]
+        domain = strings[domain_ref] if domain_ref >= 0 else ""
+        users.append({
+            "username": samaccountname,
+            "name": row[3] if len(row) > 3 else _user_name(samaccountname, domain),
+            "enabled": bool(flags & USER_ENABLED),
+            "dontreqpreauth": bool(flags & USER_DONTREQPREAUTH),
+            "hasspn": bool(flags & USER_HASSPN),
+            "admincount": bool(flags & USER_ADMINCOUNT)
+        })
+    return users
+
+
+def unpack_computers(session: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Computers of a session file as {name, is_dc, os, unconstrained_delegation}"""
+    if not _is_compact(session):
+        return session.get("computers", [])
+
+    strings = session.get("strings", [])
+    computers = []
+    for name, domain_ref, os_ref, flags in session.get("computers", []):
+        if flags & COMPUTER_QUALIFIED_NAME and domain_ref >= 0:
+            name = f"{name}.{strings[domain_ref]}"
+        computers.append({
+            "name": name,
+            "is_dc": bool(flags & COMPUTER_IS_DC),
+            "os": strings[os_ref] if os_ref >= 0 else None,
+            "unconstrained_delegation": bool(flags & COMPUTER_UNCONSTRAINED_DELEGATION)
+        })
+    return computers
+
+
+def session_counts(session: Dict[str, Any]) -> Dict[str, int]:
+    """Computer/user summary counts of a session file, without expanding its records"""
+    computers = session.get("computers", [])
+    users = session.get("users", [])
+    if _is_compact(session):
+        domain_controllers = sum(1 for row in computers if row[3] & COMPUTER_IS_DC)
+        enabled_users = sum(1 for row in users if row[2] & USER_ENABLED)
+    else:
+        domain_controllers = sum(1 for c in computers if c.get("is_dc"))
+        enabled_users = sum(1 for u in users if u.get("enabled"))
+
+    return {
+        "total_computers": len(computers),
+        "domain_controllers": domain_controllers,
+        "workstations": len(computers) - domain_controllers,
+        "total_users": len(users),
+        "enabled_users": enabled_users
+    }
@@ -0,0 +1,110 @@
+"""
+SID Intern Table for AutoInfra
+
+Every SID seen while parsing a BloodHound export (objects, group members and
+ACE principals) is numbered densely, once. Group memberships and ACEs then
+hold integer IDs instead of SID strings, names are resolved through the table
+only when something is shown to the user, and the attack graph uses the same
+IDs as its node numbers.
+
+Unresolved entries (a principal that only shows up in an ACE or a membership)
+report their SID as their name until the object itself is parsed.
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+# Object kinds, shared with bloodhound.graph node kinds
+NODE_UNKNOWN = 0
+NODE_USER = 1
+NODE_GROUP = 2
+NODE_COMPUTER = 3
+NODE_DOMAIN = 4
+
+NODE_KIND_NAMES = ('Unknown', 'User', 'Group', 'Computer', 'Domain')
+_NODE_KINDS_BY_TYPE = {name: kind for kind, name in enumerate(NODE_KIND_NAMES)}
+
+
+def node_kind(object_type: str) -> int:
+    """Node kind of a SharpHound ObjectType/PrincipalType ('User', 'Group', ...)"""
+    return _NODE_KINDS_BY_TYPE.get(object_type, NODE_UNKNOWN)
+
+
+class SidTable:
+    """SID <-> integer ID, with the resolved name and kind of each ID"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.sids: List[str] = []
+        self.names: List[str] = []
+        self.kinds = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.sids)
+
+    def __contains__(self, sid: str) -> bool:
+        return sid in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sids)
+
+    def intern(self, sid: str, kind: int = NODE_UNKNOWN) -> int:
+        """ID of a SID, adding it (unresolved) on first sight"""
+        sid_id = self._ids.get(sid)
+        if sid_id is None:
+            sid_id = self._ids[sid] = len(self.sids)
+            self.sids.append(sid)
+            self.names.append(sid)
+            self.kinds.append(kind)
+        elif kind and not self.kinds[sid_id]:
+            self.kinds[sid_id] = kind
+        return sid_id
+
+    def define(self, sid: str, name: str, kind: int) -> int:
+        """ID of a parsed object, recording its name and kind"""
+        sid_id = self.intern(sid, kind)
+        if name:
+            self.names[sid_id] = name
+        self.kinds[sid_id] = kind
+        return sid_id
+
+    def get(self, sid: str) -> Optional[int]:
+        return self._ids.get(sid)
+
+    def sid(self, sid_id: int) -> str:
+        return self.sids[sid_id]
+
+    def name(self, sid_id: int) -> str:
+        return self.names[sid_id]
+
+    def kind(self, sid_id: int) -> str:
+        return NODE_KIND_NAMES[self.kinds[sid_id]]
+
+    def resolve(self, sid: str) -> str:
+        """Name of a SID, or the SID itself when it was never resolved"""
+        sid_id = self._ids.get(sid)
+        return self.names[sid_id] if sid_id is not None else sid
+
+    def merge(self, other: "SidTable") -> array:
+        """
+        Add every entry of another table and return the remap array from the
+        other table's IDs to this table's, for rewriting ID references.
+        """
+        remap = array('l', [0]) * len(other)
+        for other_id, sid in enumerate(other.sids):
+            sid_id = self.intern(sid, other.kinds[other_id])
+            name = other.names[other_id]
+            if name != sid:
+                self.names[sid_id] = name
+            remap[other_id] = sid_id
+        return remap
+
+    def __getstate__(self):
+        # The SID -> ID dict is rebuilt on load rather than pickled twice over
+        return {'sids': self.sids, 'names': self.names, 'kinds': self.kinds}
+
+    def __setstate__(self, state):
+        self.sids = state['sids']
+        self.names = state['names']
+        self.kinds = state['kinds']
+        self._ids = {sid: sid_id for sid_id, sid in enumerate(self.sids)}
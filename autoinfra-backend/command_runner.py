@@ -18,6 +18,14 @@ def run_command_and_get_exit_code(command):
     logger.debug(f"RUN_COMMAND_AND_GET_EXIT_CODE: Code: {code}")
     return code
 
+def run_command_and_get_output_and_exit_code(command):
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output, _ = process.communicate()
+    decodedOutput = output.decode("utf-8")
+    code = process.returncode
+    logger.debug(f"RUN_COMMAND_AND_GET_OUTPUT_AND_EXIT_CODE: Code: {code}, Output: {decodedOutput}")
+    return decodedOutput, code
+
 def run_async_command(targetFunction, *args):
     try:
         thread = threading.Thread(target=targetFunction, args=(args))
@@ -16,7 +16,8 @@ param(
     [string]$computerForCDelegation,
     [string]$computerForMimikatz,
     [int]$numberOfUsers,
-    [string]$usernameFormat = "firstname"
+    [string]$usernameFormat = "firstname",
+    [string]$attackSteps
 )
 
 # Define the log file path early for debugging
@@ -132,6 +133,10 @@ Function Enable-VulnerableCertificateTemplate {
 
 
 
+Function Invoke-AttackSelection {
+    param (
+        [string]$attackSelection
+    )
 Switch ($attackSelection)
 {
     'disable-preauth'
@@ -269,4 +274,51 @@ Switch ($attackSelection)
         Install-WindowsFeature -Name RSAT-AD-PowerShell # just a temporary fix to always have admodule installed on runtime
         GenerateRandomCTF -DomainAdminCreds $domainAdminCreds -dcName $dcName -domainName $domainName -numberOfUsers $numberOfUsers -targetBox $targetBox -difficulty $difficulty
     }
-}
\ No newline at end of file
+}
+}
+
+<# =======================================
+            Attack Execution
+========================================== #>
+
+# Per-step parameters; cleared before each step so one step's target never leaks into the next
+$stepParameterNames = @(
+    'targetUser', 'GrantingUser', 'ReceivingUser', 'PermissionType', 'vulnerablePath', 'targetName',
+    'singleUsername', 'singleUserPassword', 'dcName', 'userForMimikatz', 'userForCDelegation',
+    'computerForCDelegation', 'computerForMimikatz'
+)
+
+if ($attackSteps) {
+    # Several attacks merged into one run command by the backend: attackSteps is a JSON array
+    # of per-step parameter objects, each with its own attackSelection. Every step reports an
+    # "attack_step" result (step number, Succeeded|Failed) so the backend can resolve each attack separately.
+    $steps = @($attackSteps | ConvertFrom-Json)
+    $failedSteps = 0
+    Add-Content -Path $logFilePath -Value "ExecuteModule: Running $($steps.Count) attack step(s)"
+
+    for ($i = 0; $i -lt $steps.Count; $i++) {
+        $stepNumber = $i + 1
+        foreach ($name in $stepParameterNames) {
+            Set-Variable -Name $name -Value $null -Scope Script
+        }
+        foreach ($property in $steps[$i].PSObject.Properties) {
+            Set-Variable -Name $property.Name -Value $property.Value -Scope Script
+        }
+
+        Add-Content -Path $logFilePath -Value "Attack step $stepNumber selection: $attackSelection"
+        try {
+            Invoke-AttackSelection -attackSelection $attackSelection
+            Write-Result -kind 'attack_step' -fields @{ step = $stepNumber; status = 'Succeeded' }
+        } catch {
+            $failedSteps++
+            Add-Content -Path $logFilePath -Value "ERROR: Attack step $stepNumber ($attackSelection) failed: $_"
+            Write-Result -kind 'attack_step' -fields @{ step = $stepNumber; status = 'Failed'; error = "$_" }
+        }
+    }
+
+    if ($failedSteps -gt 0) {
+        exit 1
+    }
+} else {
+    Invoke-AttackSelection -attackSelection $attackSelection
+}
@@ -0,0 +1,157 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import queue
+import threading
+import time
+import helpers
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+# resolver(deploymentID) -> (response body, HTTP status)
+StateResolver = Callable[[str], Tuple[Dict[str, Any], int]]
+# on_change(deploymentID, previous entry or None, new entry)
+StateChangeHandler = Callable[[str, Optional[Dict[str, Any]], Dict[str, Any]], None]
+
+
+class DeploymentStateCache:
+    """
+    Shared, periodically refreshed view of each watched deployment's state.
+
+    Every deployment that a client asked about within DEPLOYMENT_STATE_IDLE_TIMEOUT
+    seconds is re-resolved once per DEPLOYMENT_STATE_REFRESH_INTERVAL by a single
+    reconciler thread, no matter how many tabs are polling it, and requests are
+    answered from the cache. Subscribers (the SSE stream) are pushed every state
+    change, so they do not need to poll at all.
+
+    The resolver is called repeatedly and must be read-only. Actions that
+    belong to a state change (e.g. cleanup once a deployment finished) go in
+    on_change, which runs once per changed entry before it is published.
+    """
+
+    def __init__(self, resolver: StateResolver,
+                 on_change: Optional[StateChangeHandler] = None,
+                 refresh_interval: float = helpers.DEPLOYMENT_STATE_REFRESH_INTERVAL,
+                 idle_timeout: float = helpers.DEPLOYMENT_STATE_IDLE_TIMEOUT):
+        self.resolver = resolver
+        self.on_change = on_change
+        self.refresh_interval = refresh_interval
+        self.idle_timeout = idle_timeout
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._watched: Dict[str, float] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._subscribers: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=helpers.DEPLOYMENT_STATE_MAX_WORKERS, thread_name_prefix="DeploymentState")
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True, name="DeploymentStateReconciler")
+                self._thread.start()
+
+    def _touch(self, deployment_id: str) -> None:
+        with self._lock:
+            self._watched[deployment_id] = time.time()
+
+    def get(self, deployment_id: str) -> Tuple[Dict[str, Any], int]:
+        """Cached (body, status) for the deployment; resolved on the spot the first time it is asked for."""
+        self._ensure_started()
+        self._touch(deployment_id)
+        with self._lock:
+            entry = self._entries.get(deployment_id)
+        if entry is None:
+            entry = self.refresh(deployment_id)
+        return entry["body"], entry["status"]
+
+    def invalidate(self, deployment_id: str) -> None:
+        """Forget the cached state, e.g. after shutdown or a new update deployment starts."""
+        with self._lock:
+            self._entries.pop(deployment_id, None)
+
+    def refresh(self, deployment_id: str) -> Dict[str, Any]:
+        """
+        Resolve the deployment's state now and publish it if it changed.
+        Concurrent refreshes of the same deployment share one resolver call.
+        """
+        with self._lock:
+            event = self._inflight.get(deployment_id)
+            owner = event is None
+            if owner:
+                event = self._inflight[deployment_id] = threading.Event()
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                entry = self._entries.get(deployment_id)
+            if entry is not None:
+                return entry
+            return self._make_entry({"message": "State unavailable"}, 503)
+
+        try:
+            try:
+                body, status = self.resolver(deployment_id)
+            except Exception as e:
+                logger.error(f"DEPLOYMENT_STATE_CACHE: Error resolving {deployment_id}: {e}")
+                body, status = {"message": str(e)}, 500
+
+            entry = self._make_entry(body, status)
+            with self._lock:
+                previous = self._entries.get(deployment_id)
+            changed = previous is None or previous["body"] != body or previous["status"] != status
+            if changed and self.on_change is not None:
+                try:
+                    self.on_change(deployment_id, previous, entry)
+                except Exception as e:
+                    logger.error(f"DEPLOYMENT_STATE_CACHE: Error handling state change of {deployment_id}: {e}")
+
+            with self._lock:
+                self._entries[deployment_id] = entry
+                subscribers = list(self._subscribers.get(deployment_id, ()))
+            if changed:
+                for subscriber in subscribers:
+                    subscriber.put(entry)
+            return entry
+        finally:
+            with self._lock:
+                self._inflight.pop(deployment_id, None)
+            event.set()
+
+    def _make_entry(self, body: Dict[str, Any], status: int) -> Dict[str, Any]:
+        return {"body": body, "status": status, "updatedAt": time.time()}
+
+    def subscribe(self, deployment_id: str) -> "queue.Queue":
+        """Queue that receives each new state entry for the deployment; starts with the current one."""
+        self._ensure_started()
+        self._touch(deployment_id)
+        subscriber: queue.Queue = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(deployment_id, set()).add(subscriber)
+            entry = self._entries.get(deployment_id)
+        if entry is not None:
+            subscriber.put(entry)
+        else:
+            self._executor.submit(self.refresh, deployment_id)
+        return subscriber
+
+    def unsubscribe(self, deployment_id: str, subscriber: "queue.Queue") -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(deployment_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[deployment_id]
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.refresh_interval)
+            now = time.time()
+            with self._lock:
+                for deployment_id in [d for d, seen in self._watched.items()
+                                      if now - seen > self.idle_timeout and d not in self._subscribers]:
+                    del self._watched[deployment_id]
+                    self._entries.pop(deployment_id, None)
+                due = list(self._watched)
+            for deployment_id in due:
+                self._executor.submit(self.refresh, deployment_id)
@@ -0,0 +1,235 @@
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import os
+import logging
+import threading
+import fs_manager
+import helpers
+from topology_index import TopologyIndex
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+NOT_FOUND = {"ERROR": "File not found"}
+
+
+class DeploymentStore:
+    """
+    In-memory cache of the JSON files in a deployment directory.
+
+    Each file is parsed once and kept until its change token (inode/mtime/size
+    for files, row version for the SQLite backend) changes or fs_manager
+    reports a write/delete for it, so repeated reads of the same deployment
+    within and across requests skip the JSON parse.
+
+    Returned dicts are shared with the cache and must be treated as read-only.
+    To change a deployment use update(), which serializes read-modify-write
+    cycles per deployment and replaces the file atomically.
+    """
+
+    def __init__(self, directory: str, fsync_interval: float = helpers.DEPLOYMENT_FSYNC_INTERVAL):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self._entries: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+        # deployment ID -> (topology dict the index was built from, index)
+        self._topology_indexes: Dict[str, Tuple[Dict[str, Any], TopologyIndex]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.RLock] = {}
+        self._pending_fsync: set = set()
+        self._fsync_timer: Optional[threading.Timer] = None
+        fs_manager.add_change_listener(self._on_file_changed)
+
+    def _on_file_changed(self, directory: str, file_name: str) -> None:
+        if os.path.abspath(directory) == os.path.abspath(self.directory):
+            self.invalidate(file_name)
+
+    def invalidate(self, deployment_id: Optional[str] = None) -> None:
+        """Drop one cached entry, or the whole cache when no ID is given."""
+        with self._lock:
+            if deployment_id is None:
+                self._entries.clear()
+                self._topology_indexes.clear()
+            else:
+                self._entries.pop(deployment_id, None)
+                self._topology_indexes.pop(deployment_id, None)
+
+    def get(self, deployment_id: str) -> Dict[str, Any]:
+        """
+        Return the parsed deployment file, or {"ERROR": "File not found"}
+        to match fs_manager.load_file.
+        """
+        if not deployment_id or deployment_id == "false":
+            return NOT_FOUND
+
+        signature = fs_manager.file_signature(self.directory, deployment_id)
+        if signature is None:
+            self.invalidate(deployment_id)
+            return NOT_FOUND
+
+        with self._lock:
+            cached = self._entries.get(deployment_id)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        data = fs_manager.load_file(self.directory, deployment_id)
+        if "ERROR" in data:
+            return NOT_FOUND
+
+        with self._lock:
+            self._entries[deployment_id] = (signature, data)
+        logger.debug(f"DEPLOYMENT_STORE: Cached {deployment_id}")
+        return data
+
+    def get_topology_index(self, deployment_id: str) -> Optional[TopologyIndex]:
+        """
+        TopologyIndex of a deployment's embedded topology (None without one),
+        built once per version of the deployment file.
+        """
+        topology = self.get(deployment_id).get("topology")
+        if not isinstance(topology, dict):
+            return None
+
+        # get() hands out the same dict until the file changes
+        with self._lock:
+            cached = self._topology_indexes.get(deployment_id)
+        if cached and cached[0] is topology:
+            return cached[1]
+
+        index = TopologyIndex(topology)
+        with self._lock:
+            self._topology_indexes[deployment_id] = (topology, index)
+        logger.debug(f"DEPLOYMENT_STORE: Indexed topology of {deployment_id} ({len(index.nodes)} nodes)")
+        return index
+
+    def _key_lock(self, deployment_id: str) -> threading.RLock:
+        with self._lock:
+            lock = self._key_locks.get(deployment_id)
+            if lock is None:
+                lock = self._key_locks[deployment_id] = threading.RLock()
+            return lock
+
+    @contextmanager
+    def update(self, deployment_id: str, create: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Transactional read-modify-write of one deployment file.
+
+            with deployment_store.update(deployment_id) as deployment:
+                if "ERROR" not in deployment:
+                    deployment["timeout"] = new_timeout
+
+        The deployment is re-read from disk while holding a per-deployment lock,
+        so concurrent updates from request threads and resolver threads are
+        applied one after another instead of overwriting each other. The yielded
+        dict is written back atomically when the block exits
+        without an exception; OSError is raised if that write fails. A missing file yields {"ERROR": "File not found"}
+        and is left untouched unless create=True, in which case an empty dict
+        is yielded and saved as a new file.
+
+        Do not nest update() calls for the same deployment.
+        """
+        with self._key_lock(deployment_id):
+            deployment = fs_manager.load_file(self.directory, deployment_id)
+            if "ERROR" in deployment:
+                deployment = {} if create else dict(NOT_FOUND)
+
+            yield deployment
+
+            if "ERROR" in deployment and not create:
+                return
+            result = fs_manager.save_file(deployment, self.directory, deployment_id)
+            if result and "ERROR" in result:
+                raise OSError(f"Could not save deployment {deployment_id}")
+            self._schedule_fsync(deployment_id)
+
+    def _schedule_fsync(self, deployment_id: str) -> None:
+        """
+        Writes are already atomic; fsync only bounds how much can
+        be lost on a host crash, so it is batched across all updates made within
+        fsync_interval seconds.
+        """
+        with self._lock:
+            self._pending_fsync.add(deployment_id)
+            if self._fsync_timer is None:
+                self._fsync_timer = threading.Timer(self.fsync_interval, self.flush)
+                self._fsync_timer.daemon = True
+                self._fsync_timer.start()
+
+    def flush(self) -> None:
+        """fsync every file updated since the last flush, then the directory."""
+        with self._lock:
+            pending = self._pending_fsync
+            self._pending_fsync = set()
+            self._fsync_timer = None
+
+        if pending:
+            fs_manager.sync_files(self.directory, pending)
+            logger.debug(f"DEPLOYMENT_STORE: Flushed {len(pending)} file(s)")
+
+    def set_attributes(self, deployment_id: str, **attributes: Any) -> bool:
+        """Set several top-level attributes in one transaction. Returns False if the file is missing."""
+        with self.update(deployment_id) as deployment:
+            if "ERROR" in deployment:
+                return False
+            deployment.update(attributes)
+        return True
+
+    def get_attribute(self, deployment_id: str, attribute: str, default: Any = None) -> Any:
+        deployment = self.get(deployment_id)
+        if "ERROR" in deployment:
+            return default
+        return deployment.get(attribute, default)
+
+    def exists(self, deployment_id: str) -> bool:
+        return "ERROR" not in self.get(deployment_id)
+
+    def list_ids(self) -> List[str]:
+        ids = fs_manager.list_files(self.directory)
+
+        # Forget entries whose files disappeared without going through fs_manager
+        with self._lock:
+            for stale in set(self._entries) - set(ids):
+                del self._entries[stale]
+                self._topology_indexes.pop(stale, None)
+        return ids
+
+    def list_all(self) -> List[Dict[str, Any]]:
+        return [self.get(deployment_id) for deployment_id in self.list_ids()]
+
+    def _query(self, **filters) -> List[Tuple[str, Dict[str, Any]]]:
+        if fs_manager.has_indexed_queries(self.directory):
+            return fs_manager.query_files(self.directory, **filters)
+        # Plain files: filter the cached documents instead of re-parsing every file
+        results = []
+        for deployment_id in self.list_ids():
+            data = self.get(deployment_id)
+            if "ERROR" not in data and fs_manager.matches_filters(deployment_id, data, **filters):
+                results.append((deployment_id, data))
+        return results
+
+    def list_deployments(self) -> List[Dict[str, Any]]:
+        """Only real deployment records (skips topology and BloodHound session files)."""
+        return [d for _, d in self._query(kind="deployment") if "deploymentID" in d]
+
+    def list_expired(self, now: int) -> List[Dict[str, Any]]:
+        """Deployments whose non-zero timeout is earlier than now."""
+        return [d for _, d in self._query(kind="deployment", timeoutBefore=now)]
+
+    def list_bloodhound_sessions(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """(upload_id, session) pairs for every bh-<upload_id> file, oldest first."""
+        return [(name[len("bh-"):], data) for name, data in self._query(kind="bloodhound")]
+
+    def get_by_resource_group(self, resource_group: str) -> Optional[Dict[str, Any]]:
+        direct = self.get(resource_group)
+        if "ERROR" not in direct and direct.get("resourceGroup", resource_group) == resource_group:
+            return direct
+        matches = self._query(kind="deployment", resourceGroup=resource_group)
+        return matches[0][1] if matches else None
+
+    def list_by_scenario(self, scenario: str) -> List[Dict[str, Any]]:
+        return [d for _, d in self._query(kind="deployment", scenario=scenario)]
+
+    def get_resource_group(self, deployment_id: str) -> str:
+        return self.get_attribute(deployment_id, "resourceGroup", deployment_id) or deployment_id
+
+
+deployment_store = DeploymentStore(helpers.DEPLOYMENT_DIRECTORY)
+saved_deployment_store = DeploymentStore(helpers.SAVED_DEPLOYMENTS_DIRECTORY)
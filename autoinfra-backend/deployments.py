@@ -1,14 +1,15 @@
 from datetime import datetime
 import logging
 import re
-import os
 import command_runner
 import fs_manager
 import helpers
+from deployment_store import deployment_store, saved_deployment_store
 from azure_clients import AzureClients
 from azure_setup import AzureSetup
+from azure_gateway import azure_gateway
+from operation_scheduler import operation_scheduler
 from azure.mgmt.resource.resources.models import Deployment, DeploymentProperties, DeploymentMode
-import threading
 logger = logging.getLogger(helpers.LOGGER_NAME)
 azure_setup = AzureSetup()
 azure_clients = AzureClients()
@@ -19,17 +20,28 @@ class Deployments:
         self.expiryTimeoutTag = "timeout"
         self.ipv4_pattern = re.compile(r'\b((25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b')
 
-    def deployment_resolver(self, poller, deploymentID, scenario):
-        logger.debug(f"DEPLOYMENT_RESOLVER: Waiting for deployment {deploymentID} to complete...")
+    def deployment_resolver(self, operation):
+        """
+        Scheduler handler for a submitted ARM deployment. Checks the deployment's
+        provisioning state once and returns the delay until the next check, or
+        None once it has finished, with the state to record on the operation.
+        """
+        deploymentID = operation["deploymentID"]
+        resource_client = azure_clients.get_resource_client()
+        state = resource_client.deployments.get_at_subscription_scope(deploymentID).properties.provisioning_state
+        updates = {"provisioningState": state}
 
-        try:
-            result = poller.result()  # waits for completion
-            logger.debug(f"DEPLOYMENT_RESOLVER: Deployment {deploymentID} complete.")
-        except Exception as e:
-            logger.error(f"DEPLOYMENT_RESOLVER: Error during deployment: {e}")
-            return
+        if state not in ("Succeeded", "Failed", "Canceled"):
+            logger.debug(f"DEPLOYMENT_RESOLVER: Deployment {deploymentID} is {state}")
+            return helpers.DEPLOYMENT_POLL_INTERVAL, updates
+
+        if state != "Succeeded":
+            logger.error(f"DEPLOYMENT_RESOLVER: Deployment {deploymentID} ended in state {state}")
+            return None, updates
 
+        logger.debug(f"DEPLOYMENT_RESOLVER: Deployment {deploymentID} complete.")
         self.get_deployment_ip(deploymentID)
+        return None, updates
 
     def deploy_scenario(self, scenario, caller_ip=None, version=None, machine_versions=None):
         appConfig = helpers.load_config()
@@ -115,15 +127,18 @@ class Deployments:
                 deployment = Deployment(location=region,properties=deployment_properties)
 
                 resource_client = azure_clients.get_resource_client()
-                poller = resource_client.deployments.begin_create_or_update_at_subscription_scope(
+                resource_client.deployments.begin_create_or_update_at_subscription_scope(
                     deployment_name=deploymentID,
                     parameters=deployment
                 )
 
-                threading.Thread(
-                    target=self.deployment_resolver,
-                    args=(poller, deploymentID, scenario)
-                ).start()
+                operation_scheduler.submit(
+                    "deployment", deploymentID,
+                    delay=helpers.DEPLOYMENT_POLL_INTERVAL,
+                    timeout=helpers.DEPLOYMENT_POLL_TIMEOUT,
+                    deploymentID=deploymentID,
+                    scenario=scenario
+                )
 
                 logger.info(f"DEPLOY: Deploying {scenario} to {deploymentID}.")
                 # Include topology from scenario for multi-domain support
@@ -148,7 +163,7 @@ class Deployments:
                 if not deployment.tags or "Scenario" not in deployment.tags:
                     continue
 
-                deployment_data = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, rg_name)
+                deployment_data = deployment_store.get(rg_name)
                 if "ERROR" in deployment_data:
                     continue
 
@@ -166,28 +181,21 @@ class Deployments:
 
     def list_local_deployments(self):
         logger.debug("LIST_LOCAL_DEPLOYMENTS: Listing local deployments...")
-        deployments = os.listdir(helpers.DEPLOYMENT_DIRECTORY)
-        deploymentList = []
-        for deployment in deployments:
-            if deployment != ".gitkeep":
-                deploymentList.append(fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment))
+        deploymentList = deployment_store.list_all()
         logger.debug(f"LIST_DEPLOYMENTS: Found {len(deploymentList)} deployment(s)")
         return(deploymentList)
 
     def set_deployment_attribute(self, deploymentID, attribute, value):
-        deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
-        if "ERROR" not in deployment:
-            deployment[attribute] = value
+        if deployment_store.set_attributes(deploymentID, **{attribute: value}):
             logger.debug(f"SET_DEPLOYMENT_ATTRIBUTE: Set {attribute} to {value}")
-            fs_manager.save_file(deployment, helpers.DEPLOYMENT_DIRECTORY, deploymentID)
         else:
             logger.error("SET_DEPLOYMENT_ATTRIBUTE: Failed. Could not load deployment file.")
 
     def get_deployment_attribute(self, deploymentID, attribute, directory=''):
         if directory == 'SAVED':
-            deployment = fs_manager.load_file(helpers.SAVED_DEPLOYMENTS_DIRECTORY,deploymentID)
+            deployment = saved_deployment_store.get(deploymentID)
         else:
-            deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
+            deployment = deployment_store.get(deploymentID)
 
         if "ERROR" not in deployment:
             attribute_value = deployment.get(attribute, '' if attribute != 'users' else [])
@@ -199,17 +207,16 @@ class Deployments:
     
     def list_deployment_attributes(self, deploymentID, directory=''):
         if directory == '':
-            deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
+            deployment = deployment_store.get(deploymentID)
             return deployment
         elif directory == "SAVED":
-            deployment = fs_manager.load_file(helpers.SAVED_DEPLOYMENTS_DIRECTORY,deploymentID)
+            deployment = saved_deployment_store.get(deploymentID)
             logger.debug(f"LIST_DEPLOYMENT_ATTRIBUTES: Got deployment attributes: {deployment}")
             return deployment
 
     def get_deployment_ip(self, deploymentID):
         try:
-            deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deploymentID)
-            resource_group = deployment.get("resourceGroup", deploymentID)
+            resource_group = deployment_store.get_resource_group(deploymentID)
 
             network_client = azure_clients.get_network_client()
             public_ips = network_client.public_ip_addresses.list(resource_group)
@@ -236,8 +243,7 @@ class Deployments:
 
             if entry_ips:
                 # Store the dictionary of node -> IP mappings
-                self.set_deployment_attribute(deploymentID, "entryIPs", entry_ips)
-                self.set_deployment_attribute(deploymentID, "entryIP", first_ip)
+                deployment_store.set_attributes(deploymentID, entryIPs=entry_ips, entryIP=first_ip)
                 logger.info(f"GET_DEPLOYMENT_IP: Set entry IPs for deployment {deploymentID}: {entry_ips}")
             else:
                 logger.error(f"GET_DEPLOYMENT_IP: Error Resolving Deployment IP: No IP address. Deployment {deploymentID} (resource group: {resource_group}) is either stale or currently deploying")
@@ -274,33 +280,29 @@ class Deployments:
     
     def destroy_saved_deployment(self, deploymentID, retries=helpers.DESTROY_DEPLOYMENT_RETRIES):
         try:
-            command = [
-                "az", "group", "delete",
-                "--name", deploymentID, "-y"
-            ]
             for attempt in range(retries):
-                output = command_runner.run_command_and_read_output(command)
-                logger.debug(f"DESTROY_DEPLOYMENT: Attempt {attempt + 1} - Destroy output for {deploymentID}: {output}")
-                if "error" not in output.lower():  
-                    try:
-                        fs_manager.delete_file(helpers.SAVED_DEPLOYMENTS_DIRECTORY, deploymentID)
-                        logger.debug(f"DESTROY_DEPLOYMENT: Deleted files for deployment {deploymentID}")
-                        return
-                    except Exception as e:
-                        logger.error(f"DESTROY_DEPLOYMENT: Error deleting files for deployment {deploymentID}: {e}")
-                        break
-                else:
-                    logger.error(f"DESTROY_DEPLOYMENT: Error deleting deployment {deploymentID}: {output}")
+                try:
+                    azure_gateway.delete_resource_group(deploymentID)
+                    logger.debug(f"DESTROY_DEPLOYMENT: Attempt {attempt + 1} - Deleted resource group {deploymentID}")
+                except Exception as delete_error:
+                    logger.error(f"DESTROY_DEPLOYMENT: Error deleting deployment {deploymentID}: {delete_error}")
                     if attempt < retries - 1:
                         logger.info(f"DESTROY_DEPLOYMENT: Retrying deletion for deployment {deploymentID} (attempt {attempt + 2}/{retries})")
                     else:
                         logger.error(f"DESTROY_DEPLOYMENT: Failed to delete deployment {deploymentID} after {retries} attempts")
+                    continue
+                try:
+                    fs_manager.delete_file(helpers.SAVED_DEPLOYMENTS_DIRECTORY, deploymentID)
+                    logger.debug(f"DESTROY_DEPLOYMENT: Deleted files for deployment {deploymentID}")
+                except Exception as e:
+                    logger.error(f"DESTROY_DEPLOYMENT: Error deleting files for deployment {deploymentID}: {e}")
+                return
         except Exception as e:
             logger.error(f"DESTROY_DEPLOYMENT: Error in destroy_deployment for deployment {deploymentID}: {e}")
 
     def expired_saved_deployments_handler(self):
         currentTime = int(datetime.now().timestamp())
-        deployments = self.list_saved_deployments()
+        deployments = [group["Name"][len(helpers.SAVED_DEPLOYMENT_PREFIX):] for group in self.list_saved_deployments()]
         for deployment in deployments:
             resource_group_name = self.get_deployment_attribute(deploymentID=deployment,attribute='deploymentID',directory="SAVED");
             expiryTimestamp = self.get_deployment_attribute(deploymentID=deployment,attribute='expiryTimestamp',directory="SAVED");
@@ -323,21 +325,12 @@ class Deployments:
         Called by background cleanup thread and manual cleanup.
         """
         currentTime = int(datetime.now().timestamp())
-        deployments = self.list_local_deployments()
+        logger.info(f"EXPIRED_DEPLOYMENTS_HANDLER: Current timestamp: {currentTime}")
 
-        for deployment in deployments:
-            expiryTimestamp = deployment.get('timeout')
+        for deployment in deployment_store.list_expired(currentTime):
             deploymentID = deployment.get('deploymentID', 'unknown')
-            if expiryTimestamp:
-                logger.info(f"EXPIRED_DEPLOYMENTS_HANDLER: Current timestamp: {currentTime}")
-                logger.info(f"EXPIRED_DEPLOYMENTS_HANDLER: Expiry timestamp: {expiryTimestamp}")
-                if int(expiryTimestamp) < currentTime:
-                    logger.info(f"Found expired deployment: {deploymentID}. Destroying.")
-                    self.destroy_deployment(deploymentID=deploymentID)
-                else:
-                    logger.info(f"EXPIRED_DEPLOYMENTS_HANDLER: Deployment {deploymentID} is not expired.")
-            else:
-                pass
+            logger.info(f"Found expired deployment: {deploymentID} (expiry {deployment.get('timeout')}). Destroying.")
+            self.destroy_deployment(deploymentID=deploymentID)
 
 
     def check_health_of_deployments(self):
@@ -348,7 +341,7 @@ class Deployments:
         This catches any cleanup missed if backend was offline.
         """
         logger.info("CHECK_HEALTH_OF_DEPLOYMENTS: Starting health check...")
-        deployments = os.listdir(helpers.DEPLOYMENT_DIRECTORY)
+        deployments = deployment_store.list_ids()
         current_time = int(datetime.now().timestamp())
 
         try:
@@ -359,11 +352,8 @@ class Deployments:
             return
 
         for deployment_file in deployments:
-            if deployment_file == ".gitkeep":
-                continue
-
             try:
-                deployment_data = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment_file)
+                deployment_data = deployment_store.get(deployment_file)
                 if "ERROR" in deployment_data:
                     logger.warning(f"CHECK_HEALTH: {deployment_file} - error loading, skipping")
                     continue
@@ -428,24 +418,16 @@ class Deployments:
 
     ### Saved Deployments
     def list_saved_deployments(self):
-        saved_deployments = os.listdir(helpers.SAVED_DEPLOYMENTS_DIRECTORY)
-
-        azureCommand = [
-            "az", "group", "list", "--query", f"[?starts_with(name, '{helpers.SAVED_DEPLOYMENT_PREFIX}')].{{Name:name}}"
-        ]
-        azureGroups = command_runner.run_command_and_read_output(azureCommand)
+        azureGroups = [{"Name": name} for name in azure_gateway.list_resource_groups(helpers.SAVED_DEPLOYMENT_PREFIX)]
         logger.debug(f"LISTING SAVED DEPLOYMENTS: {azureGroups}")
         return azureGroups
 
 
     def get_saved_deployment(self,savedDeploymentID):
-        azureCommand = [
-            "az", "group", "list", "--query", f"[?starts_with(name, '{helpers.SAVED_DEPLOYMENT_PREFIX}')].{{Name:name}}"
-        ]
-        azureGroups = command_runner.run_command_and_read_output(azureCommand)
-        deploymentConfigs = fs_manager.load_file(helpers.SAVED_DEPLOYMENTS_DIRECTORY, savedDeploymentID)
+        azureGroups = azure_gateway.list_resource_groups(helpers.SAVED_DEPLOYMENT_PREFIX)
+        deploymentConfigs = saved_deployment_store.get(savedDeploymentID)
         logger.debug(f"GET_SAVED_DEPLOYMENTS: Environment Configs: {deploymentConfigs}")
-        if savedDeploymentID in azureGroups and deploymentConfigs != "File not found":
+        if any(savedDeploymentID in group for group in azureGroups) and deploymentConfigs != "File not found":
             logger.info(f"GET_SAVED_DEPLOYMENTS: Found saved deployment {savedDeploymentID}")
             return deploymentConfigs
         else:
@@ -459,10 +441,13 @@ class Deployments:
 
     def delete_saved_environment_resolver(self,deploymentID):
         savedDeploymentID = f"{helpers.SAVED_DEPLOYMENT_PREFIX}{deploymentID}"
-        command = ["az", "group", "delete","--name", savedDeploymentID, "-y"]
         fs_manager.delete_file(helpers.SAVED_DEPLOYMENTS_DIRECTORY, deploymentID)
         logger.debug(f"DELETE_SAVED_ENVIRONMENT_RESOLVER: Finished deleting the cache data for {savedDeploymentID}.")
-        command_runner.run_command_and_read_output(command)
+        try:
+            azure_gateway.delete_resource_group(savedDeploymentID)
+        except Exception as e:
+            logger.error(f"DELETE_SAVED_ENVIRONMENT_RESOLVER: Error deleting {savedDeploymentID} from Azure: {e}")
+            return
         logger.debug(f"DELETE_SAVED_ENVIRONMENT_RESOLVER: Finished deleting {savedDeploymentID} from Azure.")
 
 
@@ -547,8 +532,8 @@ class Deployments:
         Clean up all active deployments on shutdown.
         Called by signal handler on Ctrl+C or termination.
         """
-        deployment_files = os.listdir(helpers.DEPLOYMENT_DIRECTORY)
-        deployment_ids = [f for f in deployment_files if f != ".gitkeep" and not f.endswith("_topology")]
+        deployment_files = deployment_store.list_ids()
+        deployment_ids = [f for f in deployment_files if not f.endswith("_topology")]
 
         if not deployment_ids:
             logger.info("CLEANUP_DEPLOYMENTS_ON_EXIT: No active deployments to clean up")
@@ -562,3 +547,6 @@ class Deployments:
                 self.destroy_deployment(deployment_id)
             except Exception as e:
                 logger.error(f"CLEANUP_DEPLOYMENTS_ON_EXIT: Error destroying {deployment_id}: {e}")
+
+
+operation_scheduler.register_handler("deployment", lambda operation: Deployments().deployment_resolver(operation))
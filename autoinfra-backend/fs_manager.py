@@ -1,16 +1,160 @@
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import json
 import os
+import tempfile
 import logging
 
 logger = logging.getLogger("backend-logs")
 
+# Callbacks invoked as listener(fileTypeDirectory, fileName) after a save or delete,
+# used by in-memory caches (see deployment_store) to drop stale entries.
+_change_listeners: List[Callable[[str, str], None]] = []
+
+def add_change_listener(listener: Callable[[str, str], None]) -> None:
+    _change_listeners.append(listener)
+
+def _notify_change(fileTypeDirectory, fileName):
+    for listener in _change_listeners:
+        try:
+            listener(fileTypeDirectory, fileName)
+        except Exception as e:
+            logger.error(f"NOTIFY_CHANGE: Listener failed for {fileName}: {e}")
+
+
+class FileBackend:
+    """
+    Default storage: one JSON file per entity inside the given directory.
+    """
+
+    def handles(self, fileTypeDirectory: str) -> bool:
+        return True
+
+    def load(self, fileTypeDirectory: str, fileName: str) -> Dict[str, Any]:
+        with open(os.path.join(fileTypeDirectory, fileName),'r') as fd:
+            return json.loads(fd.read())
+
+    def save(self, saveData, fileTypeDirectory: str, fileName: str) -> None:
+        # Write to a temp file in the same directory and swap it in with os.replace,
+        # so concurrent readers see either the old or the new file, never a partial one
+        fd, tempPath = tempfile.mkstemp(dir=fileTypeDirectory, prefix=f".{fileName}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as tempFile:
+                tempFile.write(json.dumps(saveData))
+            os.replace(tempPath, os.path.join(fileTypeDirectory, fileName))
+        except:
+            try:
+                os.remove(tempPath)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, fileTypeDirectory: str, fileName: str) -> None:
+        os.remove(os.path.join(fileTypeDirectory, fileName))
+
+    def exists(self, fileTypeDirectory: str, fileName: str) -> bool:
+        return os.path.isfile(os.path.join(fileTypeDirectory, fileName))
+
+    def signature(self, fileTypeDirectory: str, fileName: str) -> Optional[Tuple]:
+        try:
+            st = os.stat(os.path.join(fileTypeDirectory, fileName))
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def list_names(self, fileTypeDirectory: str) -> List[str]:
+        try:
+            fileNames = os.listdir(fileTypeDirectory)
+        except OSError:
+            return []
+        # Dotfiles are .gitkeep and in-flight temp files from save()
+        return [name for name in fileNames if not name.startswith(".")]
+
+    def query(self, fileTypeDirectory: str, **filters) -> List[Tuple[str, Dict[str, Any]]]:
+        results = []
+        for name in self.list_names(fileTypeDirectory):
+            try:
+                data = self.load(fileTypeDirectory, name)
+            except Exception:
+                continue
+            if matches_filters(name, data, **filters):
+                results.append((name, data))
+        return results
+
+    def sync(self, fileTypeDirectory: str, fileNames) -> None:
+        for fileName in fileNames:
+            try:
+                fd = os.open(os.path.join(fileTypeDirectory, fileName), os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                # File was deleted since it was written; nothing to sync
+                pass
+
+        if fileNames and hasattr(os, "O_DIRECTORY"):
+            try:
+                dir_fd = os.open(fileTypeDirectory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            except OSError as e:
+                logger.warning(f"SYNC: Could not fsync {fileTypeDirectory}: {e}")
+
+
+def record_kind(fileName: str) -> str:
+    """Classify a stored entity by its file name (bh-<id> sessions, <id>_topology files, scenarios, deployments)."""
+    if fileName.startswith("bh-"):
+        return "bloodhound"
+    if fileName.endswith("_topology"):
+        return "topology"
+    if fileName.endswith(".json"):
+        return "scenario"
+    return "deployment"
+
+def matches_filters(fileName, data, kind=None, scenario=None, resourceGroup=None, status=None, timeoutBefore=None, namePrefix=None) -> bool:
+    """Reference semantics for query(); SQL backends must return the same rows."""
+    if kind is not None and record_kind(fileName) != kind:
+        return False
+    if namePrefix is not None and not fileName.startswith(namePrefix):
+        return False
+    if not isinstance(data, dict):
+        return False
+    if scenario is not None and data.get("scenario") != scenario:
+        return False
+    if resourceGroup is not None and data.get("resourceGroup", data.get("deploymentID")) != resourceGroup:
+        return False
+    if status is not None and data.get("status") != status:
+        return False
+    if timeoutBefore is not None:
+        timeout = data.get("timeout")
+        try:
+            if not timeout or int(timeout) >= timeoutBefore:
+                return False
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+_fileBackend = FileBackend()
+_backend = _fileBackend
+
+def use_backend(backend) -> None:
+    """Route the directories the backend handles() through it; everything else stays on disk."""
+    global _backend
+    _backend = backend
+    logger.info(f"USE_BACKEND: Storage backend set to {type(backend).__name__}")
+
+def _backend_for(fileTypeDirectory):
+    return _backend if _backend.handles(fileTypeDirectory) else _fileBackend
+
 def load_file(fileTypeDirectory: str, fileName: str) -> Dict[str, Any]:
     if fileName != "false":
         try:
-            with open(os.path.join(fileTypeDirectory, fileName),'r') as fd:
-                logger.info(f"LOAD_FILE: Successfully loaded file: {fileName}")
-                return json.loads(fd.read())
+            data = _backend_for(fileTypeDirectory).load(fileTypeDirectory, fileName)
+            logger.info(f"LOAD_FILE: Successfully loaded file: {fileName}")
+            return data
         except:
             logger.error(f"LOAD_FILE: Unable to load file {fileName}. File not found.")
             return {"ERROR":"File not found"}
@@ -20,18 +164,45 @@ def load_file(fileTypeDirectory: str, fileName: str) -> Dict[str, Any]:
 
 def save_file(saveData, fileTypeDirectory, fileName):
     try:
-        with open(os.path.join(fileTypeDirectory, fileName),'w') as fd:
-            fd.write(json.dumps(saveData))
-            logger.info(f"SAVE_FILE: Successfully saved file: {fileName}")
+        _backend_for(fileTypeDirectory).save(saveData, fileTypeDirectory, fileName)
+        logger.info(f"SAVE_FILE: Successfully saved file: {fileName}")
     except:
         logger.error(f"SAVE_FILE: Unable to save file {fileName}. File not found.")
         return {"ERROR":"File not found"}
+    finally:
+        _notify_change(fileTypeDirectory, fileName)
 
 def delete_file(fileTypeDirectory, fileName):
     try:
         if fileName != ".gitkeep":
-            os.remove(os.path.join(fileTypeDirectory, fileName))
+            _backend_for(fileTypeDirectory).delete(fileTypeDirectory, fileName)
             logger.info(f"DELETE_FILE: Successfully deleted file: {fileName}")
     except:
         logger.error(f"DELETE_FILE: Unable to delete file {fileName}. File not found.")
         return {"ERROR":"File not found"}
+    finally:
+        _notify_change(fileTypeDirectory, fileName)
+
+def file_exists(fileTypeDirectory, fileName) -> bool:
+    return _backend_for(fileTypeDirectory).exists(fileTypeDirectory, fileName)
+
+def file_signature(fileTypeDirectory, fileName) -> Optional[Tuple]:
+    """Cheap change token for a stored entity (None if it does not exist)."""
+    return _backend_for(fileTypeDirectory).signature(fileTypeDirectory, fileName)
+
+def list_files(fileTypeDirectory) -> List[str]:
+    return _backend_for(fileTypeDirectory).list_names(fileTypeDirectory)
+
+def query_files(fileTypeDirectory, **filters) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Return (fileName, data) pairs matching the filters (kind, scenario, resourceGroup,
+    status, timeoutBefore, namePrefix). Indexed in the SQLite backend, a scan otherwise.
+    """
+    return _backend_for(fileTypeDirectory).query(fileTypeDirectory, **filters)
+
+def has_indexed_queries(fileTypeDirectory) -> bool:
+    return _backend_for(fileTypeDirectory) is not _fileBackend
+
+def sync_files(fileTypeDirectory, fileNames) -> None:
+    """Flush previously saved files to stable storage."""
+    _backend_for(fileTypeDirectory).sync(fileTypeDirectory, fileNames)
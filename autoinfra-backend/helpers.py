@@ -15,6 +15,10 @@ SCENARIO_TEMPLATE_DIRECTORY = "./templates/scenarios/"
 GENERATED_TEMPLATE_DIRECTORY = "./templates/generated/"
 UPDATES_TEMPLATE_DIRECTORY = "./templates/updates/"
 TOPOLOGY_TEMPLATE_DIRECTORY = "./config/topology-templates"
+METADATA_DB_PATH = "./metadata.db"
+OPERATIONS_DIRECTORY = "./operations"
+BLOODHOUND_CACHE_DIRECTORY = "./bloodhound-cache"
+BICEP_CACHE_DIRECTORY = "./bicep-cache"
 CONFIG_FILE_PATH = "./config/config.json"
 SAVE_DEPLOYMENT_BICEP = "./templates/SaveDeployment.bicep"
 SCENARIO_MANAGER_BICEP = "./templates/ScenarioManager.bicep"
@@ -41,6 +45,28 @@ DESTROY_DEPLOYMENT_RETRIES = 3
 DELETION_VERIFICATION_MAX_RETRIES = 5
 DELETION_VERIFICATION_BASE_WAIT = 180
 IMAGE_CLEANUP_MAX_WORKERS = 10
+DEPLOYMENT_FSYNC_INTERVAL = 1
+AZURE_HTTP_POOL_CONNECTIONS = 10
+AZURE_HTTP_POOL_MAXSIZE = 32
+OPERATION_SCHEDULER_MAX_WORKERS = 4
+OPERATION_HISTORY_SIZE = 50
+OPERATION_RETRY_DELAY = 60
+DEPLOYMENT_POLL_TIMEOUT = 14400
+DEPLOYMENT_STATE_IDLE_TIMEOUT = 300
+DEPLOYMENT_STATE_MAX_WORKERS = 4
+DEPLOYMENT_STATE_HEARTBEAT_INTERVAL = 15
+ATTACK_STATUS_MAX_WORKERS = 8
+ATTACK_DISPATCH_MAX_WORKERS = 8
+ATTACK_MAX_STEPS_PER_RUN = 10
+USER_CREATION_MAX_WORKERS = 8
+USER_CREATION_CHUNK_SIZE = 200
+USER_CREATION_MAX_SCRIPT_BYTES = 128 * 1024
+USER_CREATION_RESULT_BYTES = 2400  # Bytes of usernames per chunk, so its results fit the 4 KB of output RunCommand returns
+USER_CREATION_RUNSPACES = 8
+USER_SYNC_MAX_WORKERS = 8
+USER_SYNC_PAGE_BYTES = 2800  # Bytes of usernames per page; RunCommand returns the last 4 KB of output
+BLOODHOUND_CACHE_MEMORY_ENTRIES = 2
+BICEP_CACHE_MAX_ENTRIES = 200
 RANDOM_PORT_MIN = 30000
 RANDOM_PORT_MAX = 31000
 
@@ -63,6 +89,11 @@ DEPLOYMENT_TIMEOUT_HOURS = _config.get("deploymentTimeoutHours", 2)
 SAVED_DEPLOYMENT_TIMEOUT_HOURS = _config.get("savedDeploymentTimeoutHours", 168)
 MAX_DEPLOYMENT_EXTENSIONS = _config.get("maxDeploymentExtensions", 2)
 BACKEND_PORT = _config.get("backendPort", 8100)
+STORAGE_BACKEND = _config.get("storageBackend", "file")
+DEPLOYMENT_POLL_INTERVAL = _config.get("deploymentPollInterval", 30)
+DEPLOYMENT_STATE_REFRESH_INTERVAL = _config.get("deploymentStateRefreshInterval", 10)
+BLOODHOUND_PARSE_WORKERS = _config.get("bloodhoundParseWorkers", 0)
+BLOODHOUND_REDUCE_MIN_COMPUTERS = _config.get("bloodhoundReduceMinComputers", 500)  # Exports with at least this many computers are reduced unless "reduce" is set
 
 # Kali Linux marketplace configuration
 KALI_PUBLISHER = "kali-linux"
@@ -136,27 +167,47 @@ def get_subscription_id():
 def update_expiry_tag(newValue, deploymentID):
     subscription_id = get_subscription_id()
     resourceID = f"/subscriptions/{subscription_id}/resourceGroups/{deploymentID}"
-    tag = f"expiryTimeout={newValue}"
-    command = ["az", "tag", "update", "--resource-id", resourceID, "--operation", "Merge", "--tags", tag]
-    command_runner.run_command_and_read_output(command)
+    try:
+        from azure_gateway import azure_gateway
+        azure_gateway.update_tags(resourceID, {"expiryTimeout": str(newValue)})
+    except Exception as e:
+        logger.error(f"UPDATE_EXPIRY_TAG: Failed to tag {deploymentID}: {e}")
 
 def add_time(deploymentID, hours):
-    deployment = fs_manager.load_file(DEPLOYMENT_DIRECTORY, deploymentID)
-    if "ERROR" not in deployment:
-        if deployment["remainingExtensions"] > 0:
-            deployment_timeout = deployment["timeout"]
-            newTimeout = deployment_timeout + (hours*3600)
-            deployment["timeout"] = newTimeout
-            deployment["remainingExtensions"] -= 1
-            update_expiry_tag(newTimeout, deploymentID)
-            logger.info(f"ADD_TIME: New timeout: {newTimeout}")
-            fs_manager.save_file(deployment, DEPLOYMENT_DIRECTORY, deploymentID)
-        else:
+    from deployment_store import deployment_store
+
+    with deployment_store.update(deploymentID) as deployment:
+        if "ERROR" in deployment:
+            logger.error("ADD_TIME: Failed. Could not load deployment file.")
+            return "FILE NOT FOUND"
+        if deployment["remainingExtensions"] <= 0:
             logger.error("ADD_TIME: Failed. No extensions remaining.")
             return "NO MORE EXTENSIONS"
-    else:
-        logger.error("ADD_TIME: Failed. Could not load deployment file.")
-        return "FILE NOT FOUND"
+        deployment_timeout = deployment["timeout"]
+        newTimeout = deployment_timeout + (hours*3600)
+        deployment["timeout"] = newTimeout
+        deployment["remainingExtensions"] -= 1
+        logger.info(f"ADD_TIME: New timeout: {newTimeout}")
+
+    update_expiry_tag(newTimeout, deploymentID)
+
+def configure_storage_backend():
+    """
+    Switch deployment, saved-deployment and scenario metadata to SQLite when
+    config.json sets "storageBackend": "sqlite". Existing JSON files are imported
+    on first use. Must run before anything reads deployments.
+    """
+    if STORAGE_BACKEND != "sqlite":
+        logger.info("CONFIGURE_STORAGE_BACKEND: Using JSON files")
+        return
+
+    from sqlite_backend import SqliteBackend, migrate_files_to_sqlite
+
+    directories = [DEPLOYMENT_DIRECTORY, SAVED_DEPLOYMENTS_DIRECTORY, SCENARIO_DIRECTORY]
+    backend = SqliteBackend(METADATA_DB_PATH, directories)
+    migrate_files_to_sqlite(backend, directories)
+    fs_manager.use_backend(backend)
+    logger.info(f"CONFIGURE_STORAGE_BACKEND: Using SQLite at {METADATA_DB_PATH}")
 
 def update_config_value(key, value):
     config = load_config()
@@ -180,11 +231,8 @@ def get_deployed_machine_types(deploymentID):
     """
     try:
         from azure_clients import AzureClients
-        from azure.mgmt.compute import ComputeManagementClient
 
-        azure_clients = AzureClients()
-        credential, subscription_id = azure_clients.get_auth_config()
-        compute_client = ComputeManagementClient(credential, subscription_id)
+        compute_client = AzureClients().get_compute_client()
 
         machine_types = set()
 
@@ -0,0 +1,210 @@
+"""
+Content-addressed staging of ADVulnEnvModule.psm1 and ExecuteModule.ps1 on VMs.
+
+Instead of sending both scripts inline with every RunCommand, they are copied
+once to the VM (C:\\Temp\\ADVulnEnvModule\\ADVulnEnvModule.psm1 and
+C:\\Temp\\ExecuteModule.ps1, where SetupFiles-Embedded.ps1 installs the module)
+next to a marker file holding the bundle hash: a sha256 over the content
+hashes of both scripts from asset_registry. Every call then sends only the
+invoke script, which declares ExecuteModule.ps1's parameters, checks the
+marker and runs the staged ExecuteModule.ps1 with the parameters it was given.
+
+When the marker is missing or holds another hash (new VM, or either script
+changed), the invoke script reports a "staging" result with status
+"required" instead of running anything; run() then uploads the scripts and
+retries once. For run commands that are started without waiting for them
+(attack_engine), ensure_staged() checks the marker with a small probe script
+first and uploads only when it differs. VMs known to be current are
+remembered per bundle hash, so later calls skip the probe.
+"""
+
+from typing import Dict, Optional, Tuple
+import hashlib
+import logging
+import re
+import threading
+from asset_registry import asset_registry
+from azure_gateway import azure_gateway
+from script_results import RESULT_PREFIX, iter_results
+import helpers
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+STAGED_MODULE_PATH = "C:\\Temp\\ADVulnEnvModule\\ADVulnEnvModule.psm1"
+STAGED_EXECUTE_PATH = "C:\\Temp\\ExecuteModule.ps1"
+STAGED_MARKER_PATH = "C:\\Temp\\ADVulnEnvModule\\staged.sha256"
+
+_MARKER_CHECK = f'''
+$stagedMarker = '{STAGED_MARKER_PATH}'
+$stagedHash = if (Test-Path -Path $stagedMarker) {{ (Get-Content -Path $stagedMarker -Raw).Trim() }} else {{ '' }}
+'''
+
+
+def _staging_result_line(status: str) -> str:
+    """PowerShell line reporting a "staging" result with the VM's staged hash"""
+    return f"Write-Output ('{RESULT_PREFIX}' + (ConvertTo-Json -Compress -InputObject @{{ kind = 'staging'; status = '{status}'; hash = $stagedHash }}))"
+
+
+_PROBE_SCRIPT = _MARKER_CHECK + _staging_result_line('current') + '\n'
+
+_INVOKE_TEMPLATE = '''{param_block}
+{marker_check}
+if ($stagedHash -ne '{bundle_hash}') {{
+    {staging_required}
+    exit 3
+}}
+
+$global:LASTEXITCODE = 0
+& '{execute_path}' @PSBoundParameters
+if ($LASTEXITCODE) {{ exit $LASTEXITCODE }}
+'''
+
+_STAGE_TEMPLATE = '''$logFilePath = "C:\\Temp\\logfile.txt"
+$moduleDir = Split-Path -Path '{module_path}'
+if (-not (Test-Path -Path $moduleDir)) {{
+    New-Item -ItemType Directory -Path $moduleDir -Force | Out-Null
+}}
+
+$moduleContent = @'
+{module_script}
+'@
+Set-Content -Path '{module_path}' -Value $moduleContent -Force -Encoding UTF8
+
+$executeScriptContent = @'
+{execute_script}
+'@
+Set-Content -Path '{execute_path}' -Value $executeScriptContent -Force -Encoding UTF8
+
+# Written last, so an interrupted upload is retried by the next call
+Set-Content -Path '{marker_path}' -Value '{bundle_hash}' -Force
+Add-Content -Path $logFilePath -Value "Staged ADVulnEnvModule and ExecuteModule.ps1 ({bundle_hash})"
+$stagedHash = '{bundle_hash}'
+{staging_staged}
+'''
+
+# param(...) block at the top of ExecuteModule.ps1, up to the first line holding only ")"
+_PARAM_BLOCK = re.compile(r'\A\s*param\s*\(.*?^\)', re.IGNORECASE | re.DOTALL | re.MULTILINE)
+
+_SCRIPT_ASSETS = (helpers.ADVULN_MODULE_SCRIPT, helpers.EXECUTE_MODULE_SCRIPT)
+
+
+def _bundle_hash(module, execute) -> str:
+    return hashlib.sha256(f"{module.sha256}:{execute.sha256}".encode('utf-8')).hexdigest()
+
+
+def _here_string_body(asset) -> str:
+    """Asset text for a single-quoted here-string, which ends at the first line starting with '@"""
+    if re.search(r"^'@", asset.text, re.MULTILINE):
+        raise ValueError(f"{asset.path} contains a line starting with '@ and cannot be staged")
+    return asset.text
+
+
+def _build_scripts(module, execute) -> Tuple[str, str, str]:
+    """(bundle hash, invoke script, stage script) for one version of the scripts"""
+    bundle_hash = _bundle_hash(module, execute)
+    param_block = _PARAM_BLOCK.search(execute.text)
+    if not param_block:
+        raise ValueError(f"{execute.path} has no param block")
+
+    invoke_script = _INVOKE_TEMPLATE.format(
+        param_block=param_block.group(0).strip(),
+        marker_check=_MARKER_CHECK,
+        bundle_hash=bundle_hash,
+        staging_required=_staging_result_line('required'),
+        execute_path=STAGED_EXECUTE_PATH
+    )
+    stage_script = _STAGE_TEMPLATE.format(
+        module_path=STAGED_MODULE_PATH,
+        execute_path=STAGED_EXECUTE_PATH,
+        marker_path=STAGED_MARKER_PATH,
+        module_script=_here_string_body(module),
+        execute_script=_here_string_body(execute),
+        bundle_hash=bundle_hash,
+        staging_staged=_staging_result_line('staged')
+    )
+    return bundle_hash, invoke_script, stage_script
+
+
+def _staging_result(output: Dict[str, str]) -> Optional[Dict[str, str]]:
+    return next(iter_results(output["stdout"], "staging"), None)
+
+
+class ModuleStager:
+    def __init__(self):
+        # (resource group, VM) -> bundle hash the VM is known to hold
+        self._staged: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self._vm_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def scripts(self) -> Tuple[str, str, str]:
+        """(bundle hash, invoke script, stage script) of the current scripts"""
+        return asset_registry.derive("module_staging", _SCRIPT_ASSETS, _build_scripts)
+
+    def invoke_script(self) -> str:
+        """Short script running the staged ExecuteModule.ps1 with the RunCommand's parameters"""
+        return self.scripts()[1]
+
+    def _vm_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            return self._vm_locks.setdefault(key, threading.Lock())
+
+    def _remember(self, key: Tuple[str, str], bundle_hash: Optional[str]) -> None:
+        with self._lock:
+            if bundle_hash:
+                self._staged[key] = bundle_hash
+            else:
+                self._staged.pop(key, None)
+
+    def _stage(self, resource_group: str, vm_name: str, bundle_hash: str, stage_script: str) -> None:
+        output = azure_gateway.run_powershell(resource_group, vm_name, stage_script)
+        result = _staging_result(output)
+        if not result or result.get("hash") != bundle_hash:
+            raise RuntimeError(f"Staging scripts on {vm_name} failed: {(output['stderr'] or 'No result returned')[:200]}")
+        logger.info(f"MODULE_STAGING: Staged scripts on {vm_name} in {resource_group} ({bundle_hash[:12]}, {len(stage_script)} bytes)")
+
+    def ensure_staged(self, resource_group: str, vm_name: str) -> bool:
+        """
+        Make sure the VM holds the current scripts, probing its marker unless it
+        is already known to. Returns True when the scripts were uploaded.
+        """
+        key = (resource_group, vm_name)
+        bundle_hash, _, stage_script = self.scripts()
+        with self._vm_lock(key):
+            with self._lock:
+                if self._staged.get(key) == bundle_hash:
+                    return False
+
+            result = _staging_result(azure_gateway.run_powershell(resource_group, vm_name, _PROBE_SCRIPT))
+            if result and result.get("hash") == bundle_hash:
+                self._remember(key, bundle_hash)
+                return False
+
+            logger.info(f"MODULE_STAGING: {vm_name} in {resource_group} holds {((result or {}).get('hash') or 'no scripts')[:12]}, staging {bundle_hash[:12]}")
+            self._stage(resource_group, vm_name, bundle_hash, stage_script)
+            self._remember(key, bundle_hash)
+            return True
+
+    def run(self, resource_group: str, vm_name: str, parameters: Dict[str, str]) -> Dict[str, str]:
+        """
+        Run the staged ExecuteModule.ps1 with parameters and wait for it,
+        staging the scripts first if the VM's copy is missing or outdated.
+        Returns {"stdout", "stderr"} as azure_gateway.run_powershell.
+        """
+        key = (resource_group, vm_name)
+        bundle_hash, invoke_script, stage_script = self.scripts()
+        output = azure_gateway.run_powershell(resource_group, vm_name, invoke_script, parameters)
+
+        result = _staging_result(output)
+        if result and result.get("status") == "required":
+            logger.info(f"MODULE_STAGING: {vm_name} in {resource_group} holds {(result.get('hash') or 'no scripts')[:12]}, staging {bundle_hash[:12]}")
+            with self._vm_lock(key):
+                self._remember(key, None)
+                self._stage(resource_group, vm_name, bundle_hash, stage_script)
+                self._remember(key, bundle_hash)
+            output = azure_gateway.run_powershell(resource_group, vm_name, invoke_script, parameters)
+        else:
+            self._remember(key, bundle_hash)
+        return output
+
+
+module_stager = ModuleStager()
@@ -0,0 +1,192 @@
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
+import logging
+import threading
+import time
+import fs_manager
+import helpers
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+PENDING_OPERATIONS_FILE = "pending_operations"
+
+# handler(operation) -> seconds until the next check, or None when the operation is finished,
+# optionally paired with fields to update on the operation: (delay, {"field": value})
+OperationResult = Union[Optional[float], Tuple[Optional[float], Dict[str, Any]]]
+OperationHandler = Callable[[Dict[str, Any]], OperationResult]
+
+
+class OperationScheduler:
+    """
+    One timer thread plus a small worker pool for every long-running Azure
+    operation the backend waits on (ARM deployments, resource group deletion
+    verification, ...), instead of one parked thread or Timer per operation.
+
+    Operations are plain dicts persisted to OPERATIONS_DIRECTORY, so anything
+    still pending when the backend stops is picked up again on start(). Each
+    operation kind has a handler that checks progress once and returns the
+    delay until its next check, or None when it is finished. Handlers get a
+    copy of the operation; fields they want to record are returned with the
+    delay and applied by the scheduler under its lock.
+    """
+
+    def __init__(self, directory: str = helpers.OPERATIONS_DIRECTORY, max_workers: int = helpers.OPERATION_SCHEDULER_MAX_WORKERS):
+        self.directory = directory
+        self._handlers: Dict[str, OperationHandler] = {}
+        self._operations: Dict[str, Dict[str, Any]] = {}
+        self._queue: List = []
+        self._sequence = itertools.count()
+        self._running: set = set()
+        self._recent = deque(maxlen=helpers.OPERATION_HISTORY_SIZE)
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="OperationWorker")
+        self._thread: Optional[threading.Thread] = None
+
+    def register_handler(self, kind: str, handler: OperationHandler) -> None:
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        """Load persisted operations and start the timer thread (idempotent)."""
+        with self._condition:
+            if self._thread is not None:
+                return
+            persisted = fs_manager.load_file(self.directory, PENDING_OPERATIONS_FILE)
+            if "ERROR" not in persisted:
+                for operation in persisted.get("operations", []):
+                    if operation["id"] not in self._operations:
+                        self._operations[operation["id"]] = operation
+                        self._push(operation)
+                if self._operations:
+                    logger.info(f"OPERATION_SCHEDULER: Resumed {len(self._operations)} pending operation(s)")
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="OperationScheduler")
+            self._thread.start()
+
+    def submit(self, kind: str, key: str, delay: float = 0, timeout: Optional[float] = None, **data: Any) -> str:
+        """
+        Track an operation. Submitting the same kind/key again replaces the
+        pending entry instead of tracking it twice.
+        """
+        self.start()
+        now = time.time()
+        operation = {
+            "id": f"{kind}:{key}",
+            "kind": kind,
+            "key": key,
+            "status": "pending",
+            "createdAt": now,
+            "nextCheck": now + delay,
+            "deadline": now + timeout if timeout else None,
+            "attempts": 0,
+            "lastError": None,
+            **data
+        }
+        with self._condition:
+            self._operations[operation["id"]] = operation
+            self._push(operation)
+            self._persist()
+            self._condition.notify()
+        logger.info(f"OPERATION_SCHEDULER: Tracking {operation['id']}, first check in {delay}s")
+        return operation["id"]
+
+    def cancel(self, operation_id: str) -> bool:
+        with self._condition:
+            operation = self._operations.pop(operation_id, None)
+            if operation is None:
+                return False
+            self._finish(operation, "cancelled")
+        return True
+
+    def get(self, operation_id: str) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            operation = self._operations.get(operation_id)
+            return dict(operation) if operation else None
+
+    def list_operations(self, kind: Optional[str] = None, key: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Pending operations plus the most recently finished ones, for the status API."""
+        def wanted(operation):
+            return (kind is None or operation["kind"] == kind) and (key is None or operation["key"] == key)
+
+        with self._condition:
+            return {
+                "pending": [dict(op) for op in self._operations.values() if wanted(op)],
+                "recent": [dict(op) for op in self._recent if wanted(op)]
+            }
+
+    def _push(self, operation: Dict[str, Any]) -> None:
+        heapq.heappush(self._queue, (operation["nextCheck"], next(self._sequence), operation["id"]))
+
+    def _persist(self) -> None:
+        # Called with the condition held, so the copies are consistent
+        fs_manager.save_file({"operations": [dict(op) for op in self._operations.values()]}, self.directory, PENDING_OPERATIONS_FILE)
+
+    def _finish(self, operation: Dict[str, Any], status: str) -> None:
+        operation["status"] = status
+        operation["finishedAt"] = time.time()
+        self._recent.append(operation)
+        self._persist()
+
+    def _loop(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    now = time.time()
+                    if self._queue and self._queue[0][0] <= now:
+                        due, _, operation_id = heapq.heappop(self._queue)
+                        operation = self._operations.get(operation_id)
+                        # Skip entries superseded by a resubmit/reschedule, or already being checked
+                        if operation is None or operation["nextCheck"] != due or operation_id in self._running:
+                            continue
+                        self._running.add(operation_id)
+                        break
+                    timeout = self._queue[0][0] - now if self._queue else None
+                    self._condition.wait(timeout)
+            self._executor.submit(self._run, operation)
+
+    def _run(self, operation: Dict[str, Any]) -> None:
+        operation_id = operation["id"]
+        handler = self._handlers.get(operation["kind"])
+        with self._condition:
+            operation["attempts"] += 1
+            snapshot = dict(operation)
+
+        next_delay: Optional[float]
+        updates: Dict[str, Any] = {}
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for {operation['kind']}")
+            result = handler(snapshot)
+            if isinstance(result, tuple):
+                next_delay, updates = result
+            else:
+                next_delay = result
+            updates["lastError"] = None
+        except Exception as e:
+            logger.error(f"OPERATION_SCHEDULER: Check of {operation_id} failed: {e}")
+            updates["lastError"] = str(e)
+            next_delay = helpers.OPERATION_RETRY_DELAY
+
+        with self._condition:
+            self._running.discard(operation_id)
+            if self._operations.get(operation_id) is not operation:
+                # Cancelled or replaced while the handler was running
+                return
+            operation.update(updates)
+            if next_delay is None:
+                del self._operations[operation_id]
+                self._finish(operation, "completed")
+                logger.info(f"OPERATION_SCHEDULER: {operation_id} completed after {operation['attempts']} check(s)")
+            elif operation["deadline"] and time.time() + next_delay > operation["deadline"]:
+                del self._operations[operation_id]
+                self._finish(operation, "timedOut")
+                logger.error(f"OPERATION_SCHEDULER: Gave up on {operation_id} after {operation['attempts']} check(s)")
+            else:
+                operation["nextCheck"] = time.time() + next_delay
+                self._push(operation)
+                self._persist()
+                self._condition.notify()
+
+
+operation_scheduler = OperationScheduler()
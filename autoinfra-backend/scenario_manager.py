@@ -1,164 +1,204 @@
 import json
 import os
 import logging
+import threading
 import fs_manager
 import helpers
+from deployment_store import deployment_store
 logger = logging.getLogger(__name__)
 
+# Parameters resolved from the deployment, its topology, the build parameters and its scenario
+RESOLVED_PARAMETERS = ("enterpriseAdminUsername", "enterpriseAdminPassword", "rootDomainName", "rootDCName", "rootDomainNetBIOSName")
+
+
+class ScenarioParameters:
+    """
+    Resolved parameters of one deployment. The root domain parameters come from
+    the first source that defines them, other parameters from
+    ScenarioManager.parameters.json.
+    """
+
+    def __init__(self, resolved, sources, defaults):
+        self._resolved = resolved
+        self._defaults = defaults
+        self.sources = sources  # Parameter name -> source it was resolved from
+
+    def get(self, param_name):
+        if param_name in self._resolved:
+            return self._resolved[param_name]
+        return self._defaults['parameters'][param_name]['value']
+
+    @property
+    def admin_username(self):
+        return self.get("enterpriseAdminUsername")
+
+    @property
+    def admin_password(self):
+        return self.get("enterpriseAdminPassword")
+
+    @property
+    def root_domain(self):
+        return self.get("rootDomainName")
+
+    @property
+    def root_dc(self):
+        return self.get("rootDCName")
+
+    @property
+    def netbios_name(self):
+        return self.get("rootDomainNetBIOSName")
+
+    @property
+    def admin_upn(self):
+        """Enterprise admin in UPN format (user@root.domain), as needed for cross-domain AD operations"""
+        return f"{self.admin_username}@{self.root_domain}"
+
+
+def _path_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _root_dc_data(topology):
+    """Data of the first root domain controller node of a topology, or None"""
+    for node in topology.get("nodes", []):
+        if node.get("type") == "domainController":
+            data = node.get("data", {})
+            if data.get("isRoot", not data.get("isSub", False)):
+                return data
+    return None
+
+
+def _topology_parameters(topology):
+    """Root domain parameters defined by a topology (credentials first, then the root DC node)"""
+    values = {}
+    creds = topology.get("credentials", {})
+    for param_name in ("enterpriseAdminUsername", "enterpriseAdminPassword"):
+        if param_name in creds:
+            values[param_name] = creds[param_name]
+
+    data = _root_dc_data(topology)
+    if data is not None:
+        values.setdefault("enterpriseAdminUsername", data.get("adminUsername"))
+        values.setdefault("enterpriseAdminPassword", data.get("adminPassword"))
+        values["rootDomainName"] = data.get("domainName")
+        values["rootDCName"] = data.get("domainControllerName")
+    return values
+
+
+def _build_parameters(build_params):
+    """Root domain parameters defined by ScenarioManagerBuild.parameters.json"""
+    parameters = build_params['parameters']
+    values = {}
+    for param_name in ("enterpriseAdminUsername", "enterpriseAdminPassword"):
+        if param_name in parameters:
+            values[param_name] = parameters[param_name]['value']
+
+    controllers = parameters.get('rootDomainControllers', {}).get('value')
+    if controllers:
+        values["rootDomainName"] = controllers[0]['domainName']
+        values["rootDCName"] = controllers[0]['name']
+        values["rootDomainNetBIOSName"] = controllers[0].get('netbios', controllers[0]['domainName'].split('.')[0].upper())
+    return values
+
+
+# deployment ID -> ((deployment, topology), file signatures, ScenarioParameters), shared by every ScenarioManager
+_resolved_cache = {}
+_resolved_cache_lock = threading.Lock()
+
+
 class ScenarioManager:
     def __init__(self):
         self.base_dir = helpers.TEMPLATE_DIRECTORY
 
     def get_parameter(self, param_name, deployment_id=None):
         """Get a parameter by name, potentially from a build deployment"""
-        if deployment_id:
+        return self.get_parameters(deployment_id).get(param_name)
+
+    def get_parameters(self, deployment_id=None):
+        """
+        Resolved parameters of a deployment (of the scenario manager templates
+        when no deployment is given).
+
+        The result is cached per deployment until the deployment file, its
+        topology file, its scenario file or one of the parameter files change.
+        """
+        deployment = deployment_store.get(deployment_id) if deployment_id else {}
+        topology_file = deployment.get("topologyFile") if "topology" not in deployment else None
+        topology = deployment_store.get(topology_file) if topology_file else None
+        scenario_name = deployment.get("scenario")
+
+        # deployment_store hands out the same dict until its file changes, and
+        # the cache entry keeps it alive, so identity is a valid version check
+        documents = (deployment, topology)
+        signatures = (
+            fs_manager.file_signature(helpers.SCENARIO_DIRECTORY, f"{scenario_name}.json") if scenario_name else None,
+            _path_signature(helpers.SCENARIO_MANAGER_BUILD_PARAMS) if "resourceGroup" in deployment else None,
+            _path_signature(helpers.SCENARIO_MANAGER_PARAMS)
+        )
+
+        with _resolved_cache_lock:
+            cached = _resolved_cache.get(deployment_id)
+        if cached and cached[0][0] is documents[0] and cached[0][1] is documents[1] and cached[1] == signatures:
+            return cached[2]
+
+        parameters = self._resolve(deployment_id, deployment, topology)
+        with _resolved_cache_lock:
+            if "ERROR" in deployment:
+                _resolved_cache.pop(deployment_id, None)
+            else:
+                _resolved_cache[deployment_id] = (documents, signatures, parameters)
+        return parameters
+
+    def _resolve(self, deployment_id, deployment, topology_from_file):
+        """
+        Resolve the root domain parameters of a deployment from, in order:
+        its topology (embedded or topology file), the build parameters file
+        (for deployments with a resource group), and its scenario's topology.
+        """
+        sources = []  # (source name, {parameter: value})
+
+        if "topologyFile" in deployment or "topology" in deployment:
+            topology = deployment.get("topology") if "topology" in deployment else topology_from_file
             try:
-                deployment = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, deployment_id)
-                
-                if "topologyFile" in deployment or "topology" in deployment:
-                    try:
-                        # Try to get from topology file or embedded topology
-                        if "topology" in deployment:
-                            topology = deployment.get("topology")
-                        else:
-                            topology_file = deployment.get("topologyFile")
-                            topology = fs_manager.load_file(helpers.DEPLOYMENT_DIRECTORY, topology_file)
-                        
-                        # Extract parameters based on the parameter name
-                        if isinstance(topology, dict) and "nodes" in topology:
-                            if param_name == "enterpriseAdminUsername" or param_name == "enterpriseAdminPassword":
-                                # First check if credentials are at topology level
-                                if "credentials" in topology:
-                                    creds = topology.get("credentials", {})
-                                    if param_name == "enterpriseAdminUsername" and "enterpriseAdminUsername" in creds:
-                                        logger.info(f"Using build parameter {param_name} from topology credentials for {deployment_id}")
-                                        return creds.get("enterpriseAdminUsername")
-                                    elif param_name == "enterpriseAdminPassword" and "enterpriseAdminPassword" in creds:
-                                        logger.info(f"Using build parameter {param_name} from topology credentials for {deployment_id}")
-                                        return creds.get("enterpriseAdminPassword")
-
-                                # Fall back to finding root domain controller
-                                for node in topology["nodes"]:
-                                    if node["type"] == "domainController":
-                                        data = node.get("data", {})
-                                        is_root = data.get("isRoot", not data.get("isSub", False))
-                                        if is_root:
-                                            if param_name == "enterpriseAdminUsername":
-                                                logger.info(f"Using build parameter {param_name} from topology node for {deployment_id}")
-                                                return data.get("adminUsername")
-                                            elif param_name == "enterpriseAdminPassword":
-                                                logger.info(f"Using build parameter {param_name} from topology node for {deployment_id}")
-                                                return data.get("adminPassword")
-                            
-                            elif param_name == "rootDomainName":
-                                # Find root domain controller to get domain name
-                                for node in topology["nodes"]:
-                                    if node["type"] == "domainController":
-                                        data = node.get("data", {})
-                                        is_root = data.get("isRoot", not data.get("isSub", False))
-                                        if is_root:
-                                            logger.info(f"Using build parameter {param_name} from topology for {deployment_id}")
-                                            return data.get("domainName")
-                            
-                            elif param_name == "rootDCName":
-                                # Find root domain controller name
-                                for node in topology["nodes"]:
-                                    if node["type"] == "domainController":
-                                        data = node.get("data", {})
-                                        is_root = data.get("isRoot", not data.get("isSub", False))
-                                        if is_root:
-                                            logger.info(f"Using build parameter {param_name} from topology for {deployment_id}")
-                                            return data.get("domainControllerName")
-                    except Exception as e:
-                        logger.error(f"Error loading topology data for {deployment_id}: {str(e)}")
-                    
-                    try:
-                        if "resourceGroup" in deployment:
-                            _ = deployment.get("resourceGroup")
-                            build_params_path = helpers.SCENARIO_MANAGER_BUILD_PARAMS
-                            if os.path.exists(build_params_path):
-                                with open(build_params_path, 'r') as f:
-                                    build_params = json.load(f)
-                                    
-                                    # Extract parameters based on the parameter name
-                                    if param_name == "enterpriseAdminUsername":
-                                        logger.info(f"Using {param_name} from build parameters file for {deployment_id}")
-                                        return build_params['parameters']['enterpriseAdminUsername']['value']
-                                    elif param_name == "enterpriseAdminPassword":
-                                        logger.info(f"Using {param_name} from build parameters file for {deployment_id}")
-                                        return build_params['parameters']['enterpriseAdminPassword']['value']
-                                    elif param_name == "rootDomainName":
-                                        # In build params, we have to look at rootDomainControllers array
-                                        if 'rootDomainControllers' in build_params['parameters']:
-                                            controllers = build_params['parameters']['rootDomainControllers']['value']
-                                            if controllers and len(controllers) > 0:
-                                                logger.info(f"Using {param_name} from build parameters file for {deployment_id}")
-                                                return controllers[0]['domainName']
-                                    elif param_name == "rootDCName":
-                                        # In build params, we have to look at rootDomainControllers array
-                                        if 'rootDomainControllers' in build_params['parameters']:
-                                            controllers = build_params['parameters']['rootDomainControllers']['value']
-                                            if controllers and len(controllers) > 0:
-                                                logger.info(f"Using {param_name} from build parameters file for {deployment_id}")
-                                                return controllers[0]['name']
-                                    elif param_name == "rootDomainNetBIOSName":
-                                        # In build params, we have to look at rootDomainControllers array
-                                        if 'rootDomainControllers' in build_params['parameters']:
-                                            controllers = build_params['parameters']['rootDomainControllers']['value']
-                                            if controllers and len(controllers) > 0:
-                                                logger.info(f"Using {param_name} from build parameters file for {deployment_id}")
-                                                return controllers[0].get('netbios', controllers[0]['domainName'].split('.')[0].upper())
-                    except Exception as e:
-                        logger.error(f"Error loading build parameters for {deployment_id}: {str(e)}")
-                
-                # This handles deployed Build scenarios where topology is in the scenario file
-                if "scenario" in deployment:
-                    scenario_name = deployment.get("scenario")
-                    try:
-                        scenario_path = os.path.join(helpers.SCENARIO_DIRECTORY, f"{scenario_name}.json")
-                        if os.path.exists(scenario_path):
-                            with open(scenario_path, 'r') as f:
-                                scenario_data = json.load(f)
-                            
-                            if "topology" in scenario_data:
-                                topology = scenario_data.get("topology", {})
-                                
-                                # First check credentials at topology level
-                                if "credentials" in topology:
-                                    creds = topology.get("credentials", {})
-                                    if param_name == "enterpriseAdminUsername" and "enterpriseAdminUsername" in creds:
-                                        logger.info(f"Using {param_name} from scenario {scenario_name} topology credentials")
-                                        return creds.get("enterpriseAdminUsername")
-                                    elif param_name == "enterpriseAdminPassword" and "enterpriseAdminPassword" in creds:
-                                        logger.info(f"Using {param_name} from scenario {scenario_name} topology credentials")
-                                        return creds.get("enterpriseAdminPassword")
-                                
-                                # Extract from nodes if not in credentials
-                                for node in topology.get("nodes", []):
-                                    if node.get("type") == "domainController":
-                                        data = node.get("data", {})
-                                        is_root = data.get("isRoot", not data.get("isSub", False))
-                                        if is_root:
-                                            if param_name == "enterpriseAdminUsername":
-                                                logger.info(f"Using {param_name} from scenario {scenario_name} topology node")
-                                                return data.get("adminUsername")
-                                            elif param_name == "enterpriseAdminPassword":
-                                                logger.info(f"Using {param_name} from scenario {scenario_name} topology node")
-                                                return data.get("adminPassword")
-                                            elif param_name == "rootDomainName":
-                                                logger.info(f"Using {param_name} from scenario {scenario_name} topology node")
-                                                return data.get("domainName")
-                                            elif param_name == "rootDCName":
-                                                logger.info(f"Using {param_name} from scenario {scenario_name} topology node")
-                                                return data.get("domainControllerName")
-                    except Exception as e:
-                        logger.error(f"Error loading scenario {scenario_name} for {deployment_id}: {str(e)}")
-                    
+                if isinstance(topology, dict) and "nodes" in topology:
+                    sources.append(("topology", _topology_parameters(topology)))
             except Exception as e:
-                logger.error(f"Error getting build parameter {param_name} for {deployment_id}: {str(e)}")
-        
-        params = fs_manager.load_file(helpers.TEMPLATE_DIRECTORY, "ScenarioManager.parameters.json")
-        return params['parameters'][param_name]['value']
+                logger.error(f"Error loading topology data for {deployment_id}: {str(e)}")
+
+            try:
+                if "resourceGroup" in deployment and os.path.exists(helpers.SCENARIO_MANAGER_BUILD_PARAMS):
+                    with open(helpers.SCENARIO_MANAGER_BUILD_PARAMS, 'r') as f:
+                        sources.append(("build parameters file", _build_parameters(json.load(f))))
+            except Exception as e:
+                logger.error(f"Error loading build parameters for {deployment_id}: {str(e)}")
+
+        # This handles deployed Build scenarios where topology is in the scenario file
+        if "scenario" in deployment:
+            scenario_name = deployment.get("scenario")
+            try:
+                scenario_data = fs_manager.load_file(helpers.SCENARIO_DIRECTORY, f"{scenario_name}.json")
+                if "ERROR" not in scenario_data and "topology" in scenario_data:
+                    sources.append((f"scenario {scenario_name}", _topology_parameters(scenario_data.get("topology", {}))))
+            except Exception as e:
+                logger.error(f"Error loading scenario {scenario_name} for {deployment_id}: {str(e)}")
+
+        resolved = {}
+        resolved_from = {}
+        for source_name, values in sources:
+            for param_name in RESOLVED_PARAMETERS:
+                if param_name in values and param_name not in resolved:
+                    resolved[param_name] = values[param_name]
+                    resolved_from[param_name] = source_name
+
+        defaults = fs_manager.load_file(helpers.TEMPLATE_DIRECTORY, "ScenarioManager.parameters.json")
+        if deployment_id:
+            described = ", ".join(f"{name} from {source}" for name, source in resolved_from.items()) or "all from defaults"
+            logger.info(f"Resolved parameters for {deployment_id}: {described}")
+        return ScenarioParameters(resolved, resolved_from, defaults)
 
     def list_parameters(self):
         params = fs_manager.load_file(helpers.TEMPLATE_DIRECTORY, "ScenarioManager.parameters.json")
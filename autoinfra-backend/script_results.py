@@ -0,0 +1,96 @@
+"""
+Result protocol for RunCommand scripts.
+
+Scripts run on the VMs (ExecuteModule.ps1, ADVulnEnvModule.psm1 and the
+inline scripts built by the APIs) report machine-readable results as framed
+JSON lines on stdout, next to whatever human-readable output they print:
+
+    AUTOINFRA_RESULT {"kind": "user", "username": "User1", "status": "created"}
+
+Every frame is one line holding the RESULT_PREFIX and a compact JSON object
+with a "kind". A grouped frame carries many records of the same kind in one
+line, listing only the value of its "key" field per record:
+
+    AUTOINFRA_RESULT {"kind": "user", "status": "created", "key": "username", "items": ["User1", "User2"]}
+
+is decoded as the same two records as two single frames. Grouped frames keep
+per-user results small, since Azure only returns the last 4 KB of a RunCommand
+script's output. Write-Results splits its items over several frames of at
+most RESULT_FRAME_BYTES each, so no single frame can outgrow that tail; scripts
+that report many results still have to keep their total output under 4 KB
+(see user_creation and user_sync).
+
+iter_results() decodes an output lazily, line by line, and results_by()
+indexes the records of one kind by a field, so callers match their own list
+of users against a script's results with dict lookups instead of scanning the
+output once per user. Lines that are not frames, and frames cut off by output
+truncation, are skipped.
+
+Write-Result/Write-Results are defined once, in ADVulnEnvModule.psm1;
+powershell_functions() returns those definitions for inline scripts, which
+run without the module.
+"""
+
+from typing import Any, Dict, Iterator, Optional
+import io
+import json
+import logging
+import re
+from asset_registry import asset_registry
+import helpers
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+RESULT_PREFIX = "AUTOINFRA_RESULT "
+
+# Upper bound of a Write-Results frame (its -maxBytes default in ADVulnEnvModule.psm1)
+RESULT_FRAME_BYTES = 2800
+
+# Write-Result and Write-Results in ADVulnEnvModule.psm1, each ending at a line holding only "}"
+_RESULT_FUNCTION = re.compile(r'^Function Write-Results? \{.*?^\}', re.IGNORECASE | re.DOTALL | re.MULTILINE)
+
+
+def _extract_functions(module) -> str:
+    functions = _RESULT_FUNCTION.findall(module.text)
+    if len(functions) != 2:
+        raise ValueError(f"{module.path} does not define Write-Result and Write-Results")
+    return "\n" + "\n\n".join(functions) + "\n"
+
+
+def powershell_functions() -> str:
+    """Write-Result/Write-Results definitions from ADVulnEnvModule.psm1, to prepend to inline scripts"""
+    return asset_registry.derive("result_functions", (helpers.ADVULN_MODULE_SCRIPT,), _extract_functions)
+
+
+def iter_results(output: Optional[str], kind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Records framed in a script's output, in output order, optionally only
+    those of one kind. Grouped frames are expanded into one record per item.
+    """
+    for line in io.StringIO(output or ""):
+        start = line.find(RESULT_PREFIX)
+        if start < 0:
+            continue
+        try:
+            frame = json.loads(line[start + len(RESULT_PREFIX):])
+        except ValueError:
+            logger.debug(f"SCRIPT_RESULTS: Skipping malformed frame: {line[:200].strip()}")
+            continue
+        if not isinstance(frame, dict) or (kind is not None and frame.get("kind") != kind):
+            continue
+
+        items = frame.pop("items", None)
+        if items is None:
+            yield frame
+            continue
+        key = frame.pop("key", "value")
+        # ConvertTo-Json unwraps single-element arrays on some PowerShell versions
+        for item in (items if isinstance(items, list) else [items]):
+            record = dict(frame)
+            record[key] = item
+            yield record
+
+
+def results_by(output: Optional[str], kind: str, key: str = "username") -> Dict[Any, Dict[str, Any]]:
+    """Records of one kind indexed by a field (later records win)"""
+    return {record.get(key): record for record in iter_results(output, kind)}
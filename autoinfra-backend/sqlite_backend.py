@@ -0,0 +1,216 @@
+"""
+SQLite storage backend for deployment, saved-deployment, scenario and
+BloodHound session metadata.
+
+Each JSON entity becomes one row keyed by (directory, name). The fields that
+listing and expiry scans filter on (timeout, scenario, resourceGroup, status)
+are copied into indexed columns, the large nested blobs (topology, users) are
+kept in their own JSON columns, and the rest of the document lives in `data`.
+Enabled with "storageBackend": "sqlite" in config.json.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import logging
+import fs_manager
+
+logger = logging.getLogger("backend-logs")
+
+BLOB_COLUMNS = ("topology", "users")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    timeout INTEGER,
+    scenario TEXT,
+    resource_group TEXT,
+    status TEXT,
+    data TEXT NOT NULL,
+    topology TEXT,
+    users TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (directory, name)
+);
+CREATE INDEX IF NOT EXISTS idx_records_timeout ON records (directory, kind, timeout);
+CREATE INDEX IF NOT EXISTS idx_records_scenario ON records (directory, scenario);
+CREATE INDEX IF NOT EXISTS idx_records_resource_group ON records (directory, resource_group);
+CREATE INDEX IF NOT EXISTS idx_records_status ON records (directory, status);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class SqliteBackend:
+    def __init__(self, db_path: str, directories: List[str]):
+        self.db_path = db_path
+        self.directories = {os.path.normpath(d) for d in directories}
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, fileTypeDirectory: str) -> str:
+        return os.path.normpath(fileTypeDirectory)
+
+    def handles(self, fileTypeDirectory: str) -> bool:
+        return self._key(fileTypeDirectory) in self.directories
+
+    def _row_to_data(self, row) -> Dict[str, Any]:
+        data = json.loads(row[0])
+        for column, raw in zip(BLOB_COLUMNS, row[1:]):
+            if raw is not None:
+                data[column] = json.loads(raw)
+        return data
+
+    def load(self, fileTypeDirectory: str, fileName: str) -> Dict[str, Any]:
+        row = self._connection().execute(
+            "SELECT data, topology, users FROM records WHERE directory = ? AND name = ?",
+            (self._key(fileTypeDirectory), fileName)
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(fileName)
+        return self._row_to_data(row)
+
+    def save(self, saveData, fileTypeDirectory: str, fileName: str) -> None:
+        document = dict(saveData) if isinstance(saveData, dict) else {"value": saveData}
+        blobs = [document.pop(column, None) for column in BLOB_COLUMNS]
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO records (directory, name, kind, timeout, scenario, resource_group, status, data, topology, users)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (directory, name) DO UPDATE SET
+                    kind = excluded.kind, timeout = excluded.timeout, scenario = excluded.scenario,
+                    resource_group = excluded.resource_group, status = excluded.status, data = excluded.data,
+                    topology = excluded.topology, users = excluded.users, version = records.version + 1
+                """,
+                (
+                    self._key(fileTypeDirectory), fileName, fs_manager.record_kind(fileName),
+                    _to_int(document.get("timeout")),
+                    document.get("scenario"),
+                    document.get("resourceGroup", document.get("deploymentID")),
+                    document.get("status"),
+                    json.dumps(document),
+                    *[json.dumps(blob) if blob is not None else None for blob in blobs]
+                )
+            )
+
+    def delete(self, fileTypeDirectory: str, fileName: str) -> None:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM records WHERE directory = ? AND name = ?",
+                (self._key(fileTypeDirectory), fileName)
+            )
+        if cursor.rowcount == 0:
+            raise FileNotFoundError(fileName)
+
+    def exists(self, fileTypeDirectory: str, fileName: str) -> bool:
+        return self.signature(fileTypeDirectory, fileName) is not None
+
+    def signature(self, fileTypeDirectory: str, fileName: str) -> Optional[Tuple]:
+        row = self._connection().execute(
+            "SELECT version FROM records WHERE directory = ? AND name = ?",
+            (self._key(fileTypeDirectory), fileName)
+        ).fetchone()
+        return (row[0],) if row else None
+
+    def list_names(self, fileTypeDirectory: str) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT name FROM records WHERE directory = ? ORDER BY rowid",
+            (self._key(fileTypeDirectory),)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def query(self, fileTypeDirectory: str, kind=None, scenario=None, resourceGroup=None, status=None, timeoutBefore=None, namePrefix=None) -> List[Tuple[str, Dict[str, Any]]]:
+        clauses = ["directory = ?"]
+        params: List[Any] = [self._key(fileTypeDirectory)]
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if scenario is not None:
+            clauses.append("scenario = ?")
+            params.append(scenario)
+        if resourceGroup is not None:
+            clauses.append("resource_group = ?")
+            params.append(resourceGroup)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if timeoutBefore is not None:
+            clauses.append("timeout IS NOT NULL AND timeout != 0 AND timeout < ?")
+            params.append(int(timeoutBefore))
+        if namePrefix is not None:
+            clauses.append("substr(name, 1, ?) = ?")
+            params.extend([len(namePrefix), namePrefix])
+
+        rows = self._connection().execute(
+            f"SELECT name, data, topology, users FROM records WHERE {' AND '.join(clauses)} ORDER BY rowid",
+            params
+        ).fetchall()
+        return [(row[0], self._row_to_data(row[1:])) for row in rows]
+
+    def sync(self, fileTypeDirectory: str, fileNames) -> None:
+        # Commits are already durable enough under WAL with synchronous=NORMAL
+        pass
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+
+def migrate_files_to_sqlite(backend: SqliteBackend, directories: List[str]) -> int:
+    """
+    One-shot import of the existing JSON files into the database. Runs only the
+    first time the SQLite backend is enabled; the files are left in place as a backup.
+    Returns the number of records imported.
+    """
+    if backend.get_meta("filesMigrated") == "true":
+        return 0
+
+    fileBackend = fs_manager.FileBackend()
+    imported = 0
+    for directory in directories:
+        for name in fileBackend.list_names(directory):
+            try:
+                data = fileBackend.load(directory, name)
+            except Exception as e:
+                logger.warning(f"MIGRATE_FILES_TO_SQLITE: Skipping {directory}/{name}: {e}")
+                continue
+            backend.save(data, directory, name)
+            imported += 1
+
+    backend.set_meta("filesMigrated", "true")
+    logger.info(f"MIGRATE_FILES_TO_SQLITE: Imported {imported} record(s) from {', '.join(directories)}")
+    return imported
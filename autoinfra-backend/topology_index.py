@@ -0,0 +1,155 @@
+"""
+Lookup tables over a topology ({"nodes": [...], "edges": [...]}) as saved by
+the frontend and the BloodHound mapper.
+
+A TopologyIndex is built in one pass over the nodes and one over the edges,
+after which the lookups the APIs need are dict reads:
+- node by id, parent (edge source of a node) and children, neighbours
+- domain -> DC name, and match_domain() for partial domain names
+- the domain and machine lists returned by getDeploymentDomains/getDeploymentMachines
+
+Indexes of saved deployments are cached by deployment_store.get_topology_index()
+and rebuilt only when the deployment file changes. The index and the lists it
+returns are shared and must be treated as read-only.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# Machine node types -> (name field, machine type shown to the user)
+MACHINE_NODE_TYPES = {
+    "domainController": ("domainControllerName", "DC"),
+    "workstation": ("workstationName", "Workstation"),
+    "standalone": ("standaloneName", "Standalone"),
+    "certificateAuthority": ("caName", "CA"),
+}
+
+
+def is_root_dc_data(data: Dict[str, Any]) -> bool:
+    """Root flag of a domain controller node's data (isRoot, else not isSub)"""
+    return data.get("isRoot", not data.get("isSub", False))
+
+
+class TopologyIndex:
+    def __init__(self, topology: Dict[str, Any]):
+        self.nodes: List[Dict[str, Any]] = topology.get("nodes", []) or []
+        self.edges: List[Dict[str, Any]] = topology.get("edges", []) or []
+
+        self.nodes_by_id: Dict[Any, Dict[str, Any]] = {}
+        self.nodes_by_type: Dict[str, List[Dict[str, Any]]] = {}
+        self.domain_to_dc: Dict[str, str] = {}  # Lower-case domain -> DC name (last DC node wins)
+        self.domains: List[Dict[str, Any]] = []  # First DC of each domain, root domain first
+        self.machines: List[Dict[str, Any]] = []  # DCs first, root DC first, then by name
+        self.machines_by_type: Dict[str, List[Dict[str, Any]]] = {}
+        self.root_dc: Optional[Dict[str, Any]] = None  # First root DC node
+
+        seen_domains = set()
+        for node in self.nodes:
+            node_type = node.get("type")
+            data = node.get("data", {})
+            if "id" in node:
+                self.nodes_by_id[node["id"]] = node
+            self.nodes_by_type.setdefault(node_type, []).append(node)
+
+            if node_type == "domainController":
+                domain_name = data.get("domainName")
+                dc_name = data.get("domainControllerName", data.get("name", ""))
+                is_root = is_root_dc_data(data)
+                if is_root and self.root_dc is None:
+                    self.root_dc = node
+                if domain_name and dc_name:
+                    self.domain_to_dc[domain_name.lower()] = dc_name
+                if domain_name and data.get("domainControllerName") and domain_name not in seen_domains:
+                    seen_domains.add(domain_name)
+                    self.domains.append({"domainName": domain_name, "dcName": data.get("domainControllerName"), "isRoot": is_root})
+
+            machine = self._machine(node_type, data)
+            if machine:
+                self.machines.append(machine)
+
+        self.domains.sort(key=lambda x: (not x.get("isRoot", False), x.get("domainName", "")))
+        self.machines.sort(key=lambda x: (
+            x.get("machineType") != "DC",  # DCs first
+            not x.get("isRoot", False),    # Root DC first among DCs
+            x.get("machineName", "")       # Then alphabetically
+        ))
+        for machine in self.machines:
+            self.machines_by_type.setdefault(machine["machineType"], []).append(machine)
+
+        # Edges point from parent to child; a node with several incoming edges keeps the last
+        self.parent_of: Dict[Any, Any] = {}
+        self.children: Dict[Any, List[Any]] = {}
+        self.neighbours: Dict[Any, List[Any]] = {}
+        for edge in self.edges:
+            source, target = edge.get("source"), edge.get("target")
+            self.parent_of[target] = source
+            self.children.setdefault(source, []).append(target)
+            self.neighbours.setdefault(source, []).append(target)
+            self.neighbours.setdefault(target, []).append(source)
+
+        # Partial names for match_domain(): every dot-aligned suffix and the first label
+        # of each domain, mapped to the shortest (closest to the forest root) domain
+        self._partial_domains: Dict[str, str] = {}
+        for domain in sorted(self.domain_to_dc, key=lambda d: (d.count('.'), d)):
+            labels = domain.split('.')
+            for partial in ['.'.join(labels[i:]) for i in range(1, len(labels))] + [labels[0]]:
+                self._partial_domains.setdefault(partial, domain)
+
+    @staticmethod
+    def _machine(node_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """getDeploymentMachines entry of a node, or None for non-machine nodes"""
+        if node_type not in MACHINE_NODE_TYPES:
+            return None
+        name_field, machine_type = MACHINE_NODE_TYPES[node_type]
+        machine_name = data.get(name_field)
+        if not machine_name:
+            return None
+
+        domain_name = data.get("domainName") if node_type != "standalone" else None
+        is_root = node_type == "domainController" and is_root_dc_data(data)
+        display_name = f"{machine_name} ({machine_type} - {domain_name})" if node_type != "standalone" else f"{machine_name} (Standalone)"
+        return {
+            "machineName": machine_name,
+            "machineType": machine_type,
+            "domainName": domain_name,
+            "isRoot": is_root,
+            "displayName": display_name
+        }
+
+    def node(self, node_id: Any) -> Optional[Dict[str, Any]]:
+        return self.nodes_by_id.get(node_id)
+
+    def parent(self, node_id: Any) -> Optional[Dict[str, Any]]:
+        """Node at the source end of the (last) edge into node_id"""
+        return self.nodes_by_id.get(self.parent_of.get(node_id))
+
+    def connected(self, node_id: Any) -> List[Dict[str, Any]]:
+        """Nodes sharing an edge with node_id, in edge order"""
+        return [self.nodes_by_id[other] for other in self.neighbours.get(node_id, []) if other in self.nodes_by_id]
+
+    def dc_for_domain(self, domain_name: str) -> Optional[str]:
+        return self.domain_to_dc.get((domain_name or "").lower())
+
+    def match_domain(self, domain_name: str) -> Optional[Tuple[str, str]]:
+        """
+        (domain, DC name) of the topology domain a possibly partial or more
+        specific domain name refers to, or None. Tries, in order:
+        - the exact domain
+        - its nearest parent domain (host.sub.build.lab -> sub.build.lab)
+        - a domain it is a dot-aligned suffix or the first label of (build.lab, lab, sub -> sub.build.lab)
+        """
+        name = (domain_name or "").lower().strip('.')
+        if not name:
+            return None
+        if name in self.domain_to_dc:
+            return name, self.domain_to_dc[name]
+
+        labels = name.split('.')
+        for i in range(1, len(labels)):
+            ancestor = '.'.join(labels[i:])
+            if ancestor in self.domain_to_dc:
+                return ancestor, self.domain_to_dc[ancestor]
+
+        domain = self._partial_domains.get(name)
+        if domain:
+            return domain, self.domain_to_dc[domain]
+        return None
@@ -0,0 +1,247 @@
+"""
+Batch AD user creation engine used by /bloodhound/configure-users.
+
+Users are grouped by domain, and every domain's users are split into chunks
+bounded by count (USER_CREATION_CHUNK_SIZE), by generated script size
+(USER_CREATION_MAX_SCRIPT_BYTES) and by the size of the usernames
+(USER_CREATION_RESULT_BYTES), so neither a RunCommand script nor its output
+grows with the size of the import. Each chunk is one RunPowerShellScript invocation on the
+domain's DC:
+- chunks for different DCs run concurrently
+- chunks for the same DC run one after another, since a VM only runs one
+  RunCommand invocation at a time
+
+Inside the script, users are created concurrently in a runspace pool
+(Windows PowerShell 5.1 on the DCs has no Start-ThreadJob without installing
+the ThreadJob module). The script reports per-user results through the
+script_results protocol: "user" records with a status of created, exists or
+failed (with an error). Azure only returns the last 4 KB of a script's output,
+so every result is grouped: created and existing users into one frame each,
+failed users by error message, with at most _MAX_ERROR_GROUPS messages of
+_ERROR_CHARS characters (further failures share a generic error). With the
+usernames bounded per chunk, the whole output stays within that 4 KB.
+"""
+
+from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from azure_gateway import azure_gateway
+from script_results import powershell_functions, results_by
+import helpers
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+_MAX_ERROR_GROUPS = 4
+_ERROR_CHARS = 100
+
+_SCRIPT_TEMPLATE = '''
+$ErrorActionPreference = "Continue"
+$logFilePath = "C:\\Temp\\logfile.txt"
+
+$adminUpn = '{admin_upn}'
+$adminPassword = '{admin_password}'
+$domainName = '{domain}'
+
+$usersToCreate = @(
+    {users}
+)
+
+Add-Content -Path $logFilePath -Value "BatchUserCreation: Starting creation of $($usersToCreate.Count) users on $domainName"
+
+$createUser = {{
+    param($username, $userPassword, $domainName, $adminUpn, $adminPassword)
+    $creds = New-Object System.Management.Automation.PSCredential($adminUpn, (ConvertTo-SecureString $adminPassword -AsPlainText -Force))
+    try {{
+        $existingUser = Get-ADUser -Filter "SamAccountName -eq '$username'" -Credential $creds -ErrorAction SilentlyContinue
+        if ($existingUser) {{
+            return [PSCustomObject]@{{ username = $username; status = "exists"; error = $null }}
+        }}
+        New-ADUser -Name $username `
+                   -SamAccountName $username `
+                   -Surname $username `
+                   -Enabled $true `
+                   -AccountPassword (ConvertTo-SecureString $userPassword -AsPlainText -Force) `
+                   -UserPrincipalName "$username@$domainName" `
+                   -Description 'BloodHound Import User' `
+                   -Credential $creds `
+                   -ErrorAction Stop
+        return [PSCustomObject]@{{ username = $username; status = "created"; error = $null }}
+    }}
+    catch {{
+        return [PSCustomObject]@{{ username = $username; status = "failed"; error = "$_" }}
+    }}
+}}
+
+# ActiveDirectory is loaded once into the pool's session state rather than per user
+$sessionState = [System.Management.Automation.Runspaces.InitialSessionState]::CreateDefault()
+$sessionState.ImportPSModule(@('ActiveDirectory'))
+$pool = [RunspaceFactory]::CreateRunspacePool(1, {threads}, $sessionState, $Host)
+$pool.Open()
+$jobs = foreach ($userInfo in $usersToCreate) {{
+    $ps = [PowerShell]::Create()
+    $ps.RunspacePool = $pool
+    [void]$ps.AddScript($createUser).AddArgument($userInfo.Username).AddArgument($userInfo.Password).AddArgument($domainName).AddArgument($adminUpn).AddArgument($adminPassword)
+    [PSCustomObject]@{{ Username = $userInfo.Username; PowerShell = $ps; Handle = $ps.BeginInvoke() }}
+}}
+
+$results = foreach ($job in $jobs) {{
+    try {{
+        $output = $job.PowerShell.EndInvoke($job.Handle)
+        if ($output.Count -gt 0) {{ $output[-1] }}
+        else {{ [PSCustomObject]@{{ username = $job.Username; status = "failed"; error = "No result" }} }}
+    }}
+    catch {{
+        [PSCustomObject]@{{ username = $job.Username; status = "failed"; error = "$_" }}
+    }}
+    finally {{
+        $job.PowerShell.Dispose()
+    }}
+}}
+$pool.Close()
+
+foreach ($result in $results) {{
+    Add-Content -Path $logFilePath -Value "BatchUserCreation: $($result.username) $($result.status) $($result.error)"
+}}
+foreach ($status in @('created', 'exists')) {{
+    Write-Results -kind 'user' -key 'username' -items @($results | Where-Object {{ $_.status -eq $status }} | ForEach-Object {{ $_.username }}) -fields @{{ status = $status }}
+}}
+
+# Failures grouped by error, most common first, so their output stays bounded however many users fail
+$errorGroups = @($results | Where-Object {{ $_.status -eq "failed" }} | Group-Object -Property {{ "$($_.error)" }} | Sort-Object -Property Count -Descending)
+for ($i = 0; $i -lt [Math]::Min($errorGroups.Count, {max_error_groups}); $i++) {{
+    $message = $errorGroups[$i].Name
+    Write-Results -kind 'user' -key 'username' -items @($errorGroups[$i].Group | ForEach-Object {{ $_.username }}) -fields @{{ status = 'failed'; error = $message.Substring(0, [Math]::Min({error_chars}, $message.Length)) }}
+}}
+if ($errorGroups.Count -gt {max_error_groups}) {{
+    $otherUsers = @($errorGroups | Select-Object -Skip {max_error_groups} | ForEach-Object {{ $_.Group }} | ForEach-Object {{ $_.username }})
+    Write-Results -kind 'user' -key 'username' -items $otherUsers -fields @{{ status = 'failed'; error = 'Failed, see C:\\Temp\\logfile.txt on the DC' }}
+}}
+'''
+
+
+def _ps_quote(value: str) -> str:
+    """Escape a value for a single-quoted PowerShell string"""
+    return value.replace("'", "''")
+
+
+def _user_entry(user: Dict[str, str]) -> str:
+    return f"@{{Username='{_ps_quote(user['username'])}'; Password='{_ps_quote(user.get('password', 'Password#123'))}'}}"
+
+
+def build_user_creation_script(users: List[Dict[str, str]], admin_upn: str, admin_password: str, domain_name: str, threads: int = helpers.USER_CREATION_RUNSPACES) -> str:
+    """
+    PowerShell script that creates users (dicts with 'username' and 'password')
+    in domain_name through a runspace pool, reporting a "user" result per user.
+    """
+    return powershell_functions() + _SCRIPT_TEMPLATE.format(
+        admin_upn=_ps_quote(admin_upn),
+        admin_password=_ps_quote(admin_password),
+        domain=_ps_quote(domain_name),
+        users=",\n    ".join(_user_entry(user) for user in users),
+        threads=max(1, threads),
+        max_error_groups=_MAX_ERROR_GROUPS,
+        error_chars=_ERROR_CHARS
+    )
+
+
+class UserCreationEngine:
+    def __init__(self, max_workers: int = helpers.USER_CREATION_MAX_WORKERS,
+                 chunk_size: int = helpers.USER_CREATION_CHUNK_SIZE,
+                 max_script_bytes: int = helpers.USER_CREATION_MAX_SCRIPT_BYTES,
+                 max_result_bytes: int = helpers.USER_CREATION_RESULT_BYTES):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.max_script_bytes = max_script_bytes
+        self.max_result_bytes = max_result_bytes
+
+    def chunk(self, users: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        """
+        Split users into chunks of at most chunk_size users, about max_script_bytes
+        of script and max_result_bytes of usernames in the results
+        """
+        base_size = len(powershell_functions()) + len(_SCRIPT_TEMPLATE) + 512  # Template plus credentials and domain
+        chunks = []
+        current: List[Dict[str, str]] = []
+        size = base_size
+        result_size = 0
+        for user in users:
+            entry_size = len(_user_entry(user).encode('utf-8')) + 6
+            result_entry_size = len(user['username'].encode('utf-8')) + 3  # Quoted and comma-separated in a frame
+            if current and (len(current) >= self.chunk_size or size + entry_size > self.max_script_bytes
+                            or result_size + result_entry_size > self.max_result_bytes):
+                chunks.append(current)
+                current, size, result_size = [], base_size, 0
+            current.append(user)
+            size += entry_size
+            result_size += result_entry_size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def execute(self, resource_group: str, users_by_domain: Dict[str, Dict[str, Any]], admin_upn: str, admin_password: str) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+        """
+        Create users on every domain. users_by_domain maps a domain name to
+        {"dc": VM name, "users": [{"username", "password"}, ...]}.
+
+        Returns (created, failed): [{"username", "domain"}] and
+        [{"username", "domain", "error"}]. Users that already exist count as created.
+        """
+        by_dc: Dict[str, List[Tuple[str, List[Dict[str, str]]]]] = {}
+        for domain_name, domain_info in users_by_domain.items():
+            for users in self.chunk(domain_info["users"]):
+                by_dc.setdefault(domain_info["dc"], []).append((domain_name, users))
+
+        chunk_count = sum(len(chunks) for chunks in by_dc.values())
+        logger.info(f"USER_CREATION: Creating {sum(len(info['users']) for info in users_by_domain.values())} user(s) "
+                    f"as {chunk_count} chunk(s) on {len(by_dc)} DC(s) in {resource_group}")
+
+        created: List[Dict[str, str]] = []
+        failed: List[Dict[str, str]] = []
+        if not by_dc:
+            return created, failed
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._run_dc, resource_group, dc_name, chunks, admin_upn, admin_password)
+                for dc_name, chunks in by_dc.items()
+            ]
+            for future in futures:
+                dc_created, dc_failed = future.result()
+                created.extend(dc_created)
+                failed.extend(dc_failed)
+
+        logger.info(f"USER_CREATION: {len(created)} user(s) created, {len(failed)} failed in {resource_group}")
+        return created, failed
+
+    def _run_dc(self, resource_group: str, dc_name: str, chunks: List[Tuple[str, List[Dict[str, str]]]], admin_upn: str, admin_password: str):
+        """Run the chunks of one DC one after another."""
+        created = []
+        failed = []
+        for index, (domain_name, users) in enumerate(chunks):
+            script = build_user_creation_script(users, admin_upn, admin_password, domain_name)
+            try:
+                output = azure_gateway.run_powershell(resource_group, dc_name, script)
+                results = results_by(output["stdout"], "user")
+            except Exception as e:
+                logger.error(f"USER_CREATION: Chunk {index + 1}/{len(chunks)} on {dc_name} ({domain_name}) failed: {e}")
+                failed.extend({"username": user["username"], "domain": domain_name, "error": str(e)} for user in users)
+                continue
+
+            if not results:
+                error = (output["stderr"] or output["stdout"] or "No results returned")[:200]
+                logger.error(f"USER_CREATION: Chunk {index + 1}/{len(chunks)} on {dc_name} ({domain_name}) returned no results: {error}")
+
+            for user in users:
+                result = results.get(user["username"])
+                if result is None:
+                    failed.append({"username": user["username"], "domain": domain_name, "error": "No result returned"})
+                elif result.get("status") in ("created", "exists"):
+                    created.append({"username": user["username"], "domain": domain_name})
+                else:
+                    failed.append({"username": user["username"], "domain": domain_name, "error": (result.get("error") or "Unknown error")[:200]})
+
+            logger.info(f"USER_CREATION: Chunk {index + 1}/{len(chunks)} on {dc_name} ({domain_name}): {len(results)} result(s) for {len(users)} user(s)")
+        return created, failed
+
+
+user_creation_engine = UserCreationEngine()
@@ -0,0 +1,183 @@
+"""
+AD user sync engine used by /syncUsers.
+
+Every DC of a deployment is queried concurrently, one task per DC. A DC is
+either synced in full (every user of its domain) or as a delta: only users
+whose whenChanged is after the high-water mark of that DC's last sync,
+including users deleted since then. whenChanged is not replicated, so high-water
+marks are kept per DC, taken from the DC's own clock before its query runs,
+and every query goes to the DC itself.
+
+Azure only returns the last 4 KB of a RunCommand script's output, so users
+are returned in pages of about USER_SYNC_PAGE_BYTES of usernames: every page
+re-runs the query and reports the users from a given offset through the
+script_results protocol:
+- "user" records for existing users and "deleted_user" records for deleted ones
+- a "sync_page" record with the total count, the offset of the next page and
+  the high-water mark
+- an "error" record when the query failed
+
+A delta sync of a few changed users is a single page per DC.
+"""
+
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from azure_gateway import azure_gateway
+from script_results import iter_results, powershell_functions
+import helpers
+
+logger = logging.getLogger(helpers.LOGGER_NAME)
+
+_SCRIPT_TEMPLATE = '''
+$ErrorActionPreference = "Stop"
+
+$password = ConvertTo-SecureString '{admin_password}' -AsPlainText -Force
+$credential = New-Object System.Management.Automation.PSCredential('{admin_upn}', $password)
+$since = '{since}'
+$skip = {skip}
+$pageBytes = {page_bytes}
+$builtinAccounts = @('Administrator', 'Guest', 'krbtgt', 'DefaultAccount', 'WDAGUtilityAccount')
+
+try {{
+    # Taken before the query, so changes made while it runs are picked up by the next delta
+    $highWaterMark = (Get-Date).ToUniversalTime().ToString('o')
+
+    if ($since) {{
+        $sinceTime = [DateTime]::Parse($since, $null, [System.Globalization.DateTimeStyles]::RoundtripKind)
+        $users = Get-ADUser -Filter 'whenChanged -gt $sinceTime' -IncludeDeletedObjects -Properties isDeleted -Credential $credential -Server $env:COMPUTERNAME
+    }} else {{
+        $users = Get-ADUser -Filter * -Credential $credential -Server $env:COMPUTERNAME
+    }}
+
+    $users = @($users | Where-Object {{
+        $_.SamAccountName -and
+        $_.SamAccountName -notin $builtinAccounts -and
+        $_.SamAccountName -notlike 'HealthMailbox*' -and
+        $_.SamAccountName -notlike 'SystemMailbox*'
+    }} | Sort-Object SamAccountName)
+
+    $existing = New-Object System.Collections.Generic.List[string]
+    $deleted = New-Object System.Collections.Generic.List[string]
+    $bytes = 0
+    $next = $skip
+    while ($next -lt $users.Count -and $bytes -lt $pageBytes) {{
+        $user = $users[$next]
+        if ($user.isDeleted) {{ $deleted.Add($user.SamAccountName) }} else {{ $existing.Add($user.SamAccountName) }}
+        $bytes += $user.SamAccountName.Length + 3
+        $next++
+    }}
+
+    Write-Results -kind 'user' -key 'username' -items $existing.ToArray()
+    Write-Results -kind 'deleted_user' -key 'username' -items $deleted.ToArray()
+    Write-Result -kind 'sync_page' -fields @{{ total = $users.Count; next = $next; highWaterMark = $highWaterMark }}
+}} catch {{
+    Write-Result -kind 'error' -fields @{{ error = "$_" }}
+}}
+'''
+
+
+def _ps_quote(value: str) -> str:
+    """Escape a value for a single-quoted PowerShell string"""
+    return value.replace("'", "''")
+
+
+def build_user_sync_script(admin_upn: str, admin_password: str, since: Optional[str], skip: int, page_bytes: int = helpers.USER_SYNC_PAGE_BYTES) -> str:
+    """
+    PowerShell script returning one page of the users of the DC it runs on,
+    all of them when since is None, else those changed after since (ISO 8601).
+    """
+    return powershell_functions() + _SCRIPT_TEMPLATE.format(
+        admin_upn=_ps_quote(admin_upn),
+        admin_password=_ps_quote(admin_password),
+        since=_ps_quote(since or ""),
+        skip=int(skip),
+        page_bytes=int(page_bytes)
+    )
+
+
+class UserSyncEngine:
+    def __init__(self, max_workers: int = helpers.USER_SYNC_MAX_WORKERS,
+                 page_bytes: int = helpers.USER_SYNC_PAGE_BYTES):
+        self.max_workers = max_workers
+        self.page_bytes = page_bytes
+
+    def execute(self, resource_group: str, domain_controllers: List[Dict[str, Any]], admin_upn: str, admin_password: str) -> List[Dict[str, Any]]:
+        """
+        Query every DC. domain_controllers holds {"dc", "domain", "since"} per DC,
+        since being the DC's last high-water mark for a delta sync, or None
+        for a full sync.
+
+        Returns one result per DC, in the same order:
+        {"dc", "domain", "mode": "full|delta", "users": [...], "deleted": [...],
+        "highWaterMark", "error"}. Failed DCs have an error and no users.
+        """
+        if not domain_controllers:
+            return []
+
+        logger.info(f"USER_SYNC: Syncing {len(domain_controllers)} DC(s) in {resource_group} "
+                    f"({sum(1 for dc in domain_controllers if dc.get('since'))} as delta)")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._run_dc, resource_group, dc_info, admin_upn, admin_password)
+                for dc_info in domain_controllers
+            ]
+            return [future.result() for future in futures]
+
+    def _run_dc(self, resource_group: str, dc_info: Dict[str, Any], admin_upn: str, admin_password: str) -> Dict[str, Any]:
+        """Fetch every page of one DC's users."""
+        dc_name = dc_info["dc"]
+        since = dc_info.get("since")
+        result = {
+            "dc": dc_name,
+            "domain": dc_info["domain"],
+            "mode": "delta" if since else "full",
+            "users": [],
+            "deleted": [],
+            "highWaterMark": None,
+            "error": None
+        }
+
+        skip = 0
+        pages = 0
+        try:
+            while True:
+                script = build_user_sync_script(admin_upn, admin_password, since, skip, self.page_bytes)
+                output = azure_gateway.run_powershell(resource_group, dc_name, script)
+                pages += 1
+
+                page = None
+                for record in iter_results(output["stdout"]):
+                    kind = record.get("kind")
+                    if kind == "user":
+                        result["users"].append(record["username"])
+                    elif kind == "deleted_user":
+                        result["deleted"].append(record["username"])
+                    elif kind == "sync_page":
+                        page = record
+                    elif kind == "error":
+                        raise RuntimeError(record.get("error") or "Unknown error")
+
+                if page is None:
+                    raise RuntimeError((output["stderr"] or "No results returned")[:200])
+
+                # The first page's mark covers the whole sync, since every later page re-runs the same query
+                result["highWaterMark"] = result["highWaterMark"] or page.get("highWaterMark")
+                next_skip = int(page.get("next", 0))
+                if next_skip >= int(page.get("total", 0)):
+                    break
+                if next_skip <= skip:
+                    raise RuntimeError(f"Page at offset {skip} made no progress")
+                skip = next_skip
+        except Exception as e:
+            logger.error(f"USER_SYNC: {result['mode'].capitalize()} sync of {dc_name} failed after {pages} page(s): {e}")
+            result.update(users=[], deleted=[], highWaterMark=None, error=str(e)[:200])
+            return result
+
+        logger.info(f"USER_SYNC: {result['mode'].capitalize()} sync of {dc_name}: {len(result['users'])} user(s), "
+                    f"{len(result['deleted'])} deleted, {pages} page(s)")
+        return result
+
+
+user_sync_engine = UserSyncEngine()